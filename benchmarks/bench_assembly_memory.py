@@ -0,0 +1,65 @@
+"""
+Peak memory of generate_full_audio on long synthetic scripts.
+
+Usage: python benchmarks/bench_assembly_memory.py [parts] [frames_per_part]
+
+The API is stubbed to return silent MP3 segments, so no network access or API key
+is needed. Compares the incremental assembler with collecting every part before
+writing, which is what generate_full_audio used to do.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+os.environ["ELEVENLABS_CACHE_ENABLED"] = "false"
+
+from elevenlabs_mcp.audio import silent_mp3, stitch_mp3  # noqa: E402
+from elevenlabs_mcp.elevenlabs_api import ElevenLabsAPI  # noqa: E402
+
+
+class StubAPI(ElevenLabsAPI):
+    def __init__(self, frames: int):
+        super().__init__()
+        self.frames = frames
+
+    def generate_audio_segment(self, text, voice_id, output_file=None, previous_text=None, next_text=None,
+                               previous_request_ids=None, debug_info=None, bypass_cache=False):
+        # Fresh bytes per call, as a real response would be
+        return silent_mp3(self.frames), f"req-{len(text)}"
+
+
+def collect_then_stitch(api: StubAPI, script_parts, output_dir: Path) -> None:
+    parts = [api.generate_audio_segment(part["text"], api.voice_id)[0] for part in script_parts]
+    stitch_mp3(parts, str(output_dir / "collected.mp3"))
+
+
+def measure(label, func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<20} peak {peak / 1e6:8.1f} MB  {elapsed:6.2f} s")
+
+
+def main():
+    parts = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 200  # ~5 s of audio per part
+    api = StubAPI(frames)
+    # Short texts keep the context strings out of the measurement
+    script_parts = [{"text": f"Line {i}."} for i in range(parts)]
+    print(f"{parts} parts x {frames} frames ({parts * len(silent_mp3(frames)) / 1e6:.1f} MB of audio)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = Path(tmp)
+        measure("collect then stitch", collect_then_stitch, api, script_parts, output_dir)
+        measure("incremental", api.generate_full_audio, script_parts, output_dir)
+
+
+if __name__ == "__main__":
+    main()
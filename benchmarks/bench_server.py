@@ -0,0 +1,250 @@
+"""
+End-to-end throughput and latency of the MCP server against a local ElevenLabs stand-in.
+
+Usage: python benchmarks/bench_server.py [single long batch concurrent]
+           [--latency 0.2] [--jitter 0.05] [--throttle-rate 0] [--retry-after 1] [--frames 200]
+           [--requests 20] [--parts 50] [--items 50] [--clients 8] [--per-client 5] [--iterations 3]
+           [--json results.json] [--baseline results.json] [--tolerance 0.25]
+
+Starts benchmarks/fake_elevenlabs.py in a subprocess and runs every scenario in a
+fresh process, with its own output directory and the cache disabled, so CPU time
+and peak RSS belong to the server alone. Tool calls go through real MCP client
+sessions over in-memory streams:
+
+single      sequential generate_audio_simple calls from one client
+long        generate_audio_script with --parts parts, --iterations times
+batch       generate_audio_batch with --items clips, --iterations times
+concurrent  --clients clients, each making --per-client generate_audio_simple calls
+
+Reports p50/p95/p99 tool call latency, jobs (tool calls) per second, API requests
+and 429s seen by the stand-in, CPU seconds and peak RSS. --baseline compares with
+an earlier --json run and exits with status 1 when p95 latency, jobs/sec or peak
+RSS regressed by more than --tolerance. ELEVENLABS_* settings such as
+ELEVENLABS_RATE_MAX_CONCURRENCY are passed through to the server. Unix only
+(peak RSS comes from getrusage).
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+from fake_elevenlabs import add_arguments
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile, 0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def call(session, name: str, arguments: dict, results: list[tuple[float, bool]]) -> None:
+    """Time one tool call and record whether it succeeded"""
+    start = time.perf_counter()
+    result = await session.call_tool(name, arguments)
+    elapsed = time.perf_counter() - start
+    text = result.content[0].text if result.content and result.content[0].type == "text" else ""
+    results.append((elapsed, not result.isError and not text.startswith("Error")))
+
+
+async def single(sessions, args, results) -> None:
+    for i in range(args.requests):
+        await call(sessions[0], "generate_audio_simple",
+                   {"text": f"Benchmark clip number {i}.", "response_mode": "reference"}, results)
+
+
+async def long(sessions, args, results) -> None:
+    for n in range(args.iterations):
+        script = {"script": [{"text": f"Line {i} of benchmark script {n}."} for i in range(args.parts)]}
+        await call(sessions[0], "generate_audio_script",
+                   {"script": json.dumps(script), "response_mode": "reference"}, results)
+
+
+async def batch(sessions, args, results) -> None:
+    for n in range(args.iterations):
+        items = [{"text": f"Prompt {i} of batch {n}.", "id": str(i)} for i in range(args.items)]
+        await call(sessions[0], "generate_audio_batch", {"items": items}, results)
+
+
+async def concurrent(sessions, args, results) -> None:
+    async def client(index, session):
+        for i in range(args.per_client):
+            await call(session, "generate_audio_simple",
+                       {"text": f"Client {index} clip {i}.", "response_mode": "reference"}, results)
+
+    await asyncio.gather(*(client(index, session) for index, session in enumerate(sessions)))
+
+
+SCENARIOS = {"single": single, "long": long, "batch": batch, "concurrent": concurrent}
+
+
+async def run_scenario(name: str, args) -> dict:
+    # Imported here, after the environment has been set up by worker()
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    from elevenlabs_mcp.server import ElevenLabsServer
+
+    server = ElevenLabsServer()
+    await server.initialize()
+    results: list[tuple[float, bool]] = []
+    try:
+        async with AsyncExitStack() as stack:
+            clients = args.clients if name == "concurrent" else 1
+            sessions = [
+                await stack.enter_async_context(create_connected_server_and_client_session(server.server))
+                for _ in range(clients)
+            ]
+            cpu_start = cpu_seconds()
+            start = time.perf_counter()
+            await SCENARIOS[name](sessions, args, results)
+            wall = time.perf_counter() - start
+            cpu = cpu_seconds() - cpu_start
+    finally:
+        await server.shutdown()
+
+    latencies = [latency for latency, _ in results]
+    return {
+        "calls": len(results),
+        "failed": sum(1 for _, ok in results if not ok),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "jobs_per_sec": len(results) / wall if wall else 0.0,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "cpu_percent": 100 * cpu / wall if wall else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "limiter": server.api.limiter.stats()
+    }
+
+
+def worker(name: str, args) -> None:
+    """Run one scenario in this process and print its results as JSON"""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.environ["ELEVENLABS_BASE_URL"] = args.base_url
+        os.environ["ELEVENLABS_OUTPUT_DIR"] = str(Path(tmp) / "output")
+        os.environ["ELEVENLABS_CACHE_ENABLED"] = "false"
+        os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+        result = asyncio.run(run_scenario(name, args))
+    print(json.dumps(result))
+
+
+def fake_stats(base_url: str) -> dict:
+    with urllib.request.urlopen(base_url.rsplit("/v1", 1)[0] + "/stats") as response:
+        return json.load(response)
+
+
+def run_all(args) -> dict:
+    fake = subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name("fake_elevenlabs.py")), "--port", "0",
+         "--latency", str(args.latency), "--jitter", str(args.jitter), "--throttle-rate", str(args.throttle_rate),
+         "--retry-after", str(args.retry_after), "--frames", str(args.frames)],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        base_url = fake.stdout.readline().strip()
+        sizes = ["--requests", str(args.requests), "--parts", str(args.parts), "--items", str(args.items),
+                 "--clients", str(args.clients), "--per-client", str(args.per_client),
+                 "--iterations", str(args.iterations)]
+        results = {}
+        for name in args.scenarios:
+            before = fake_stats(base_url)
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", name, "--base-url", base_url, *sizes],
+                check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            after = fake_stats(base_url)
+            result["api_requests"] = after["requests"] - before["requests"]
+            result["api_throttled"] = after["throttled"] - before["throttled"]
+            results[name] = result
+            report(name, result)
+        return results
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+def report(name: str, result: dict) -> None:
+    print(f"{name:<11} {result['calls']:>5} calls ({result['failed']} failed)  "
+          f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  "
+          f"{result['jobs_per_sec']:7.2f} jobs/s  {result['api_requests']:>5} API requests "
+          f"({result['api_throttled']} 429)  cpu {result['cpu_seconds']:6.2f} s ({result['cpu_percent']:5.1f}%)  "
+          f"peak RSS {result['peak_rss_mb']:7.1f} MB")
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Metrics that got worse than the baseline by more than tolerance"""
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, higher_is_worse in (("p95_ms", True), ("jobs_per_sec", False), ("peak_rss_mb", True)):
+            old, new = base[metric], result[metric]
+            worse = new > old * (1 + tolerance) if higher_is_worse else new < old * (1 - tolerance)
+            if worse:
+                found.append(f"{name} {metric}: {old:.1f} -> {new:.1f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help=f"Any of {', '.join(SCENARIOS)}, default all")
+    add_arguments(parser)
+    parser.add_argument("--requests", type=int, default=20, help="Calls made by the single scenario")
+    parser.add_argument("--parts", type=int, default=50, help="Parts per script in the long scenario")
+    parser.add_argument("--items", type=int, default=50, help="Clips per call in the batch scenario")
+    parser.add_argument("--clients", type=int, default=8, help="MCP clients in the concurrent scenario")
+    parser.add_argument("--per-client", type=int, default=5, help="Calls per client in the concurrent scenario")
+    parser.add_argument("--iterations", type=int, default=3, help="Calls made by the long and batch scenarios")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results of an earlier --json run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--worker", choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+
+    if args.worker:
+        worker(args.worker, args)
+        return
+
+    results = run_all(args)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        found = regressions(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Compare frame-level MP3 stitching with the decode/re-encode path.
+
+Usage: python benchmarks/bench_stitching.py [parts] [frames_per_part]
+
+The decode path needs ffmpeg on PATH and is skipped when it is missing.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from elevenlabs_mcp.audio import silent_mp3, stitch_mp3
+from elevenlabs_mcp.elevenlabs_api import decode_and_export
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed * 1000:10.1f} ms")
+    return elapsed
+
+
+def main():
+    parts = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 400  # ~10 s of audio per part
+    audio_parts = [silent_mp3(frames) for _ in range(parts)]
+    print(f"{parts} parts x {frames} frames ({sum(map(len, audio_parts)) / 1e6:.1f} MB)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stitch_time = timed("stitch", stitch_mp3, audio_parts, os.path.join(tmp, "stitched.mp3"))
+        if shutil.which("ffmpeg") is None:
+            print("decode     skipped (ffmpeg not found)")
+            return
+        decode_time = timed("decode", decode_and_export, audio_parts, os.path.join(tmp, "decoded.mp3"))
+        print(f"speedup    {decode_time / stitch_time:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Voice catalog benchmarks over a synthetic catalog.
+
+Usage: python benchmarks/bench_voices.py [voices]
+
+upsert: Database.upsert_voices (one executemany, unchanged rows skipped) against
+the previous one-execute-per-voice loop, for a first load, an unchanged refresh
+and a refresh where 5% of the voices changed.
+
+search: VoiceIndex.search for typical filters, served from the in-memory index.
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+
+from elevenlabs_mcp.database import UPSERT_VOICE, Database
+from elevenlabs_mcp.voices import VoiceIndex
+
+ACCENTS = ["american", "british", "australian", "irish", "indian", "german", "french"]
+AGES = ["young", "middle aged", "old"]
+GENDERS = ["female", "male", "neutral"]
+USE_CASES = ["narration", "news", "conversational", "characters", "social media", "audiobook"]
+CATEGORIES = ["premade", "cloned", "generated", "professional"]
+MODELS = ["eleven_multilingual_v2", "eleven_turbo_v2_5", "eleven_flash_v2_5"]
+
+
+def synthetic_voices(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "voice_id": f"voice{i:06d}",
+            "name": f"Voice {i}",
+            "category": rng.choice(CATEGORIES),
+            "labels": {
+                "accent": rng.choice(ACCENTS),
+                "age": rng.choice(AGES),
+                "gender": rng.choice(GENDERS),
+                "use case": rng.choice(USE_CASES),
+            },
+            "description": f"A {rng.choice(['calm', 'warm', 'deep', 'bright', 'raspy'])} voice number {i}",
+            "preview_url": f"https://example.com/previews/{i}.mp3",
+            "high_quality_base_model_ids": rng.sample(MODELS, rng.randint(0, len(MODELS))),
+        }
+        for i in range(count)
+    ]
+
+
+async def upsert_per_row(db: Database, voices: list[dict]) -> None:
+    """The previous refresh path: one execute per voice, every row rewritten."""
+    now = datetime.utcnow().isoformat()
+    connection = await db._connection()
+    for voice in voices:
+        await connection.execute(UPSERT_VOICE, (*db._voice_row(voice), now, None))
+    await connection.commit()
+
+
+def with_changes(voices: list[dict], fraction: float) -> list[dict]:
+    step = int(1 / fraction)
+    return [
+        {**voice, "description": voice["description"] + " (updated)"} if i % step == 0 else voice
+        for i, voice in enumerate(voices)
+    ]
+
+
+async def timed(label: str, coro) -> None:
+    start = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1000:8.1f} ms  {result or ''}")
+
+
+async def bench_upsert(tmp: str, voices: list[dict]) -> None:
+    changed = with_changes(voices, 0.05)
+    for name, upsert in (("per-row", upsert_per_row), ("batched", Database.upsert_voices)):
+        db = Database(os.path.join(tmp, f"{name}.db"))
+        await db.initialize()
+        try:
+            await timed(f"upsert {name} first load", upsert(db, voices))
+            await timed(f"upsert {name} unchanged", upsert(db, voices))
+            await timed(f"upsert {name} 5% changed", upsert(db, changed))
+        finally:
+            await db.close()
+
+
+async def bench_search(db: Database, voices: list[dict]) -> None:
+    await db.upsert_voices(voices)
+    index = VoiceIndex(db, None)
+    await index.load()
+    queries = {
+        "gender+accent": {"labels": {"gender": "female", "accent": "british"}},
+        "use case+model": {"labels": {"use_case": "narration"}, "model_id": "eleven_multilingual_v2"},
+        "category": {"category": "cloned"},
+        "substring": {"query": "raspy"},
+        "no filters": {},
+    }
+    rounds = 200
+    for label, filters in queries.items():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            _, total = await index.search(**filters)
+        elapsed = (time.perf_counter() - start) / rounds
+        print(f"search {label:<16} {elapsed * 1e6:8.1f} us  ({total} matches)")
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    voices = synthetic_voices(count)
+    print(f"{count} synthetic voices")
+    with tempfile.TemporaryDirectory() as tmp:
+        await bench_upsert(tmp, voices)
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.initialize()
+        try:
+            await bench_search(db, voices)
+        finally:
+            await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,178 @@
+"""
+Local stand-in for the ElevenLabs API, for benchmarks and offline testing.
+
+Usage: python benchmarks/fake_elevenlabs.py [--port 8787] [--latency 0.2] [--jitter 0.05]
+                                            [--throttle-rate 0.05] [--retry-after 1] [--frames 200]
+
+Serves the endpoints this server uses: POST /v1/text-to-speech/<voice_id>, its
+/stream variant and GET /v1/voices. Every synthesis request is answered with the
+same silent MP3 payload after latency +- jitter seconds, or with a 429 and a
+Retry-After header for a throttle-rate share of requests. GET /stats returns the
+request counters. Point the server at it with
+ELEVENLABS_BASE_URL=http://127.0.0.1:<port>/v1 (any API key is accepted).
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from elevenlabs_mcp.audio import silent_mp3
+
+
+class FakeElevenLabs(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency: float = 0.2, jitter: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, frames: int = 200,
+                 voices: int = 20, chunk_size: int = 8192, seed: int = 0):
+        super().__init__(address, FakeElevenLabsHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.chunk_size = chunk_size
+        # Built once, every response carries the same bytes
+        self.payload = silent_mp3(frames)
+        self.voices = [
+            {
+                "voice_id": f"voice{i:04d}",
+                "name": f"Voice {i}",
+                "category": "premade",
+                "labels": {"accent": "american", "gender": "female" if i % 2 else "male"},
+                "description": f"Benchmark voice {i}",
+                "preview_url": None,
+                "high_quality_base_model_ids": ["eleven_multilingual_v2"]
+            }
+            for i in range(voices)
+        ]
+        self._random = random.Random(seed)
+        self._request_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._active = 0
+        self.counters = {"requests": 0, "synthesized": 0, "throttled": 0, "max_concurrent": 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def admit(self) -> tuple[bool, float, int]:
+        """(throttled, delay, request id) for a new synthesis request"""
+        with self._lock:
+            self.counters["requests"] += 1
+            self._active += 1
+            self.counters["max_concurrent"] = max(self.counters["max_concurrent"], self._active)
+            throttled = self._random.random() < self.throttle_rate
+            self.counters["throttled" if throttled else "synthesized"] += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            return throttled, delay, next(self._request_ids)
+
+    def done(self) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+    def start(self) -> threading.Thread:
+        """Serve from a daemon thread, stop with shutdown()"""
+        thread = threading.Thread(target=self.serve_forever, name="fake-elevenlabs", daemon=True)
+        thread.start()
+        return thread
+
+
+class FakeElevenLabsHandler(BaseHTTPRequestHandler):
+    # Keep-alive, as the real API, so connection pooling is exercised
+    protocol_version = "HTTP/1.1"
+    server: FakeElevenLabs
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/v1/voices"):
+            self.send_json(200, {"voices": self.server.voices})
+        elif self.path == "/stats":
+            self.send_json(200, self.server.stats())
+        else:
+            self.send_json(404, {"detail": "Not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.startswith("/v1/text-to-speech/"):
+            self.send_json(404, {"detail": "Not found"})
+            return
+        try:
+            text = json.loads(body).get("text")
+        except ValueError:
+            text = None
+        if not text:
+            self.send_json(400, {"detail": "Missing text"})
+            return
+
+        throttled, delay, request_id = self.server.admit()
+        try:
+            time.sleep(delay)
+            if throttled:
+                self.send_json(429, {"detail": "Too many concurrent requests"},
+                               {"Retry-After": f"{self.server.retry_after:g}"})
+                return
+            payload = self.server.payload
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("request-id", f"fake-{request_id}")
+            self.end_headers()
+            if self.path.split("?", 1)[0].endswith("/stream"):
+                for start in range(0, len(payload), self.server.chunk_size):
+                    self.wfile.write(payload[start:start + self.server.chunk_size])
+                    self.wfile.flush()
+            else:
+                self.wfile.write(payload)
+        finally:
+            self.server.done()
+
+    def send_json(self, status: int, payload: dict, headers: dict = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before each synthesis response")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Latency varies uniformly by +- this much")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--frames", type=int, default=200, help="MP3 frames per response (~26 ms each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787, help="0 picks a free port")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeElevenLabs((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                            throttle_rate=args.throttle_rate, retry_after=args.retry_after, frames=args.frames)
+    # First line is the base URL, read by bench_server.py
+    print(server.base_url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
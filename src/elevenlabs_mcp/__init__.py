@@ -4,6 +4,6 @@ __version__ = "0.1.0"
 
 from .server import ElevenLabsServer, main
 from .models import AudioJob, ScriptPart
-from .elevenlabs_api import ElevenLabsAPI
+from .elevenlabs_api import AsyncElevenLabsAPI, ElevenLabsAPI
 
-__all__ = ["ElevenLabsServer", "main", "AudioJob", "ScriptPart", "ElevenLabsAPI"]
+__all__ = ["ElevenLabsServer", "main", "AudioJob", "ScriptPart", "ElevenLabsAPI", "AsyncElevenLabsAPI"]
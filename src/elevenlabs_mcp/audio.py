@@ -0,0 +1,467 @@
+"""MP3 helpers: frame-level stitching of generated segments and reading output files in bounded pieces."""
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+from .metrics import metrics
+
+# Bitrates in kbps, indexed by (MPEG-1, layer) / (MPEG-2 and 2.5, layer) and the header bitrate index
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {
+    "1": (44100, 48000, 32000),
+    "2": (22050, 24000, 16000),
+    "2.5": (11025, 12000, 8000),
+}
+_VERSIONS = {0b00: "2.5", 0b10: "2", 0b11: "1"}
+_LAYERS = {0b01: 3, 0b10: 2, 0b11: 1}
+_VERSION_BITS = {version: bits for bits, version in _VERSIONS.items()}
+
+# Trailing tags that may follow the last audio frame
+_TRAILING_TAGS = (b"APETAGEX", b"LYRICSBEGIN")
+
+
+@dataclass(frozen=True)
+class FrameHeader:
+    """Decoded 4-byte MPEG audio frame header."""
+    version: str  # "1", "2" or "2.5"
+    layer: int
+    bitrate_index: int
+    sample_rate_index: int
+    padding: int
+    protected: bool  # a 16-bit CRC follows the header
+    channel_mode: int  # 3 = mono
+    raw: bytes
+
+    @property
+    def bitrate(self) -> int:
+        return _BITRATES[(self.version == "1", self.layer)][self.bitrate_index] * 1000
+
+    @property
+    def sample_rate(self) -> int:
+        return _SAMPLE_RATES[self.version][self.sample_rate_index]
+
+    @property
+    def samples(self) -> int:
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and self.version != "1":
+            return 576
+        return 1152
+
+    @property
+    def frame_length(self) -> int:
+        if self.layer == 1:
+            return (12 * self.bitrate // self.sample_rate + self.padding) * 4
+        return self.samples // 8 * self.bitrate // self.sample_rate + self.padding
+
+    @property
+    def side_info_size(self) -> int:
+        mono = self.channel_mode == 3
+        if self.version == "1":
+            return 17 if mono else 32
+        return 9 if mono else 17
+
+    @property
+    def stream_params(self) -> tuple:
+        """Parameters that must match for frames to be concatenated."""
+        return self.version, self.layer, self.sample_rate, self.channel_mode == 3
+
+
+def parse_frame_header(data: bytes, offset: int = 0) -> Optional[FrameHeader]:
+    """Parse the frame header at offset, or return None if there is no valid header there."""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset:offset + 4]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = _VERSIONS.get((b1 >> 3) & 0b11)
+    layer = _LAYERS.get((b1 >> 1) & 0b11)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0b11
+    # Free format (0) and bad (15) bitrates and the reserved sample rate are not supported
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    return FrameHeader(
+        version=version,
+        layer=layer,
+        bitrate_index=bitrate_index,
+        sample_rate_index=sample_rate_index,
+        padding=(b2 >> 1) & 1,
+        protected=not (b1 & 1),
+        channel_mode=b3 >> 6,
+        raw=bytes(data[offset:offset + 4]),
+    )
+
+
+def id3v2_size(data: bytes) -> int:
+    """Size in bytes of a leading ID3v2 tag, 0 if there is none."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _is_vbr_header_frame(data: bytes, offset: int, header: FrameHeader) -> bool:
+    """Whether the frame at offset carries a Xing/Info or VBRI header instead of audio."""
+    tag_offset = offset + 4 + (2 if header.protected else 0) + header.side_info_size
+    if data[tag_offset:tag_offset + 4] in (b"Xing", b"Info"):
+        return True
+    return data[offset + 36:offset + 40] == b"VBRI"
+
+
+@dataclass
+class Mp3Stream:
+    """Location and parameters of the audio frames inside an MP3 file."""
+    start: int
+    end: int
+    frame_count: int
+    first_header: FrameHeader
+    bitrates: frozenset
+
+    @property
+    def stream_params(self) -> tuple:
+        return self.first_header.stream_params
+
+
+def scan_mp3(data: bytes) -> Optional[Mp3Stream]:
+    """
+    Locate the contiguous run of audio frames in data, skipping ID3 tags and the
+    Xing/Info header frame. Returns None when the data is not a clean stream of frames
+    with constant parameters, in which case callers should fall back to decoding.
+    """
+    end = len(data)
+    if end >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    pos = id3v2_size(data)
+
+    first_header = parse_frame_header(data, pos)
+    if first_header is None:
+        return None
+    if pos + first_header.frame_length <= end and _is_vbr_header_frame(data, pos, first_header):
+        pos += first_header.frame_length
+        first_header = parse_frame_header(data, pos)
+        if first_header is None:
+            return None
+
+    start = pos
+    frame_count = 0
+    bitrates = set()
+    params = first_header.stream_params
+    while pos < end:
+        header = parse_frame_header(data, pos)
+        if header is None:
+            if any(data[pos:pos + len(tag)] == tag for tag in _TRAILING_TAGS):
+                break
+            return None
+        if header.stream_params != params:
+            return None
+        if pos + header.frame_length > end:
+            # Drop a truncated final frame
+            break
+        bitrates.add(header.bitrate)
+        frame_count += 1
+        pos += header.frame_length
+
+    if not frame_count:
+        return None
+    return Mp3Stream(start, pos, frame_count, first_header, frozenset(bitrates))
+
+
+def leading_header_size(data: bytes) -> Optional[int]:
+    """
+    Size of the ID3v2 tag and Xing/Info header frame that scan_mp3 skips at the start
+    of an MP3 stream, for data holding the first bytes of one. Returns None while
+    data is too short to tell, and 0 when it does not start like an MP3 at all.
+    """
+    if len(data) < 10 and b"ID3".startswith(bytes(data[:3])):
+        return None
+    pos = id3v2_size(data)
+    if len(data) < pos + 4:
+        return None
+    header = parse_frame_header(data, pos)
+    if header is None:
+        return pos
+    if len(data) < pos + header.frame_length:
+        return None
+    if _is_vbr_header_frame(data, pos, header):
+        pos += header.frame_length
+    return pos
+
+
+def build_xing_frame(header: FrameHeader, frame_count: int, byte_count: int, vbr: bool) -> bytes:
+    """
+    Build a Xing (VBR) or Info (CBR) header frame with frame and byte counts, using the
+    stream parameters of header. byte_count covers the whole stream including this frame.
+    """
+    tag_offset = 4 + header.side_info_size
+    needed = tag_offset + 16
+    # Smallest bitrate whose unpadded frame can hold the tag, preferring the stream's own bitrate
+    candidates = [header.bitrate_index] + list(range(1, 15))
+    for bitrate_index in candidates:
+        candidate = FrameHeader(header.version, header.layer, bitrate_index, header.sample_rate_index,
+                                0, False, header.channel_mode, b"")
+        if candidate.frame_length >= needed:
+            break
+    else:
+        raise ValueError("No bitrate large enough for a Xing header frame")
+
+    b1 = 0xE0 | (_VERSION_BITS[header.version] << 3) | ({3: 0b01, 2: 0b10, 1: 0b11}[header.layer] << 1) | 1
+    b2 = (bitrate_index << 4) | (header.sample_rate_index << 2)
+    b3 = header.raw[3]
+    frame = bytearray(candidate.frame_length)
+    frame[0:4] = bytes((0xFF, b1, b2, b3))
+    frame[tag_offset:tag_offset + 4] = b"Xing" if vbr else b"Info"
+    # Flags: frame count and byte count fields present
+    frame[tag_offset + 4:tag_offset + 16] = struct.pack(">III", 0x3, frame_count, byte_count)
+    logging.debug(f"Built {'Xing' if vbr else 'Info'} frame for {frame_count} frames")
+    return bytes(frame)
+
+
+def write_stitched(streams: List[tuple[bytes, Mp3Stream]], out: BinaryIO) -> int:
+    """Write a Xing/Info frame followed by the frames of every stream. Returns bytes written."""
+    first = streams[0][1].first_header
+    frame_count = sum(stream.frame_count for _, stream in streams)
+    audio_bytes = sum(stream.end - stream.start for _, stream in streams)
+    bitrates = frozenset().union(*(stream.bitrates for _, stream in streams))
+    xing_length = len(build_xing_frame(first, 0, 0, vbr=len(bitrates) > 1))
+    xing = build_xing_frame(first, frame_count, xing_length + audio_bytes, vbr=len(bitrates) > 1)
+    out.write(xing)
+    for data, stream in streams:
+        out.write(memoryview(data)[stream.start:stream.end])
+    return len(xing) + audio_bytes
+
+
+def stitch_mp3(audio_parts: List[bytes], output_file: str) -> bool:
+    """
+    Concatenate MP3 parts at the frame level into output_file without re-encoding.
+    Returns False, without writing anything, if any part cannot be parsed or the
+    parts do not share the same stream parameters.
+    """
+    streams = []
+    for data in audio_parts:
+        stream = scan_mp3(data)
+        if stream is None or (streams and stream.stream_params != streams[0][1].stream_params):
+            return False
+        streams.append((data, stream))
+    if not streams:
+        return False
+    with open(output_file, "wb") as f:
+        write_stitched(streams, f)
+    return True
+
+
+def silent_mp3(frame_count: int, bitrate_kbps: int = 128, sample_rate: int = 44100,
+               xing: bool = True, id3: bool = True) -> bytes:
+    """
+    Build a valid MPEG-1 Layer III stream of silent frames, optionally wrapped the way
+    encoders usually do (ID3v2 tag and an Info frame). Used by tests and benchmarks.
+    """
+    bitrate_index = _BITRATES[(True, 3)].index(bitrate_kbps)
+    sample_rate_index = _SAMPLE_RATES["1"].index(sample_rate)
+    header = FrameHeader("1", 3, bitrate_index, sample_rate_index, 0, False, 1,
+                         bytes((0xFF, 0xFB, (bitrate_index << 4) | (sample_rate_index << 2), 0x44)))
+    frame = header.raw + bytes(header.frame_length - 4)
+    body = frame * frame_count
+    prefix = b""
+    if id3:
+        # Empty ID3v2.3 tag with 16 bytes of padding
+        prefix += b"ID3\x03\x00\x00\x00\x00\x00\x10" + bytes(16)
+    if xing:
+        prefix += build_xing_frame(header, frame_count, header.frame_length * (frame_count + 1), vbr=False)
+    return prefix + body
+
+
+class IncrementalAssembler:
+    """
+    Writes MP3 parts to output_file in script order as they become available.
+
+    Parts may be added out of order; each one is held only until every earlier part
+    has been added or skipped, then its frames are appended to the file and the bytes
+    are released. The Info/Xing frame is reserved up front and rewritten with the
+    final frame count by close(). If a part cannot be stitched, the remaining parts
+    are spooled to disk and close() hands everything to fallback(parts, output_file),
+    which re-encodes in one go.
+    """
+
+    def __init__(self, output_file: str, fallback: Optional[Callable[[List[bytes], str], None]] = None):
+        self.output_file = output_file
+        self.fallback = fallback
+        self.parts_written = 0
+        self.bytes_written = 0
+        self._next_index = 0
+        # index -> audio bytes, or None for a skipped part
+        self._pending: Dict[int, Optional[bytes]] = {}
+        self._out: Optional[BinaryIO] = None
+        self._first: Optional[FrameHeader] = None
+        self._xing_length = 0
+        self._frame_count = 0
+        self._bitrates = set()
+        self._spool: Optional[BinaryIO] = None
+        self._spooled_lengths: List[int] = []
+
+    @property
+    def pending_parts(self) -> int:
+        """Number of parts waiting for an earlier part before they can be written."""
+        return len(self._pending)
+
+    def add(self, index: int, data: bytes) -> None:
+        """Add the audio for part index, writing it and any parts it unblocks."""
+        self._pending[index] = data
+        with metrics.timer("elevenlabs_audio_assembly_seconds", step="write"):
+            self._drain()
+
+    def skip(self, index: int) -> None:
+        """Mark part index as missing so later parts are not held back by it."""
+        self._pending[index] = None
+        with metrics.timer("elevenlabs_audio_assembly_seconds", step="write"):
+            self._drain()
+
+    def _drain(self) -> None:
+        while self._next_index in self._pending:
+            data = self._pending.pop(self._next_index)
+            self._next_index += 1
+            if data is not None:
+                self._write_part(data)
+
+    def _write_part(self, data: bytes) -> None:
+        if self._spool is None:
+            stream = scan_mp3(data)
+            if stream is not None and (self._first is None or stream.stream_params == self._first.stream_params):
+                self._append_frames(data, stream)
+                return
+            logging.info("Part cannot be stitched, spooling remaining parts for re-encoding")
+            self._spool = tempfile.TemporaryFile()
+        self._spool.write(data)
+        self._spooled_lengths.append(len(data))
+        self.parts_written += 1
+
+    def _append_frames(self, data: bytes, stream: Mp3Stream) -> None:
+        if self._out is None:
+            self._first = stream.first_header
+            self._out = open(self.output_file, "wb")
+            # Placeholder, its length only depends on the stream parameters
+            placeholder = build_xing_frame(self._first, 0, 0, vbr=False)
+            self._xing_length = len(placeholder)
+            self._out.write(placeholder)
+        self._out.write(memoryview(data)[stream.start:stream.end])
+        self._frame_count += stream.frame_count
+        self._bitrates |= stream.bitrates
+        self.bytes_written += stream.end - stream.start
+        self.parts_written += 1
+
+    def close(self) -> bool:
+        """Finish the output file. Returns False, removing the file, if no part was written."""
+        with metrics.timer("elevenlabs_audio_assembly_seconds", step="close"):
+            written = self._close()
+        if written:
+            metrics.inc("elevenlabs_audio_bytes_written_total", os.path.getsize(self.output_file))
+        return written
+
+    def _close(self) -> bool:
+        if self._pending:
+            # Parts that were never reported are treated as skipped
+            logging.warning(f"Closing assembler with part {self._next_index} missing")
+            for index in sorted(self._pending):
+                data = self._pending.pop(index)
+                if data is not None:
+                    self._write_part(data)
+
+        if self._out is not None:
+            self._out.seek(0)
+            self._out.write(build_xing_frame(self._first, self._frame_count,
+                                             self._xing_length + self.bytes_written,
+                                             vbr=len(self._bitrates) > 1))
+            self._out.close()
+            self._out = None
+
+        if self._spool is not None:
+            self._reencode()
+
+        if not self.parts_written:
+            if os.path.exists(self.output_file):
+                os.remove(self.output_file)
+            return False
+        return True
+
+    def abort(self) -> None:
+        """Give up on the output, e.g. when the job was cancelled: close everything and remove the file."""
+        self._pending.clear()
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        if os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+    def _reencode(self) -> None:
+        parts = []
+        if self._frame_count:
+            with open(self.output_file, "rb") as f:
+                f.seek(self._xing_length)
+                parts.append(f.read())
+        self._spool.seek(0)
+        parts.extend(self._spool.read(length) for length in self._spooled_lengths)
+        self._spool.close()
+        self._spool = None
+        if self.fallback is None:
+            raise ValueError("Parts cannot be stitched and no fallback was given")
+        with metrics.timer("elevenlabs_audio_export_seconds"):
+            self.fallback(parts, self.output_file)
+
+
+def mp3_duration(path: str) -> Optional[float]:
+    """
+    Duration in seconds of the MP3 at path, read from its headers only. Uses the frame
+    count of a Xing/Info frame when there is one and estimates from the first frame's
+    bitrate otherwise. Returns None if no frame header is found.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(16 * 1024)
+        offset = id3v2_size(head)
+        if offset:
+            f.seek(offset)
+            head = f.read(16 * 1024)
+    header = parse_frame_header(head)
+    if header is None:
+        return None
+    tag_offset = 4 + (2 if header.protected else 0) + header.side_info_size
+    if head[tag_offset:tag_offset + 4] in (b"Xing", b"Info"):
+        flags, frame_count = struct.unpack(">II", head[tag_offset + 4:tag_offset + 12])
+        if flags & 0x1:
+            return frame_count * header.samples / header.sample_rate
+    return (size - offset) * 8 / header.bitrate
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in fixed size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_range(path: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+    """Read at most length bytes starting at offset, without loading the rest of the file."""
+    if offset < 0 or (length is not None and length < 0):
+        raise ValueError("offset and length must not be negative")
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read() if length is None else f.read(length)
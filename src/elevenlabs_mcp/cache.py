@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def get_cache_dir() -> str:
+    """Get the synthesis cache directory, defaulting to a folder inside the output directory."""
+    cache_dir = os.getenv("ELEVENLABS_CACHE_DIR")
+    if not cache_dir:
+        cache_dir = os.path.join(os.getenv("ELEVENLABS_OUTPUT_DIR") or "output", "cache")
+    return cache_dir
+
+
+class SynthesisCache:
+    """
+    Content-addressed on-disk cache of synthesized segments.
+
+    Entries are keyed by a hash of the voice and the full request body (text, model,
+    voice settings and context fields) and store the raw MP3 bytes alongside the
+    ElevenLabs request-id, so stitched scripts can still reference prior requests.
+    The cache is capped at max_bytes and evicts least recently used entries first.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or get_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.getenv("ELEVENLABS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (size in bytes, request id), least recently used first
+        self._entries: "OrderedDict[str, tuple[int, str]]" = OrderedDict()
+        self._total_bytes = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(voice_id: str, request_data: Dict) -> str:
+        """Hash the voice and request body into a cache key."""
+        payload = json.dumps({"voice_id": voice_id, "request": request_data}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _audio_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU order from the files already on disk, oldest access first."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        found = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".json"):
+                continue
+            key = filename[:-len(".json")]
+            try:
+                with open(self._meta_path(key)) as f:
+                    meta = json.load(f)
+                stat = os.stat(self._audio_path(key))
+            except (OSError, ValueError) as e:
+                logging.debug(f"Ignoring unreadable cache entry {key}: {e}")
+                continue
+            found.append((stat.st_mtime, key, stat.st_size, meta["request_id"]))
+        for _, key, size, request_id in sorted(found):
+            self._entries[key] = (size, request_id)
+            self._total_bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[tuple[bytes, str]]:
+        """Return (audio bytes, request id) for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._audio_path(key), "rb") as f:
+                content = f.read()
+            # Touch the file so the LRU order survives a restart
+            os.utime(self._audio_path(key))
+        except OSError:
+            with self._lock:
+                if self._entries.pop(key, None) is not None:
+                    self._total_bytes -= entry[0]
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return content, entry[1]
+
+    def put(self, key: str, content: bytes, request_id: str) -> None:
+        """Store a synthesized segment, evicting old entries to stay within max_bytes."""
+        if len(content) > self.max_bytes:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to temporary files first so readers never see a partial entry
+        audio_tmp = f"{self._audio_path(key)}.{threading.get_ident()}.tmp"
+        meta_tmp = f"{self._meta_path(key)}.{threading.get_ident()}.tmp"
+        try:
+            with open(audio_tmp, "wb") as f:
+                f.write(content)
+            with open(meta_tmp, "w") as f:
+                json.dump({"request_id": request_id, "size": len(content)}, f)
+            os.replace(audio_tmp, self._audio_path(key))
+            os.replace(meta_tmp, self._meta_path(key))
+        except OSError as e:
+            logging.warning(f"Failed to write synthesis cache entry: {e}")
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[0]
+            self._entries[key] = (len(content), request_id)
+            self._total_bytes += len(content)
+            self._evict()
+
+    def _evict(self, limit: Optional[int] = None) -> None:
+        limit = self.max_bytes if limit is None else limit
+        while self._entries and self._total_bytes > limit:
+            key, (size, _) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            for path in (self._meta_path(key), self._audio_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        with self._lock:
+            self._evict(limit=0)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from .database import Database
+
+
+class JobCheckpoint:
+    """
+    Per-part progress of one job.
+
+    Every synthesized segment is written to segments_dir/<job_id>/ and recorded in
+    audio_job_parts with its request id, failures are recorded with their error.
+    When the job runs again, after a crash, a restart or through resume_job, parts
+    with a saved segment are read back instead of being synthesized again.
+    """
+
+    def __init__(self, db: Database, job_id: str, segments_dir: Path):
+        self.db = db
+        self.job_id = job_id
+        self.directory = Path(segments_dir) / job_id
+        # part index -> audio_job_parts row of parts with a saved segment
+        self._saved: Dict[int, dict] = {}
+        self.failed: Set[int] = set()
+        self.reused = 0
+
+    async def load(self) -> int:
+        """Read the recorded parts. Returns how many can be reused."""
+        rows = await self.db.get_job_parts(self.job_id)
+        self._saved = {
+            row["part_index"]: row for row in rows
+            if row["status"] == "completed" and row["segment_file"]
+        }
+        return len(self._saved)
+
+    def segment_path(self, index: int) -> Path:
+        return self.directory / f"part_{index:05d}.mp3"
+
+    async def saved(self, index: int) -> Optional[tuple[bytes, str]]:
+        """(audio, request id) of a part finished by an earlier run, None if it has to be synthesized."""
+        row = self._saved.get(index)
+        if row is None:
+            return None
+        try:
+            audio = await asyncio.to_thread(Path(row["segment_file"]).read_bytes)
+        except OSError as e:
+            logging.warning(f"Segment {index} of job {self.job_id} is unreadable, synthesizing it again: {e}")
+            return None
+        self.reused += 1
+        return audio, row["request_id"]
+
+    async def save(self, index: int, audio: bytes, request_id: str) -> None:
+        """Persist a freshly synthesized segment, then record it."""
+        path = self.segment_path(index)
+        await asyncio.to_thread(self._write_segment, path, audio)
+        await self.db.save_job_part(self.job_id, index, "completed", str(path), request_id)
+        self._saved[index] = {"segment_file": str(path), "request_id": request_id}
+        self.failed.discard(index)
+
+    @staticmethod
+    def _write_segment(path: Path, audio: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(audio)
+
+    async def fail(self, index: int, error: BaseException) -> None:
+        self.failed.add(index)
+        await self.db.save_job_part(self.job_id, index, "failed", error=str(error))
+
+    async def remove_segments(self) -> None:
+        """
+        Delete the segment files and their part records, e.g. once the job's output is
+        complete. The records go first, so a later run never trusts a missing file.
+        """
+        await self.db.delete_job_parts(self.job_id)
+        self._saved.clear()
+        await asyncio.to_thread(shutil.rmtree, self.directory, True)
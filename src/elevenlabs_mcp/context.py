@@ -0,0 +1,90 @@
+import re
+from bisect import bisect_right
+from typing import List, Optional
+
+# A sentence ends with . ! or ? (optionally followed by closing quotes/brackets) and whitespace
+SENTENCE_END = re.compile(r"[.!?][\"'”’)\]]*\s+")
+
+
+class ContextWindows:
+    """
+    previous_text/next_text for every part of a script, trimmed to a budget.
+
+    The texts are joined once and each part's context is sliced out of that string
+    by offset, so building context for the whole script is linear in its length
+    instead of re-joining all earlier and later parts for every part. Each side is
+    limited to max_chars characters (cut at a word boundary) and max_sentences
+    sentences; 0 disables a limit, which reproduces the full-script context.
+    """
+
+    def __init__(self, texts: List[str], max_chars: int = 0, max_sentences: int = 0):
+        self.max_chars = max_chars
+        self.max_sentences = max_sentences
+        self.joined = " ".join(texts)
+        # Start offset of every text in joined, plus the UTF-8 size of everything before it
+        self.starts = []
+        self.byte_offsets = []
+        offset = 0
+        byte_offset = 0
+        for text in texts:
+            self.starts.append(offset)
+            self.byte_offsets.append(byte_offset)
+            offset += len(text) + 1
+            byte_offset += len(text.encode("utf-8")) + 1
+        self.lengths = [len(text) for text in texts]
+        self.total_bytes = byte_offset - 1 if texts else 0
+        self.sentence_starts = [0]
+        if max_sentences:
+            self.sentence_starts += [match.end() for match in SENTENCE_END.finditer(self.joined)]
+        # Bytes trimmed per (side, part), so asking for a part's context twice counts it once
+        self._saved = {}
+
+    def previous(self, index: int) -> Optional[str]:
+        """Context before part index, None for the first part."""
+        if index == 0:
+            return None
+        end = self.starts[index] - 1
+        # Skip the separators left by empty parts
+        while end > 0 and self.joined[end - 1].isspace():
+            end -= 1
+        start = 0
+        if self.max_sentences:
+            position = bisect_right(self.sentence_starts, end - 1) - self.max_sentences
+            start = self.sentence_starts[max(position, 0)]
+        if self.max_chars and end - start > self.max_chars:
+            start = end - self.max_chars
+            if not self.joined[start - 1].isspace():
+                # Drop the partial word at the cut
+                space = self.joined.find(" ", start, end)
+                start = space + 1 if space != -1 else start
+        context = self.joined[start:end].strip()
+        # Everything before this part, minus the separating space
+        self._saved["previous", index] = self.byte_offsets[index] - 1 - len(context.encode("utf-8"))
+        return context
+
+    def next(self, index: int) -> Optional[str]:
+        """Context after part index, None for the last part."""
+        if index == len(self.starts) - 1:
+            return None
+        start = self.starts[index] + self.lengths[index] + 1
+        end = len(self.joined)
+        while start < end and self.joined[start].isspace():
+            start += 1
+        if self.max_sentences:
+            position = bisect_right(self.sentence_starts, start) + self.max_sentences - 1
+            if position < len(self.sentence_starts):
+                end = self.sentence_starts[position]
+        if self.max_chars and end - start > self.max_chars:
+            end = start + self.max_chars
+            if not self.joined[end].isspace():
+                space = self.joined.rfind(" ", start, end)
+                end = space if space != -1 else end
+        context = self.joined[start:end].strip()
+        full_bytes = self.total_bytes - self.byte_offsets[index + 1]
+        self._saved["next", index] = full_bytes - len(context.encode("utf-8"))
+        return context
+
+    @property
+    def bytes_saved(self) -> int:
+        """UTF-8 bytes of context trimmed away across the parts asked for so far."""
+        return sum(self._saved.values())
@@ -1,9 +1,12 @@
+import asyncio
 import aiosqlite
+import hashlib
 import json
 import os
 from datetime import datetime
 from typing import List, Optional
 
+from .metrics import metrics
 from .models import AudioJob
 
 def get_database_path() -> str:
@@ -30,10 +33,28 @@ CREATE TABLE IF NOT EXISTS voices (
     description TEXT,
     preview_url TEXT,
     high_quality_base_model_ids TEXT,  -- JSON string
-    last_updated TEXT NOT NULL
+    last_updated TEXT NOT NULL,  -- when the row content last changed
+    content_hash TEXT
 )
 """
 
+# Small key/value table, e.g. when the voice catalog was last refreshed
+CREATE_METADATA_TABLE = """
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+)
+"""
+
+# Columns added after the first release, created on existing databases by initialize()
+ADDED_COLUMNS = (
+    ("voices", "content_hash", "TEXT"),
+    ("audio_jobs", "fingerprint", "TEXT"),
+    ("audio_jobs", "options", "TEXT"),
+)
+
+VOICES_REFRESHED_AT = "voices_refreshed_at"
+
 CREATE_JOBS_TABLE = """
 CREATE TABLE IF NOT EXISTS audio_jobs (
     id TEXT PRIMARY KEY,
@@ -44,192 +65,483 @@ CREATE TABLE IF NOT EXISTS audio_jobs (
     created_at TEXT NOT NULL,
     updated_at TEXT NOT NULL,
     total_parts INTEGER NOT NULL DEFAULT 1,
-    completed_parts INTEGER NOT NULL DEFAULT 0
+    completed_parts INTEGER NOT NULL DEFAULT 0,
+    fingerprint TEXT,  -- see jobs.job_fingerprint
+    options TEXT  -- JSON keyword arguments the job was queued with, see JobQueue.submit
+)
+"""
+
+# One row per finished or failed part of a job, so interrupted jobs can resume
+CREATE_JOB_PARTS_TABLE = """
+CREATE TABLE IF NOT EXISTS audio_job_parts (
+    job_id TEXT NOT NULL,  -- audio_jobs.id
+    part_index INTEGER NOT NULL,
+    status TEXT NOT NULL,  -- 'completed', 'failed'
+    segment_file TEXT,
+    request_id TEXT,
+    error TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (job_id, part_index)
 )
 """
 
+UPSERT_JOB_PART = """
+INSERT INTO audio_job_parts (job_id, part_index, status, segment_file, request_id, error, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(job_id, part_index) DO UPDATE SET
+    status = excluded.status,
+    segment_file = excluded.segment_file,
+    request_id = excluded.request_id,
+    error = excluded.error,
+    updated_at = excluded.updated_at
+"""
+
+CREATE_JOBS_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_audio_jobs_created_at ON audio_jobs (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audio_jobs_status_created_at ON audio_jobs (status, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audio_jobs_fingerprint ON audio_jobs (fingerprint, updated_at)",
+)
+
+# Columns needed for history listings, skipping the potentially large script_parts blob
+JOB_SUMMARY_COLUMNS = "id, status, output_file, error, created_at, updated_at, total_parts, completed_parts"
+
+INSERT_JOB = """
+INSERT INTO audio_jobs 
+(id, status, script_parts, output_file, error, created_at, updated_at, total_parts, completed_parts, fingerprint)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPDATE_JOB = """
+UPDATE audio_jobs 
+SET status = ?, script_parts = ?, output_file = ?, error = ?, 
+    updated_at = ?, total_parts = ?, completed_parts = ?
+WHERE id = ?
+"""
+
+UPSERT_VOICE = """
+INSERT INTO voices 
+(voice_id, name, category, labels, description, preview_url, 
+ high_quality_base_model_ids, last_updated, content_hash)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(voice_id) DO UPDATE SET
+    name = excluded.name,
+    category = excluded.category,
+    labels = excluded.labels,
+    description = excluded.description,
+    preview_url = excluded.preview_url,
+    high_quality_base_model_ids = excluded.high_quality_base_model_ids,
+    last_updated = excluded.last_updated,
+    content_hash = excluded.content_hash
+"""
+
+SET_METADATA = """
+INSERT INTO metadata (key, value) VALUES (?, ?)
+ON CONFLICT(key) DO UPDATE SET value = excluded.value
+"""
+
+# Applied once when the shared connection is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -8000",  # 8 MB page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Observes the duration of a Database method, labelled with its name
+timed_query = metrics.timed("elevenlabs_db_query_seconds")
+
+
 class Database:
     CACHE_DURATION_SECONDS = 24 * 60 * 60  # 24 hours
+    HISTORY_PAGE_SIZE = 50
+    MAX_HISTORY_PAGE_SIZE = 500
+    # Prepared statements kept per connection by the sqlite3 module
+    CACHED_STATEMENTS = 128
+
     def __init__(self, db_path: str = DATABASE_PATH):
         self.db_path = db_path
         # Ensure output directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # Long-lived connection shared by all methods, opened on first use
+        self._db: Optional[aiosqlite.Connection] = None
+        self._connect_lock = asyncio.Lock()
+        # Serializes write transactions on the shared connection
+        self._write_lock = asyncio.Lock()
+
+    async def _connection(self) -> aiosqlite.Connection:
+        """Return the shared connection, opening and tuning it on first use."""
+        if self._db is not None:
+            return self._db
+        async with self._connect_lock:
+            if self._db is None:
+                db = await aiosqlite.connect(self.db_path, cached_statements=self.CACHED_STATEMENTS)
+                db.row_factory = aiosqlite.Row
+                for pragma in CONNECTION_PRAGMAS:
+                    await db.execute(pragma)
+                self._db = db
+        return self._db
+
+    async def close(self) -> None:
+        """Close the shared connection. It is reopened automatically on next use."""
+        if self._db is not None:
+            db, self._db = self._db, None
+            await db.close()
+
+    async def _write(self, sql: str, parameters: tuple = ()) -> aiosqlite.Cursor:
+        """Execute a single write statement in its own transaction."""
+        async with self._write_lock:
+            db = await self._connection()
+            cursor = await db.execute(sql, parameters)
+            await db.commit()
+            return cursor
         
+    @timed_query
     async def initialize(self):
         """Initialize database and create tables if they don't exist."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._write_lock:
+            db = await self._connection()
             # Create tables one at a time
             await db.execute(CREATE_VOICES_TABLE)
             await db.execute(CREATE_JOBS_TABLE)
+            await db.execute(CREATE_METADATA_TABLE)
+            await db.execute(CREATE_JOB_PARTS_TABLE)
+            for table, column, declaration in ADDED_COLUMNS:
+                async with db.execute(f"PRAGMA table_info({table})") as cursor:
+                    existing = {row["name"] for row in await cursor.fetchall()}
+                if column not in existing:
+                    await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+            # Indexes may cover added columns, so they come last
+            for statement in CREATE_JOBS_INDEXES:
+                await db.execute(statement)
             await db.commit()
 
+    @staticmethod
+    def _job_from_row(row: aiosqlite.Row) -> AudioJob:
+        return AudioJob.from_dict({
+            "id": row["id"],
+            "status": row["status"],
+            "script_parts": json.loads(row["script_parts"]),
+            "output_file": row["output_file"],
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "total_parts": row["total_parts"],
+            "completed_parts": row["completed_parts"],
+            "fingerprint": row["fingerprint"],
+            "options": json.loads(row["options"]) if row["options"] else None
+        })
+
+    @timed_query
     async def insert_job(self, job: AudioJob) -> None:
         """Insert a new audio job into the database."""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                INSERT INTO audio_jobs 
-                (id, status, script_parts, output_file, error, created_at, updated_at, total_parts, completed_parts)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    job.id,
-                    job.status,
-                    json.dumps(job.script_parts),
-                    job.output_file,
-                    job.error,
-                    job.created_at.isoformat(),
-                    job.updated_at.isoformat(),
-                    job.total_parts,
-                    job.completed_parts
-                )
+        await self._write(
+            INSERT_JOB,
+            (
+                job.id,
+                job.status,
+                json.dumps(job.script_parts),
+                job.output_file,
+                job.error,
+                job.created_at.isoformat(),
+                job.updated_at.isoformat(),
+                job.total_parts,
+                job.completed_parts,
+                job.fingerprint
             )
-            await db.commit()
+        )
 
+    @timed_query
     async def update_job(self, job: AudioJob) -> None:
         """Update an existing audio job in the database."""
         job.updated_at = datetime.utcnow()
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                UPDATE audio_jobs 
-                SET status = ?, script_parts = ?, output_file = ?, error = ?, 
-                    updated_at = ?, total_parts = ?, completed_parts = ?
-                WHERE id = ?
-                """,
-                (
-                    job.status,
-                    json.dumps(job.script_parts),
-                    job.output_file,
-                    job.error,
-                    job.updated_at.isoformat(),
-                    job.total_parts,
-                    job.completed_parts,
-                    job.id
-                )
+        await self._write(
+            UPDATE_JOB,
+            (
+                job.status,
+                json.dumps(job.script_parts),
+                job.output_file,
+                job.error,
+                job.updated_at.isoformat(),
+                job.total_parts,
+                job.completed_parts,
+                job.id
             )
-            await db.commit()
+        )
+
+    @timed_query
+    async def set_job_options(self, job_id: str, options: dict) -> None:
+        """Record the keyword arguments a job was queued with, so a resumed job runs the same way."""
+        await self._write("UPDATE audio_jobs SET options = ? WHERE id = ?", (json.dumps(options), job_id))
 
+    @timed_query
+    async def update_job_progress(self, job_id: str, completed_parts: int) -> None:
+        """Record how many parts of a running job are done, without rewriting the whole row."""
+        await self._write(
+            "UPDATE audio_jobs SET completed_parts = ?, updated_at = ? WHERE id = ?",
+            (completed_parts, datetime.utcnow().isoformat(), job_id)
+        )
+
+    @timed_query
     async def get_job(self, job_id: str) -> Optional[AudioJob]:
         """Get a specific audio job by ID."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute(
-                "SELECT * FROM audio_jobs WHERE id = ?", (job_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if row is None:
-                    return None
-                return AudioJob.from_dict({
-                    "id": row["id"],
-                    "status": row["status"],
-                    "script_parts": json.loads(row["script_parts"]),
-                    "output_file": row["output_file"],
-                    "error": row["error"],
-                    "created_at": row["created_at"],
-                    "updated_at": row["updated_at"],
-                    "total_parts": row["total_parts"],
-                    "completed_parts": row["completed_parts"]
-                })
+        db = await self._connection()
+        async with db.execute(
+            "SELECT * FROM audio_jobs WHERE id = ?", (job_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            return self._job_from_row(row)
+
+    @timed_query
+    async def find_job_by_fingerprint(self, fingerprint: str, status: str,
+                                      updated_after: Optional[str] = None) -> Optional[AudioJob]:
+        """Most recently updated job with the given fingerprint and status, optionally updated after an ISO timestamp."""
+        sql = "SELECT * FROM audio_jobs WHERE fingerprint = ? AND status = ?"
+        parameters = [fingerprint, status]
+        if updated_after:
+            sql += " AND updated_at >= ?"
+            parameters.append(updated_after)
+        db = await self._connection()
+        async with db.execute(f"{sql} ORDER BY updated_at DESC LIMIT 1", tuple(parameters)) as cursor:
+            row = await cursor.fetchone()
+            return self._job_from_row(row) if row is not None else None
 
+    @timed_query
     async def get_all_jobs(self) -> List[AudioJob]:
         """Get all audio jobs."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("SELECT * FROM audio_jobs ORDER BY created_at DESC") as cursor:
-                rows = await cursor.fetchall()
-                return [AudioJob.from_dict({
-                    "id": row["id"],
-                    "status": row["status"],
-                    "script_parts": json.loads(row["script_parts"]),
-                    "output_file": row["output_file"],
-                    "error": row["error"],
-                    "created_at": row["created_at"],
-                    "updated_at": row["updated_at"],
-                    "total_parts": row["total_parts"],
-                    "completed_parts": row["completed_parts"]
-                }) for row in rows]
+        db = await self._connection()
+        async with db.execute("SELECT * FROM audio_jobs ORDER BY created_at DESC") as cursor:
+            rows = await cursor.fetchall()
+            return [self._job_from_row(row) for row in rows]
+
+    @timed_query
+    async def list_jobs(self, limit: Optional[int] = None, cursor: Optional[str] = None,
+                        statuses: Optional[List[str]] = None, created_after: Optional[str] = None,
+                        created_before: Optional[str] = None, summary: bool = True) -> tuple[List[dict], Optional[str]]:
+        """
+        Get one page of jobs, newest first.
+
+        cursor is "<created_at>,<id>" of the last job on the previous page (keyset pagination,
+        so it stays valid when that job is deleted), statuses
+        and the created_after/created_before ISO timestamps filter the results. With summary
+        the script_parts column is neither read nor decoded.
+        Returns tuple of (jobs as dicts, next_cursor) where next_cursor is None on the last page.
+        """
+        limit = max(1, min(limit or self.HISTORY_PAGE_SIZE, self.MAX_HISTORY_PAGE_SIZE))
+        clauses = []
+        parameters: list = []
+        if cursor:
+            created_at, separator, job_id = cursor.partition(",")
+            if not separator or not job_id:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            clauses.append("(created_at, id) < (?, ?)")
+            parameters.extend((datetime.fromisoformat(created_at).isoformat(), job_id))
+        if statuses:
+            clauses.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            parameters.extend(statuses)
+        if created_after:
+            clauses.append("created_at >= ?")
+            parameters.append(created_after)
+        if created_before:
+            clauses.append("created_at < ?")
+            parameters.append(created_before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        columns = JOB_SUMMARY_COLUMNS if summary else "*"
+        # Fetch one extra row to find out whether another page exists
+        parameters.append(limit + 1)
+
+        db = await self._connection()
+        async with db.execute(
+            f"SELECT {columns} FROM audio_jobs {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+            tuple(parameters)
+        ) as result:
+            rows = await result.fetchall()
+
+        next_cursor = f"{rows[limit - 1]['created_at']},{rows[limit - 1]['id']}" if len(rows) > limit else None
+        rows = rows[:limit]
+        if summary:
+            jobs = [self._summary_from_row(row).to_summary_dict() for row in rows]
+        else:
+            jobs = [self._job_from_row(row).to_dict() for row in rows]
+        return jobs, next_cursor
+
+    @staticmethod
+    def _summary_from_row(row: aiosqlite.Row) -> AudioJob:
+        return AudioJob.from_dict({
+            "id": row["id"],
+            "status": row["status"],
+            "script_parts": [],
+            "output_file": row["output_file"],
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "total_parts": row["total_parts"],
+            "completed_parts": row["completed_parts"]
+        })
 
+    @timed_query
+    async def get_jobs_by_status(self, statuses: List[str]) -> List[AudioJob]:
+        """Get audio jobs in any of the given statuses, oldest first."""
+        placeholders = ", ".join("?" for _ in statuses)
+        db = await self._connection()
+        async with db.execute(
+            f"SELECT * FROM audio_jobs WHERE status IN ({placeholders}) ORDER BY created_at ASC",
+            tuple(statuses)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [self._job_from_row(row) for row in rows]
+
+    @timed_query
     async def delete_job(self, job_id: str) -> bool:
-        """Delete an audio job by ID. Returns True if job was deleted."""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("DELETE FROM audio_jobs WHERE id = ?", (job_id,))
-            deleted = cursor.rowcount > 0
-            await db.commit()
-            return deleted
+        """Delete an audio job and its part records by ID. Returns True if job was deleted."""
+        async with self._write_lock:
+            db = await self._connection()
+            try:
+                await db.execute("DELETE FROM audio_job_parts WHERE job_id = ?", (job_id,))
+                cursor = await db.execute("DELETE FROM audio_jobs WHERE id = ?", (job_id,))
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        return cursor.rowcount > 0
+
+    @timed_query
+    async def save_job_part(self, job_id: str, part_index: int, status: str, segment_file: Optional[str] = None,
+                            request_id: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Record the outcome of one part of a job, replacing any earlier attempt."""
+        await self._write(
+            UPSERT_JOB_PART,
+            (job_id, part_index, status, segment_file, request_id, error, datetime.utcnow().isoformat())
+        )
+
+    @timed_query
+    async def delete_job_parts(self, job_id: str) -> None:
+        """Delete the part records of a job, keeping the job itself."""
+        await self._write("DELETE FROM audio_job_parts WHERE job_id = ?", (job_id,))
 
+    @timed_query
+    async def get_job_parts(self, job_id: str) -> List[dict]:
+        """Recorded parts of a job, ordered by part index."""
+        db = await self._connection()
+        async with db.execute(
+            "SELECT part_index, status, segment_file, request_id, error, updated_at "
+            "FROM audio_job_parts WHERE job_id = ? ORDER BY part_index",
+            (job_id,)
+        ) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    @timed_query
     async def cleanup(self) -> None:
-        """Delete the database file. Useful for testing."""
-        if os.path.exists(self.db_path):
-            os.remove(self.db_path)
-
-    async def upsert_voices(self, voices: List[dict]) -> None:
-        """Insert or update voice data in the database."""
-        async with aiosqlite.connect(self.db_path) as db:
-            now = datetime.utcnow().isoformat()
-            for voice in voices:
-                await db.execute(
-                    """
-                    INSERT INTO voices 
-                    (voice_id, name, category, labels, description, preview_url, 
-                     high_quality_base_model_ids, last_updated)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(voice_id) DO UPDATE SET
-                        name = excluded.name,
-                        category = excluded.category,
-                        labels = excluded.labels,
-                        description = excluded.description,
-                        preview_url = excluded.preview_url,
-                        high_quality_base_model_ids = excluded.high_quality_base_model_ids,
-                        last_updated = excluded.last_updated
-                    """,
-                    (
-                        voice["voice_id"],
-                        voice["name"],
-                        voice["category"],
-                        json.dumps(voice["labels"]),
-                        voice["description"],
-                        voice["preview_url"],
-                        json.dumps(voice["high_quality_base_model_ids"]),
-                        now
-                    )
-                )
-            await db.commit()
+        """Close the connection and delete the database files. Useful for testing."""
+        await self.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
 
+    @staticmethod
+    def _voice_row(voice: dict) -> tuple:
+        """Column values for a voice, without last_updated and content_hash."""
+        return (
+            voice["voice_id"],
+            voice["name"],
+            voice["category"],
+            json.dumps(voice["labels"], sort_keys=True),
+            voice["description"],
+            voice["preview_url"],
+            json.dumps(voice["high_quality_base_model_ids"]),
+        )
+
+    @timed_query
+    async def upsert_voices(self, voices: List[dict]) -> dict:
+        """
+        Replace the stored catalog with voices in one transaction.
+        Only rows whose content hash changed are written, voices missing from the
+        list are deleted. Returns counts of written, deleted and unchanged voices.
+        """
+        now = datetime.utcnow().isoformat()
+        rows = {}
+        for voice in voices:
+            row = self._voice_row(voice)
+            rows[voice["voice_id"]] = (row, hashlib.sha256(json.dumps(row).encode("utf-8")).hexdigest())
+
+        async with self._write_lock:
+            db = await self._connection()
+            async with db.execute("SELECT voice_id, content_hash FROM voices") as cursor:
+                stored = {row["voice_id"]: row["content_hash"] for row in await cursor.fetchall()}
+            changed = [
+                (*row, now, content_hash)
+                for voice_id, (row, content_hash) in rows.items()
+                if stored.get(voice_id) != content_hash
+            ]
+            vanished = [(voice_id,) for voice_id in stored.keys() - rows.keys()]
+            try:
+                await db.executemany(UPSERT_VOICE, changed)
+                await db.executemany("DELETE FROM voices WHERE voice_id = ?", vanished)
+                await db.execute(SET_METADATA, (VOICES_REFRESHED_AT, now))
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        return {"written": len(changed), "deleted": len(vanished), "unchanged": len(rows) - len(changed)}
+
+    @timed_query
+    async def get_voices_age(self) -> Optional[float]:
+        """Seconds since the voice catalog was last refreshed, None if it never was."""
+        db = await self._connection()
+        async with db.execute("SELECT value FROM metadata WHERE key = ?", (VOICES_REFRESHED_AT,)) as cursor:
+            refreshed = await cursor.fetchone()
+        if refreshed is not None:
+            refreshed_at = refreshed["value"]
+        else:
+            # Catalogs stored before the refresh time was recorded are as old as their oldest row
+            async with db.execute("SELECT MIN(last_updated) AS oldest FROM voices") as cursor:
+                refreshed_at = (await cursor.fetchone())["oldest"]
+        if refreshed_at is None:
+            return None
+        return (datetime.utcnow() - datetime.fromisoformat(refreshed_at)).total_seconds()
+
+    @timed_query
     async def get_voices(self, max_age_seconds: Optional[int] = None) -> tuple[List[dict], bool]:
         """
         Get all voices from the database.
         Returns tuple of (voices, needs_refresh) where needs_refresh indicates if cache is stale.
         """
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("SELECT * FROM voices ORDER BY name") as cursor:
-                rows = await cursor.fetchall()
+        db = await self._connection()
+        async with db.execute("SELECT value FROM metadata WHERE key = ?", (VOICES_REFRESHED_AT,)) as cursor:
+            refreshed = await cursor.fetchone()
+        async with db.execute("SELECT * FROM voices ORDER BY name") as cursor:
+            rows = await cursor.fetchall()
+            
+            voices = []
+            needs_refresh = False
+            
+            if not rows:
+                needs_refresh = True
+            else:
+                max_age = max_age_seconds or self.CACHE_DURATION_SECONDS
+                now = datetime.utcnow()
+                if refreshed is not None:
+                    needs_refresh = (now - datetime.fromisoformat(refreshed["value"])).total_seconds() > max_age
                 
-                voices = []
-                needs_refresh = False
-                
-                if not rows:
-                    needs_refresh = True
-                else:
-                    max_age = max_age_seconds or self.CACHE_DURATION_SECONDS
-                    now = datetime.utcnow()
-                    
-                    for row in rows:
+                for row in rows:
+                    # Catalogs stored before the refresh time was recorded fall back to row ages
+                    if refreshed is None:
                         last_updated = datetime.fromisoformat(row["last_updated"])
                         age = (now - last_updated).total_seconds()
                         
                         if age > max_age:
                             needs_refresh = True
-                            
-                        voices.append({
-                            "voice_id": row["voice_id"],
-                            "name": row["name"],
-                            "category": row["category"],
-                            "labels": json.loads(row["labels"]),
-                            "description": row["description"],
-                            "preview_url": row["preview_url"],
-                            "high_quality_base_model_ids": json.loads(row["high_quality_base_model_ids"])
-                        })
-                
-                return voices, needs_refresh
+                        
+                    voices.append({
+                        "voice_id": row["voice_id"],
+                        "name": row["name"],
+                        "category": row["category"],
+                        "labels": json.loads(row["labels"]),
+                        "description": row["description"],
+                        "preview_url": row["preview_url"],
+                        "high_quality_base_model_ids": json.loads(row["high_quality_base_model_ids"])
+                    })
+            
+            return voices, needs_refresh
@@ -0,0 +1,120 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+LEVELS = {"off": 0, "error": 1, "info": 2, "debug": 3}
+
+
+class DebugInfo:
+    """
+    Bounded, level-gated diagnostics for a single request or job.
+
+    Messages are recorded logging style, as a format string plus arguments, and only
+    formatted when read, so disabled or evicted entries never cost any string
+    building. Only the newest max_entries entries are kept and each formatted
+    message is cut to max_chars. The level, ELEVENLABS_DEBUG_INFO, is off by default.
+    Per-job totals added with count() go to summary, which is kept at every level.
+    """
+
+    def __init__(self, level: Optional[str] = None, max_entries: Optional[int] = None,
+                 max_chars: Optional[int] = None):
+        level = (level or os.getenv("ELEVENLABS_DEBUG_INFO", "off")).lower()
+        self.level = LEVELS.get(level, 0)
+        if max_entries is None:
+            max_entries = int(os.getenv("ELEVENLABS_DEBUG_INFO_MAX_ENTRIES", "200"))
+        if max_chars is None:
+            max_chars = int(os.getenv("ELEVENLABS_DEBUG_INFO_MAX_CHARS", "1000"))
+        self.max_chars = max_chars
+        # (timestamp, level name, message, args), appends are atomic so worker threads can share it
+        self._entries: deque = deque(maxlen=max(1, max_entries))
+        self.dropped = 0
+        self.summary: Dict[str, int] = {}
+
+    def enabled(self, level: str) -> bool:
+        return 0 < LEVELS[level] <= self.level
+
+    def _record(self, level: str, message: str, args: tuple) -> None:
+        if not self.enabled(level):
+            return
+        if len(self._entries) == self._entries.maxlen:
+            self.dropped += 1
+        self._entries.append((datetime.now(), level, message, args))
+
+    def error(self, message: str, *args) -> None:
+        self._record("error", message, args)
+
+    def info(self, message: str, *args) -> None:
+        self._record("info", message, args)
+
+    def debug(self, message: str, *args) -> None:
+        self._record("debug", message, args)
+
+    def count(self, key: str, value: int) -> None:
+        """Add value to the summary total key."""
+        self.summary[key] = self.summary.get(key, 0) + value
+
+    def extend(self, other: Union["DebugInfo", Iterable[str]]) -> None:
+        """Append the entries of another DebugInfo, or plain strings at info level."""
+        if isinstance(other, DebugInfo):
+            for entry in list(other._entries):
+                if self.enabled(entry[1]):
+                    self._entries.append(entry)
+            self.dropped += other.dropped
+            for key, value in other.summary.items():
+                self.count(key, value)
+        else:
+            for line in other:
+                self.info("%s", line)
+
+    def _format(self, entry: tuple) -> str:
+        _, _, message, args = entry
+        if args:
+            try:
+                message = message % args
+            except (TypeError, ValueError):
+                message = " ".join([message, *map(str, args)])
+        if len(message) > self.max_chars:
+            message = f"{message[:self.max_chars]}... [{len(message) - self.max_chars} chars truncated]"
+        return message
+
+    def __iter__(self) -> Iterator[str]:
+        for entry in list(self._entries):
+            yield self._format(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def to_list(self) -> List[Dict]:
+        """Entries as dicts with timestamp, level and message."""
+        return [
+            {"timestamp": entry[0].isoformat(), "level": entry[1], "message": self._format(entry)}
+            for entry in list(self._entries)
+        ]
+
+
+class DebugInfoStore:
+    """Debug info of the most recent jobs, kept in memory so it can be fetched per job."""
+
+    def __init__(self, max_jobs: Optional[int] = None):
+        if max_jobs is None:
+            max_jobs = int(os.getenv("ELEVENLABS_DEBUG_INFO_JOBS", "100"))
+        self.max_jobs = max(1, max_jobs)
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, DebugInfo]" = OrderedDict()
+
+    def put(self, job_id: str, debug_info: DebugInfo) -> None:
+        with self._lock:
+            self._jobs[job_id] = debug_info
+            self._jobs.move_to_end(job_id)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[DebugInfo]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
@@ -0,0 +1,68 @@
+import logging
+
+import anyio
+import mcp.types as types
+from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
+from mcp.server import Server, request_ctx
+from mcp.server.models import InitializationOptions
+from mcp.server.session import ServerSession
+from mcp.shared.context import RequestContext
+from mcp.shared.exceptions import McpError
+from mcp.shared.session import RequestResponder
+
+
+class ConcurrentServer(Server):
+    """
+    MCP server that handles every request in its own task.
+
+    mcp's Server.run awaits each request before reading the next message, so one
+    long generate_audio_* call would hold up every later call on the connection,
+    including history reads and cancel_job. Here requests are answered as they
+    finish, in any order; notifications are still handled in arrival order.
+    """
+
+    async def run(
+        self,
+        read_stream: MemoryObjectReceiveStream[types.JSONRPCMessage | Exception],
+        write_stream: MemoryObjectSendStream[types.JSONRPCMessage],
+        initialization_options: InitializationOptions,
+        raise_exceptions: bool = False,
+    ):
+        async with ServerSession(read_stream, write_stream, initialization_options) as session:
+            async with anyio.create_task_group() as tg:
+                async for message in session.incoming_messages:
+                    match message:
+                        case RequestResponder(request=types.ClientRequest(root=req)):
+                            tg.start_soon(self._handle_request, message, req, session, raise_exceptions)
+                        case types.ClientNotification(root=notify):
+                            await self._handle_notification(notify)
+
+    async def _handle_request(self, message: RequestResponder, req, session: ServerSession,
+                              raise_exceptions: bool) -> None:
+        handler = self.request_handlers.get(type(req))
+        if handler is None:
+            await message.respond(types.ErrorData(code=types.METHOD_NOT_FOUND, message="Method not found"))
+            return
+        logging.debug(f"Dispatching request of type {type(req).__name__}")
+        # The context is per task, so concurrent handlers each see their own request
+        token = request_ctx.set(RequestContext(message.request_id, message.request_meta, session))
+        try:
+            response = await handler(req)
+        except McpError as err:
+            response = err.error
+        except Exception as err:
+            if raise_exceptions:
+                raise
+            response = types.ErrorData(code=0, message=str(err), data=None)
+        finally:
+            request_ctx.reset(token)
+        await message.respond(response)
+
+    async def _handle_notification(self, notify) -> None:
+        handler = self.notification_handlers.get(type(notify))
+        if handler is None:
+            return
+        try:
+            await handler(notify)
+        except Exception as err:
+            logging.error(f"Uncaught exception in notification handler: {err}")
@@ -1,9 +1,13 @@
+import asyncio
 import logging
 import os
+import tempfile
 import time
+import uuid
+import httpx
 import requests
 from pathlib import Path
-from typing import Dict, List, Optional, TypedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypedDict
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -29,51 +33,181 @@ class VoiceData(TypedDict):
     high_quality_base_model_ids: List[str]
 from pydub import AudioSegment
 import io
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import aclosing
 from datetime import datetime
-from tenacity import retry, stop_after_attempt, wait_exponential
+from itertools import islice
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+from .audio import IncrementalAssembler, leading_header_size
+from .cache import SynthesisCache
+from .checkpoints import JobCheckpoint
+from .context import ContextWindows
+from .diagnostics import DebugInfo
+from .metrics import metrics
+from .ratelimit import AdaptiveLimiter, parse_retry_after
+
+
+class ElevenLabsAPIError(Exception):
+    """A failed ElevenLabs request. status_code is None when no response arrived."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+MAX_RETRY_WAIT = 10
+_backoff = wait_exponential(multiplier=1, min=4, max=MAX_RETRY_WAIT)
+
+
+def _retry_wait(retry_state) -> float:
+    """
+    Wait as long as the server asked for, exponential backoff otherwise. Either way
+    no longer than MAX_RETRY_WAIT, so a huge Retry-After cannot stall a job.
+    """
+    error = retry_state.outcome.exception()
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        return _backoff(retry_state)
+    return min(retry_after, MAX_RETRY_WAIT)
+
+
+def _count_retry(retry_state) -> None:
+    metrics.inc("elevenlabs_api_retries_total", function=retry_state.fn.__name__)
+
+
+# Only network errors, 429s and 5xx are worth another attempt
+retry_request = retry(
+    stop=stop_after_attempt(3),
+    wait=_retry_wait,
+    retry=retry_if_exception(lambda e: isinstance(e, ElevenLabsAPIError) and e.retryable),
+    before_sleep=_count_retry
+)
+
+
+def response_outcome(response) -> tuple[int, Optional[float]]:
+    """(status code, Retry-After seconds) of a response, as reported to the rate limiter"""
+    return response.status_code, parse_retry_after(response.headers.get("retry-after"))
+
+
+def record_request(endpoint: str, model_id: str, started: float, response=None,
+                   received: Optional[int] = None) -> None:
+    """
+    Record one API request in the shared metrics. response is None when no complete
+    response arrived; received overrides the body size for streamed responses.
+    """
+    labels = {"endpoint": endpoint, "model": model_id}
+    metrics.observe("elevenlabs_api_request_seconds", time.perf_counter() - started, **labels)
+    if response is None:
+        metrics.inc("elevenlabs_api_responses_total", status="error", **labels)
+        return
+    metrics.inc("elevenlabs_api_responses_total", status=response.status_code, **labels)
+    if response.status_code == 429:
+        metrics.inc("elevenlabs_api_throttled_total", **labels)
+    metrics.inc("elevenlabs_api_bytes_sent_total", int(response.request.headers.get("content-length") or 0), **labels)
+    metrics.inc("elevenlabs_api_bytes_received_total",
+                len(response.content) if received is None else received, **labels)
+
+
+def decode_and_export(audio_parts: List[bytes], output_file: str) -> None:
+    """Decode MP3 parts, join the PCM in one pass and re-encode the result with ffmpeg."""
+    segments = [AudioSegment.from_mp3(io.BytesIO(content)) for content in audio_parts]
+    first = segments[0]
+    # Match every segment to the first one so the raw PCM can be joined directly
+    matched = [
+        segment.set_frame_rate(first.frame_rate).set_channels(first.channels).set_sample_width(first.sample_width)
+        for segment in segments
+    ]
+    final_audio = first._spawn(b"".join(segment.raw_data for segment in matched))
+    final_audio.export(output_file, format="mp3")
+
+
+def create_encode_executor(kind: Optional[str] = None, workers: Optional[int] = None) -> Executor:
+    """
+    Create the executor used for the CPU bound decode/export step.
+    kind is 'thread' or 'process' (ELEVENLABS_ENCODE_EXECUTOR), workers defaults to
+    ELEVENLABS_ENCODE_WORKERS.
+    """
+    kind = (kind or os.getenv("ELEVENLABS_ENCODE_EXECUTOR", "thread")).lower()
+    workers = workers or max(1, int(os.getenv("ELEVENLABS_ENCODE_WORKERS", "2")))
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind != "thread":
+        raise ValueError(f"Invalid encode executor: {kind}. Must be 'thread' or 'process'")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="elevenlabs-encode")
 
 class ElevenLabsAPI:
     # Add model list as class constant
     MODELS = {
         "eleven_multilingual_v2": {"description": "Our most lifelike model with rich emotional expression", "languages": "32",
-                                   "supports_stitching": True, "supports_style": True, "wait_time": 0.1},
+                                   "supports_stitching": True, "supports_style": True},
         "eleven_flash_v2_5": {"description": "Ultra-fast model optimized for real-time use (~75ms†)", "languages": "32",
-                              "supports_stitching": False, "supports_style": False, "wait_time": 0.1},
+                              "supports_stitching": False, "supports_style": False},
         "eleven_flash_v2": {"description": "Ultra-fast model optimized for real-time use (~75ms†)", "languages": "English",
-                             "supports_stitching": False, "supports_style": False, "wait_time": 0.1}
+                             "supports_stitching": False, "supports_style": False}
     }
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @retry_request
     def get_voices(self) -> List[VoiceData]:
         """Fetch available voices from ElevenLabs API"""
-        headers = {
+        outcome = (None, None)
+        self.limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = self.session.get(
+                f"{self.base_url}/voices",
+                headers=self._voices_headers()
+            )
+            outcome = response_outcome(response)
+        except requests.exceptions.RequestException as e:
+            raise ElevenLabsAPIError(f"Network error fetching voices: {str(e)}") from e
+        finally:
+            self.limiter.release(*outcome)
+            record_request("voices", "", started, response if outcome[0] is not None else None)
+
+        if response.status_code == 200:
+            return self._parse_voices(response.json())
+        else:
+            raise ElevenLabsAPIError(f"Failed to fetch voices: {response.text}", *outcome)
+
+    def _voices_headers(self) -> Dict[str, str]:
+        return {
             "Accept": "application/json",
             "xi-api-key": self.api_key
         }
-        
-        response = requests.get(
-            f"{self.base_url}/voices",
-            headers=headers
-        )
-        
-        if response.status_code == 200:
-            voices_data = response.json()["voices"]
-            return [
-                {
-                    "voice_id": voice["voice_id"],
-                    "name": voice["name"],
-                    "category": voice.get("category", ""),
-                    "labels": voice.get("labels", {}),
-                    "description": voice.get("description", ""),
-                    "preview_url": voice.get("preview_url", ""),
-                    "high_quality_base_model_ids": voice.get("high_quality_base_model_ids", [])
-                }
-                for voice in voices_data
-            ]
-        else:
-            raise Exception(f"Failed to fetch voices: {response.text}")
+
+    @staticmethod
+    def _parse_voices(payload: Dict) -> List[VoiceData]:
+        """Normalize the /voices response into VoiceData records"""
+        return [
+            {
+                "voice_id": voice["voice_id"],
+                "name": voice["name"],
+                "category": voice.get("category", ""),
+                "labels": voice.get("labels", {}),
+                "description": voice.get("description", ""),
+                "preview_url": voice.get("preview_url", ""),
+                "high_quality_base_model_ids": voice.get("high_quality_base_model_ids", [])
+            }
+            for voice in payload["voices"]
+        ]
 
     def __init__(self):
+        self._configure()
+        # Keep-alive session shared by all requests, sized for the part workers
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _configure(self) -> None:
+        """Settings, cache and rate limiter shared by the sync and async clients"""
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
         if not self.api_key:
             logging.error("ELEVENLABS_API_KEY environment variable not set")
@@ -91,13 +225,37 @@ class ElevenLabsAPI:
         self.stability = float(os.getenv("ELEVENLABS_STABILITY", "0.5"))
         self.similarity_boost = float(os.getenv("ELEVENLABS_SIMILARITY_BOOST", "0.75"))
         self.style = float(os.getenv("ELEVENLABS_STYLE", "0.1"))
-        self.base_url = "https://api.elevenlabs.io/v1"
+        # Overridable to point at a proxy or a local stand-in such as benchmarks/fake_elevenlabs.py
+        self.base_url = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io/v1").rstrip("/")
+        # Number of parts synthesized concurrently by generate_full_audio
+        self.max_workers = max(1, int(os.getenv("ELEVENLABS_MAX_WORKERS", "4")))
+        # Chain previous_request_ids between parts (forces sequential generation)
+        self.stitch_request_ids = os.getenv("ELEVENLABS_STITCH_REQUEST_IDS", "false").lower() in ("1", "true", "yes")
+        # Per-side budget for previous_text/next_text, 0 (the default) sends the whole script
+        self.context_max_chars = max(0, int(os.getenv("ELEVENLABS_CONTEXT_MAX_CHARS", "1000")))
+        self.context_max_sentences = max(0, int(os.getenv("ELEVENLABS_CONTEXT_MAX_SENTENCES", "0")))
+        # Content-addressed cache of synthesized segments
+        cache_enabled = os.getenv("ELEVENLABS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.cache: Optional[SynthesisCache] = SynthesisCache() if cache_enabled else None
+        # Admission control shared by every request this client sends
+        self.limiter = AdaptiveLimiter()
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def generate_audio_segment(self, text: str, voice_id: str, output_file: Optional[str] = None,
-                      previous_text: Optional[str] = None, next_text: Optional[str] = None,
-                      previous_request_ids: Optional[List[str]] = None, debug_info: Optional[List[str]] = None) -> tuple[bytes, str]:
-        """Generate audio using specified voice with context conditioning"""
+    def synthesis_settings(self) -> Dict:
+        """Settings that, besides the script itself, determine the audio of a job"""
+        return {
+            "voice_id": self.voice_id,
+            "model_id": self.model_id,
+            "stability": self.stability,
+            "similarity_boost": self.similarity_boost,
+            "style": self.style,
+            "context_max_chars": self.context_max_chars,
+            "context_max_sentences": self.context_max_sentences,
+            "stitch_request_ids": self.stitch_request_ids
+        }
+
+    def _build_tts_request(self, text: str, previous_text: Optional[str] = None, next_text: Optional[str] = None,
+                           previous_request_ids: Optional[List[str]] = None) -> tuple[Dict[str, str], Dict]:
+        """Build the headers and JSON body for a text-to-speech request"""
         headers = {
             "Accept": "application/json",
             "xi-api-key": self.api_key,
@@ -125,137 +283,851 @@ class ElevenLabsAPI:
             if previous_request_ids:
                 data["previous_request_ids"] = previous_request_ids[-3:]  # Maximum of 3 previous IDs
         
+        return headers, data
+
+    def _handle_tts_response(self, status_code: int, content: bytes, response_headers, response_text: str,
+                             data: Dict, output_file: Optional[str], debug_info: Optional[DebugInfo]) -> tuple[bytes, str]:
+        """Validate a text-to-speech response and return (audio bytes, request id)"""
+        logging.debug(f"API response status: {status_code}")
+        
+        if status_code == 200:
+            logging.info("Audio generation successful")
+            self._write_output(output_file, content)
+            return content, response_headers["request-id"]
+        else:
+            if debug_info is not None:
+                debug_info.error("API error %s: %s", status_code, response_text)
+            error_message = f"Failed to generate audio: {response_text} \n\n{data}"
+            logging.error(f"API error response: {status_code}")
+            logging.error(f"API error details: {response_text}")
+            logging.error(f"Request data: {data}")
+            raise ElevenLabsAPIError(
+                error_message, status_code, parse_retry_after(response_headers.get("retry-after"))
+            )
+
+    def _cache_key(self, voice_id: str, data: Dict, bypass_cache: bool) -> Optional[str]:
+        """Cache key for a request, or None when the cache is disabled or bypassed"""
+        if self.cache is None or bypass_cache:
+            return None
+        return self.cache.make_key(voice_id, data)
+
+    @staticmethod
+    def _write_output(output_file: Optional[str], content: bytes) -> None:
+        if output_file:
+            with open(output_file, 'wb') as f:
+                f.write(content)
+
+    @retry_request
+    def generate_audio_segment(self, text: str, voice_id: str, output_file: Optional[str] = None,
+                      previous_text: Optional[str] = None, next_text: Optional[str] = None,
+                      previous_request_ids: Optional[List[str]] = None, debug_info: Optional[DebugInfo] = None,
+                      bypass_cache: bool = False) -> tuple[bytes, str]:
+        """Generate audio using specified voice with context conditioning, served from the cache when possible"""
+        headers, data = self._build_tts_request(text, previous_text, next_text, previous_request_ids)
+
+        cache_key = self._cache_key(voice_id, data, bypass_cache)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            metrics.inc("elevenlabs_cache_lookups_total", result="miss" if cached is None else "hit")
+            if cached is not None:
+                logging.info(f"Serving {len(text)} chars for voice_id {voice_id} from synthesis cache")
+                self._write_output(output_file, cached[0])
+                return cached
+        
         logging.info(f"Generating audio for text length: {len(text)} chars using voice_id: {voice_id}")
         logging.debug(f"Generation parameters: stability={self.stability}, similarity_boost={self.similarity_boost}, model={self.model_id}")
         
+        outcome = (None, None)
+        self.limiter.acquire()
+        started = time.perf_counter()
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/text-to-speech/{voice_id}",
                 json=data,
                 headers=headers
             )
-            
-            logging.debug(f"API response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                logging.info("Audio generation successful")
-                if output_file:
-                    with open(output_file, 'wb') as f:
-                        f.write(response.content)
-                return response.content, response.headers["request-id"]
-            else:
-                debug_info.append(response.text)
-                error_message = f"Failed to generate audio: {response.text} \n\n{debug_info} \n\n{data}"
-                logging.error(f"API error response: {response.status_code}")
-                logging.error(f"API error details: {response.text}")
-                logging.error(f"Request data: {data}")
-                raise Exception(error_message)
+            outcome = response_outcome(response)
         except requests.exceptions.RequestException as e:
             error_message = f"Network error during API call: {str(e)}"
             logging.error(error_message)
-            raise Exception(error_message)
+            raise ElevenLabsAPIError(error_message) from e
+        finally:
+            self.limiter.release(*outcome)
+            record_request("text_to_speech", self.model_id, started, response if outcome[0] is not None else None)
 
-    def generate_full_audio(self, script_parts: List[Dict], output_dir: Path) -> tuple[str, List[str], int]:
-        """Generate audio for multiple parts using request stitching. Returns tuple of (output_file_path, debug_info, completed_parts)"""
-        # Create output directory if it doesn't exist
-        output_dir.mkdir(exist_ok=True)
-        
-        # Final output file path with unique file name
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        output_file = output_dir / f"full_audio_{timestamp}.mp3"
-        
-        debug_info = []
-        debug_info.append("ElevenLabsAPI - Starting generate_full_audio")
-        debug_info.append(f"Input script_parts: {script_parts}")
-        
-        # Initialize segments list and request IDs tracking
-        segments = []
-        previous_request_ids = []
-        failed_parts = []
-        completed_parts = 0
-        
-        debug_info.append("Processing all_texts")
+        result = self._handle_tts_response(
+            response.status_code, response.content, response.headers, response.text,
+            data, output_file, debug_info
+        )
+        if cache_key is not None:
+            self.cache.put(cache_key, *result)
+        return result
+
+    def _synthesize_part(self, part: Dict, previous_request_ids: Optional[List[str]],
+                         debug_info: DebugInfo, bypass_cache: bool = False) -> tuple[bytes, str]:
+        """Synthesize a single planned part"""
+        logging.info(f"Processing part {part['index']+1}/{part['total']}")
+        logging.info(f"Text length: {len(part['text'])} chars")
+        logging.debug(f"Context - Previous text: {'Yes' if part['previous_text'] else 'No'}, Next text: {'Yes' if part['next_text'] else 'No'}")
+
+        # Generate audio with context conditioning
+        audio_content, request_id = self.generate_audio_segment(
+            text=part["text"],
+            voice_id=part["voice_id"],
+            previous_text=part["previous_text"],
+            next_text=part["next_text"],
+            previous_request_ids=previous_request_ids,
+            debug_info=debug_info,
+            bypass_cache=bypass_cache
+        )
+        return audio_content, request_id
+
+    def _plan_parts(self, script_parts: List[Dict], debug_info: DebugInfo) -> List[Dict]:
+        """Resolve voice and context for every non-empty part so they can be dispatched in any order"""
+        debug_info.debug("Processing all_texts")
         all_texts = []
         for part in script_parts:
-            debug_info.append(f"Processing text from part: {part}")
+            debug_info.debug("Processing text from part: %s", part)
             text = str(part.get('text', ''))
-            debug_info.append(f"Extracted text: {text}")
+            debug_info.debug("Extracted text: %s", text)
             all_texts.append(text)
-        debug_info.append(f"Final all_texts: {all_texts}")
+        debug_info.debug("Final all_texts: %s", all_texts)
         
+        windows = ContextWindows(all_texts, self.context_max_chars, self.context_max_sentences)
+        planned_parts = []
         for i, part in enumerate(script_parts):
-            debug_info.append(f"Processing part {i}: {part}")
+            debug_info.debug("Processing part %s: %s", i, part)
             part_voice_id = part.get('voice_id')
             if not part_voice_id:
                 part_voice_id = self.voice_id
-            text = str(part.get('text', ''))
+            text = all_texts[i]
             if not text:
                 continue
                 
-            debug_info.append(f"Using voice ID: {part_voice_id}")
-            
-            # Determine previous and next text for context
-            is_first = i == 0
-            is_last = i == len(script_parts) - 1
-            
-            previous_text = None if is_first else " ".join(all_texts[:i])
-            next_text = None if is_last else " ".join(all_texts[i + 1:])
+            debug_info.debug("Using voice ID: %s", part_voice_id)
             
-            try:
-                logging.info(f"Processing part {i+1}/{len(script_parts)}")
-                logging.info(f"Text length: {len(text)} chars")
-                logging.debug(f"Context - Previous text: {'Yes' if previous_text else 'No'}, Next text: {'Yes' if next_text else 'No'}")
-                
-                # Generate audio with context conditioning
-                audio_content, request_id = self.generate_audio_segment(
-                    text=text,
-                    voice_id=part_voice_id,
-                    previous_text=previous_text,
-                    next_text=next_text,
-                    previous_request_ids=previous_request_ids,
-                    debug_info=debug_info
-                )
-                
-                debug_info.append(f"Successfully generated audio for part {i}")
-                completed_parts += 1
-                
-                # Add request ID to history
-                previous_request_ids.append(request_id)
-                
-                # Convert audio content to AudioSegment and add to segments
-                audio_segment = AudioSegment.from_mp3(io.BytesIO(audio_content))
-                segments.append(audio_segment)
+            planned_parts.append({
+                "index": i,
+                "total": len(script_parts),
+                "text": text,
+                "voice_id": part_voice_id,
+                "previous_text": windows.previous(i),
+                "next_text": windows.next(i),
+                "part": part
+            })
+        debug_info.count("context_bytes_saved", windows.bytes_saved)
+        logging.info(f"Context budget saved {windows.bytes_saved} bytes of previous_text/next_text")
+        return planned_parts
 
-                # Wait for the specified wait_time
-                time.sleep(self.MODELS[self.model_id]["wait_time"])
-            except Exception as e:
-                debug_info.append(f"Error generating audio: {e}")
-                failed_parts.append(part)
-                continue
+    @staticmethod
+    def new_output_file(output_dir: Path) -> Path:
+        """Unique path for a combined audio file inside output_dir"""
+        # Create output directory if it doesn't exist
+        output_dir.mkdir(exist_ok=True)
         
-        # Combine all segments
-        if segments:
-            final_audio = segments[0]
-            for segment in segments[1:]:
-                final_audio = final_audio + segment
-            
-            # Export combined audio
-            final_audio.export(output_file, format="mp3")
-
-            if failed_parts:
-                debug_info.append(f"Failed parts: {failed_parts}")
-            else:
-                logging.debug("All parts generated successfully")
-                debug_info.append("All parts generated successfully")
-            
-            debug_info.append(f"Model: {self.model_id}")
-            logging.debug(f"Model: {self.model_id}")
-            
-            return str(output_file), debug_info, completed_parts
-        else:
+        # Final output file path with unique file name, jobs can finish within the same second
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        return output_dir / f"full_audio_{timestamp}_{uuid.uuid4().hex[:8]}.mp3"
+
+    def new_assembler(self, output_file: Path) -> IncrementalAssembler:
+        """Assembler that writes parts to output_file as they complete, re-encoding only if it has to"""
+        return IncrementalAssembler(str(output_file), fallback=decode_and_export)
+
+    @staticmethod
+    def _assemble_part(assembler: IncrementalAssembler, planned: Dict, outcome,
+                       failed_parts: List[Dict], debug_info: DebugInfo) -> bool:
+        """Hand one part's (audio, request_id) or exception to the assembler. Returns True on success"""
+        if isinstance(outcome, BaseException):
+            debug_info.error("Error generating audio: %s", outcome)
+            failed_parts.append(planned["part"])
+            assembler.skip(planned["index"])
+            return False
+        assembler.add(planned["index"], outcome[0])
+        debug_info.info("Successfully generated audio for part %s", planned["index"])
+        return True
+
+    def _record_outcome(self, has_audio: bool, failed_parts: List[Dict], debug_info: DebugInfo) -> None:
+        """Record which parts failed in debug_info, raising if nothing was generated at all"""
+        if not has_audio:
             error_msg = "\n".join([
-                "No audio segments were generated. Debug info:",
+                f"No audio segments were generated, {len(failed_parts)} parts failed. Debug info:",
                 *debug_info
             ])
-            logging.error("No audio segments were generated. Debug info: %s", debug_info)
+            logging.error("No audio segments were generated, %s parts failed", len(failed_parts))
             raise Exception(error_msg)
+
+        if failed_parts:
+            debug_info.error("Failed parts: %s", failed_parts)
+        else:
+            logging.debug("All parts generated successfully")
+            debug_info.info("All parts generated successfully")
+        
+        debug_info.info("Model: %s", self.model_id)
+        logging.debug(f"Model: {self.model_id}")
+
+    def generate_full_audio(self, script_parts: List[Dict], output_dir: Path,
+                            max_workers: Optional[int] = None,
+                            stitch_request_ids: Optional[bool] = None,
+                            bypass_cache: bool = False,
+                            debug_info: Optional[DebugInfo] = None) -> tuple[str, DebugInfo, int]:
+        """
+        Generate audio for multiple parts and combine them in script order.
+        Returns tuple of (output_file_path, debug_info, completed_parts)
+
+        Parts are synthesized concurrently on up to max_workers threads, each still
+        receiving previous_text/next_text context. When stitch_request_ids is enabled,
+        every part also waits for the request IDs of its predecessors, which forces
+        the parts to be generated one after another. bypass_cache skips the synthesis
+        cache for both lookups and stores. Diagnostics go to debug_info when given,
+        otherwise to a new DebugInfo. Each part is appended to the output file as
+        soon as every earlier part is done, so memory use does not grow with script length.
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+        if stitch_request_ids is None:
+            stitch_request_ids = self.stitch_request_ids
+
+        output_file = self.new_output_file(output_dir)
+        
+        if debug_info is None:
+            debug_info = DebugInfo()
+        debug_info.info("ElevenLabsAPI - Starting generate_full_audio")
+        debug_info.debug("Input script_parts: %s", script_parts)
+        
+        previous_request_ids = []
+        failed_parts = []
+        completed_parts = 0
+        assembler = self.new_assembler(output_file)
+        
+        planned_parts = self._plan_parts(script_parts, debug_info)
+
+        if stitch_request_ids:
+            # Request stitching needs each predecessor's request ID, so stay serial
+            debug_info.info("Request stitching enabled, generating parts sequentially")
+            for planned in planned_parts:
+                try:
+                    outcome = self._synthesize_part(planned, previous_request_ids, debug_info, bypass_cache)
+                    # Add request ID to history
+                    previous_request_ids.append(outcome[1])
+                except Exception as e:
+                    outcome = e
+                completed_parts += self._assemble_part(assembler, planned, outcome, failed_parts, debug_info)
+        else:
+            workers = max(1, min(max_workers, len(planned_parts) or 1))
+            debug_info.info("Generating %s parts with %s workers", len(planned_parts), workers)
+            # Only a window of parts is submitted ahead of the one being written, so
+            # finished audio waiting for a slow predecessor stays bounded
+            window = workers * 2
+            remaining = iter(planned_parts)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                in_flight = deque(
+                    (planned, executor.submit(self._synthesize_part, planned, None, debug_info, bypass_cache))
+                    for planned in islice(remaining, window)
+                )
+                while in_flight:
+                    planned, future = in_flight.popleft()
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        outcome = e
+                    completed_parts += self._assemble_part(assembler, planned, outcome, failed_parts, debug_info)
+                    for planned in islice(remaining, 1):
+                        in_flight.append(
+                            (planned, executor.submit(self._synthesize_part, planned, None, debug_info, bypass_cache))
+                        )
+
+        self._record_outcome(assembler.close(), failed_parts, debug_info)
+        return str(output_file), debug_info, completed_parts
+
+
+class AsyncElevenLabsAPI(ElevenLabsAPI):
+    """
+    Asyncio variant of ElevenLabsAPI.
+
+    All requests share one keep-alive httpx.AsyncClient, so the TCP/TLS handshake is
+    paid once per pooled connection instead of once per segment, and callers on an
+    event loop are never blocked by network waits. Pool size and timeouts are read
+    from the ELEVENLABS_HTTP_* environment variables. Decoding and export run on a
+    managed thread or process pool (see create_encode_executor).
+    """
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, executor: Optional[Executor] = None):
+        # No requests.Session, every request goes through the httpx client
+        self._configure()
+        self.http_max_connections = int(os.getenv("ELEVENLABS_HTTP_MAX_CONNECTIONS", "10"))
+        self.http_max_keepalive = int(os.getenv("ELEVENLABS_HTTP_MAX_KEEPALIVE", "10"))
+        self.http_keepalive_expiry = float(os.getenv("ELEVENLABS_HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.http_timeout = float(os.getenv("ELEVENLABS_HTTP_TIMEOUT", "60"))
+        self.http_connect_timeout = float(os.getenv("ELEVENLABS_HTTP_CONNECT_TIMEOUT", "10"))
+        # Read size used when consuming the streaming endpoint
+        self.stream_chunk_size = int(os.getenv("ELEVENLABS_STREAM_CHUNK_SIZE", "16384"))
+        # Chunks a streamed part may buffer while an earlier part is still being written
+        self.stream_buffer_chunks = max(1, int(os.getenv("ELEVENLABS_STREAM_BUFFER_CHUNKS", "64")))
+        self._client = client
+        # Executors passed in by the caller are not shut down by aclose()
+        self._executor = executor
+        self._owns_executor = executor is None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled client, created on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.http_max_connections,
+                    max_keepalive_connections=self.http_max_keepalive,
+                    keepalive_expiry=self.http_keepalive_expiry
+                ),
+                timeout=httpx.Timeout(self.http_timeout, connect=self.http_connect_timeout)
+            )
+        return self._client
+
+    @property
+    def executor(self) -> Executor:
+        """Executor for the decode/export step, created on first use"""
+        if self._executor is None:
+            self._executor = create_encode_executor()
+        return self._executor
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client and the encode executor"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def __aenter__(self) -> "AsyncElevenLabsAPI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def new_assembler(self, output_file: Path) -> IncrementalAssembler:
+        """Assembler whose re-encoding fallback runs on the managed encode executor"""
+        def fallback(audio_parts: List[bytes], path: str) -> None:
+            self.executor.submit(decode_and_export, audio_parts, path).result()
+
+        return IncrementalAssembler(str(output_file), fallback=fallback)
+
+    @retry_request
+    async def get_voices(self) -> List[VoiceData]:
+        """Fetch available voices from ElevenLabs API"""
+        outcome = (None, None)
+        await self.limiter.acquire_async()
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(
+                f"{self.base_url}/voices",
+                headers=self._voices_headers()
+            )
+            outcome = response_outcome(response)
+        except httpx.HTTPError as e:
+            raise ElevenLabsAPIError(f"Network error fetching voices: {str(e)}") from e
+        finally:
+            self.limiter.release(*outcome)
+            record_request("voices", "", started, response if outcome[0] is not None else None)
+
+        if response.status_code == 200:
+            return self._parse_voices(response.json())
+        else:
+            raise ElevenLabsAPIError(f"Failed to fetch voices: {response.text}", *outcome)
+
+    @retry_request
+    async def generate_audio_segment(self, text: str, voice_id: str, output_file: Optional[str] = None,
+                      previous_text: Optional[str] = None, next_text: Optional[str] = None,
+                      previous_request_ids: Optional[List[str]] = None, debug_info: Optional[DebugInfo] = None,
+                      bypass_cache: bool = False) -> tuple[bytes, str]:
+        """Generate audio using specified voice with context conditioning, served from the cache when possible"""
+        headers, data = self._build_tts_request(text, previous_text, next_text, previous_request_ids)
+
+        cache_key = self._cache_key(voice_id, data, bypass_cache)
+        if cache_key is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            metrics.inc("elevenlabs_cache_lookups_total", result="miss" if cached is None else "hit")
+            if cached is not None:
+                logging.info(f"Serving {len(text)} chars for voice_id {voice_id} from synthesis cache")
+                self._write_output(output_file, cached[0])
+                return cached
+        
+        logging.info(f"Generating audio for text length: {len(text)} chars using voice_id: {voice_id}")
+        logging.debug(f"Generation parameters: stability={self.stability}, similarity_boost={self.similarity_boost}, model={self.model_id}")
+        
+        outcome = (None, None)
+        await self.limiter.acquire_async()
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/text-to-speech/{voice_id}",
+                json=data,
+                headers=headers
+            )
+            outcome = response_outcome(response)
+        except httpx.HTTPError as e:
+            error_message = f"Network error during API call: {str(e)}"
+            logging.error(error_message)
+            raise ElevenLabsAPIError(error_message) from e
+        finally:
+            self.limiter.release(*outcome)
+            record_request("text_to_speech", self.model_id, started, response if outcome[0] is not None else None)
+
+        result = self._handle_tts_response(
+            response.status_code, response.content, response.headers, response.text,
+            data, output_file, debug_info
+        )
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.put, cache_key, *result)
+        return result
+
+    async def _synthesize_part(self, part: Dict, previous_request_ids: Optional[List[str]],
+                               debug_info: DebugInfo, bypass_cache: bool = False) -> tuple[bytes, str]:
+        """Synthesize a single planned part"""
+        logging.info(f"Processing part {part['index']+1}/{part['total']}")
+        logging.info(f"Text length: {len(part['text'])} chars")
+
+        audio_content, request_id = await self.generate_audio_segment(
+            text=part["text"],
+            voice_id=part["voice_id"],
+            previous_text=part["previous_text"],
+            next_text=part["next_text"],
+            previous_request_ids=previous_request_ids,
+            debug_info=debug_info,
+            bypass_cache=bypass_cache
+        )
+        return audio_content, request_id
+
+    async def _synthesize_checkpointed(self, part: Dict, previous_request_ids: Optional[List[str]],
+                                       debug_info: DebugInfo, bypass_cache: bool,
+                                       checkpoint: Optional[JobCheckpoint]) -> tuple[bytes, str]:
+        """_synthesize_part, reusing a segment saved by an earlier run and saving new ones when checkpointing"""
+        if checkpoint is None:
+            return await self._synthesize_part(part, previous_request_ids, debug_info, bypass_cache)
+        saved = await checkpoint.saved(part["index"])
+        if saved is not None:
+            debug_info.info("Reusing saved segment for part %s", part["index"])
+            return saved
+        try:
+            outcome = await self._synthesize_part(part, previous_request_ids, debug_info, bypass_cache)
+        except Exception as e:
+            await checkpoint.fail(part["index"], e)
+            raise
+        await checkpoint.save(part["index"], *outcome)
+        return outcome
+
+    async def generate_full_audio(self, script_parts: List[Dict], output_dir: Path,
+                                  max_workers: Optional[int] = None,
+                                  stitch_request_ids: Optional[bool] = None,
+                                  bypass_cache: bool = False,
+                                  debug_info: Optional[DebugInfo] = None,
+                                  checkpoint: Optional[JobCheckpoint] = None,
+                                  on_part: Optional[Callable[[Dict, Optional[int]], Awaitable[None]]] = None
+                                  ) -> tuple[str, DebugInfo, int]:
+        """
+        Generate audio for multiple parts and combine them in script order.
+        Returns tuple of (output_file_path, debug_info, completed_parts)
+
+        Same semantics as ElevenLabsAPI.generate_full_audio, with at most max_workers
+        requests in flight on the shared client. With a loaded checkpoint, every
+        segment is saved as it arrives and parts saved by an earlier run are reused.
+        on_part is awaited with (planned part, audio size or None if it failed) as
+        each part is written, in script order.
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+        if stitch_request_ids is None:
+            stitch_request_ids = self.stitch_request_ids
+
+        output_file = self.new_output_file(output_dir)
+
+        if debug_info is None:
+            debug_info = DebugInfo()
+        debug_info.info("AsyncElevenLabsAPI - Starting generate_full_audio")
+        debug_info.debug("Input script_parts: %s", script_parts)
+
+        previous_request_ids = []
+        failed_parts = []
+        completed_parts = 0
+        assembler = self.new_assembler(output_file)
+
+        planned_parts = self._plan_parts(script_parts, debug_info)
+
+        async def assemble(planned: Dict, outcome) -> None:
+            nonlocal completed_parts
+            # Scanning frames and writing to disk happen off the event loop
+            assembled = await asyncio.to_thread(
+                self._assemble_part, assembler, planned, outcome, failed_parts, debug_info
+            )
+            completed_parts += assembled
+            if on_part is not None:
+                await on_part(planned, len(outcome[0]) if assembled else None)
+
+        if stitch_request_ids:
+            # Request stitching needs each predecessor's request ID, so stay serial
+            debug_info.info("Request stitching enabled, generating parts sequentially")
+            try:
+                for planned in planned_parts:
+                    try:
+                        outcome = await self._synthesize_checkpointed(
+                            planned, previous_request_ids, debug_info, bypass_cache, checkpoint
+                        )
+                        # Segments saved from a stream have no request id
+                        if outcome[1]:
+                            previous_request_ids.append(outcome[1])
+                    except Exception as e:
+                        outcome = e
+                    await assemble(planned, outcome)
+            except BaseException:
+                assembler.abort()
+                raise
+        else:
+            workers = max(1, min(max_workers, len(planned_parts) or 1))
+            debug_info.info("Generating %s parts with %s workers", len(planned_parts), workers)
+            semaphore = asyncio.Semaphore(workers)
+
+            async def bounded(planned: Dict) -> tuple[bytes, str]:
+                async with semaphore:
+                    return await self._synthesize_checkpointed(planned, None, debug_info, bypass_cache, checkpoint)
+
+            # Only a window of parts runs ahead of the one being written, see ElevenLabsAPI.generate_full_audio
+            window = workers * 2
+            remaining = iter(planned_parts)
+            in_flight = deque(
+                (planned, asyncio.create_task(bounded(planned))) for planned in islice(remaining, window)
+            )
+            try:
+                while in_flight:
+                    planned, task = in_flight[0]
+                    try:
+                        outcome = await task
+                    except Exception as e:
+                        outcome = e
+                    in_flight.popleft()
+                    await assemble(planned, outcome)
+                    for planned in islice(remaining, 1):
+                        in_flight.append((planned, asyncio.create_task(bounded(planned))))
+            except BaseException:
+                # Cancelled: stop the pending requests, which closes their connections
+                tasks = [task for _, task in in_flight]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                assembler.abort()
+                raise
+
+        has_audio = await asyncio.to_thread(assembler.close)
+        self._record_outcome(has_audio, failed_parts, debug_info)
+        return str(output_file), debug_info, completed_parts
+
+    async def generate_batch(self, items: List[Dict], output_dir: Path,
+                             max_workers: Optional[int] = None,
+                             bypass_cache: bool = False) -> tuple[str, List[Dict]]:
+        """
+        Generate independent clips, one file per item, for many short unrelated texts.
+        Returns tuple of (batch_id, manifest entries in item order)
+
+        Items are dicts with text and optional voice_id and id (echoed back in the
+        manifest). Up to max_workers items are synthesized at once on the shared
+        client. A failed item is recorded in its manifest entry and does not stop
+        the rest of the batch.
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+        output_dir.mkdir(exist_ok=True)
+        batch_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def generate(index: int, item: Dict) -> Dict:
+            entry = {"index": index}
+            if item.get("id") is not None:
+                entry["id"] = item["id"]
+            output_file = output_dir / f"batch_{batch_id}_{index:04d}.mp3"
+            async with semaphore:
+                try:
+                    text = str(item.get("text", "")).strip()
+                    if not text:
+                        raise ValueError("Missing required field 'text'")
+                    audio_content, _ = await self.generate_audio_segment(
+                        text=text,
+                        voice_id=item.get("voice_id") or self.voice_id,
+                        output_file=str(output_file),
+                        bypass_cache=bypass_cache
+                    )
+                    entry.update(status="completed", file=str(output_file), size=len(audio_content))
+                except Exception as e:
+                    logging.error(f"Batch {batch_id} item {index} failed: {e}")
+                    entry.update(status="failed", error=str(e))
+            return entry
+
+        manifest = await asyncio.gather(*(generate(index, item) for index, item in enumerate(items)))
+        return batch_id, list(manifest)
+
+    @retry_request
+    async def _open_stream(self, voice_id: str, data: Dict, headers: Dict) -> tuple[httpx.Response, float]:
+        """
+        Send a streaming text-to-speech request and return (response, start time) once
+        it answers 200, with its body still unread and the limiter slot held for the
+        caller to release. Failures up to that point are retried like any request.
+        """
+        opened = False
+        response = None
+        outcome = (None, None)
+        await self.limiter.acquire_async()
+        started = time.perf_counter()
+        try:
+            response = await self.client.send(
+                self.client.build_request(
+                    "POST", f"{self.base_url}/text-to-speech/{voice_id}/stream", json=data, headers=headers
+                ),
+                stream=True
+            )
+            outcome = response_outcome(response)
+            if response.status_code == 200:
+                opened = True
+                return response, started
+            await response.aread()
+        except httpx.HTTPError as e:
+            error_message = f"Network error during API call: {str(e)}"
+            logging.error(error_message)
+            raise ElevenLabsAPIError(error_message) from e
+        finally:
+            if not opened:
+                if response is not None:
+                    await response.aclose()
+                self.limiter.release(*outcome)
+                record_request("stream", self.model_id, started, response if outcome[0] is not None else None)
+
+        self._handle_tts_response(
+            response.status_code, response.content, response.headers, response.text, data, None, None
+        )
+
+    async def stream_audio_segment(self, text: str, voice_id: str,
+                                   previous_text: Optional[str] = None, next_text: Optional[str] = None,
+                                   previous_request_ids: Optional[List[str]] = None,
+                                   bypass_cache: bool = False) -> AsyncIterator[bytes]:
+        """
+        Generate audio through the streaming endpoint, yielding MP3 chunks as they arrive.
+        Cache hits are yielded as a single chunk, completed streams are added to the cache.
+        The request is retried until its first byte arrives, not after.
+        """
+        headers, data = self._build_tts_request(text, previous_text, next_text, previous_request_ids)
+
+        cache_key = self._cache_key(voice_id, data, bypass_cache)
+        if cache_key is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            metrics.inc("elevenlabs_cache_lookups_total", result="miss" if cached is None else "hit")
+            if cached is not None:
+                logging.info(f"Serving {len(text)} chars for voice_id {voice_id} from synthesis cache")
+                yield cached[0]
+                return
+
+        logging.info(f"Streaming audio for text length: {len(text)} chars using voice_id: {voice_id}")
+        # The limiter slot taken by _open_stream is held until the whole stream has been read
+        response, started = await self._open_stream(voice_id, data, headers)
+        chunks = []
+        outcome = (None, None)
+        received = 0
+        try:
+            async for chunk in response.aiter_bytes(self.stream_chunk_size):
+                received += len(chunk)
+                if cache_key is not None:
+                    chunks.append(chunk)
+                yield chunk
+            request_id = response.headers.get("request-id", "")
+            outcome = response_outcome(response)
+        except httpx.HTTPError as e:
+            error_message = f"Network error during API call: {str(e)}"
+            logging.error(error_message)
+            raise ElevenLabsAPIError(error_message) from e
+        finally:
+            await response.aclose()
+            self.limiter.release(*outcome)
+            record_request("stream", self.model_id, started, response if outcome[0] is not None else None, received)
+
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.put, cache_key, b"".join(chunks), request_id)
+
+    async def generate_full_audio_stream(self, script_parts: List[Dict], output_dir: Path,
+                                         output_file: Optional[Path] = None,
+                                         on_chunk: Optional[Callable[[bytes, int], Awaitable[None]]] = None,
+                                         max_workers: Optional[int] = None,
+                                         bypass_cache: bool = False,
+                                         debug_info: Optional[DebugInfo] = None,
+                                         checkpoint: Optional[JobCheckpoint] = None,
+                                         on_part: Optional[Callable[[Dict, Optional[int]], Awaitable[None]]] = None
+                                         ) -> tuple[str, DebugInfo, int]:
+        """
+        Streaming variant of generate_full_audio.
+        Returns tuple of (output_file_path, debug_info, completed_parts)
+
+        Up to max_workers parts are streamed concurrently, and their chunks are appended
+        to output_file in script order as soon as all earlier parts are written, so the
+        file can be played while later parts are still being synthesized. As in
+        generate_full_audio only a window of parts runs ahead of the one being written,
+        each buffering at most ELEVENLABS_STREAM_BUFFER_CHUNKS chunks in memory and the
+        rest in a temporary file, so none waits for its turn while holding a connection
+        and rate limiter slot. Every part's ID3 tag and Xing/Info frame are dropped so
+        the parts join into one stream, and a part that fails midway is cut back out of
+        the file. on_chunk is awaited with
+        (chunk, part index) after each write. Request stitching is not available in
+        this mode since parts start before their predecessors finish.
+        checkpoint and on_part work as in generate_full_audio, a saved part is written
+        as one chunk.
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+        output_file = Path(output_file) if output_file else self.new_output_file(output_dir)
+
+        if debug_info is None:
+            debug_info = DebugInfo()
+        debug_info.info("AsyncElevenLabsAPI - Starting generate_full_audio_stream")
+        debug_info.debug("Input script_parts: %s", script_parts)
+
+        planned_parts = self._plan_parts(script_parts, debug_info)
+        workers = max(1, min(max_workers, len(planned_parts) or 1))
+        semaphore = asyncio.Semaphore(workers)
+
+        async def chunks_of(planned: Dict) -> AsyncIterator[bytes]:
+            """The part's audio, saved by an earlier run or streamed and saved now"""
+            if checkpoint is not None:
+                saved = await checkpoint.saved(planned["index"])
+                if saved is not None:
+                    debug_info.info("Reusing saved segment for part %s", planned["index"])
+                    yield saved[0]
+                    return
+            async with semaphore:
+                chunks = []
+                stream = self.stream_audio_segment(
+                    text=planned["text"],
+                    voice_id=planned["voice_id"],
+                    previous_text=planned["previous_text"],
+                    next_text=planned["next_text"],
+                    bypass_cache=bypass_cache
+                )
+                try:
+                    # Closed right away when the consumer stops, releasing the connection and limiter slot
+                    async with aclosing(stream):
+                        async for chunk in stream:
+                            if checkpoint is not None:
+                                chunks.append(chunk)
+                            yield chunk
+                except Exception as e:
+                    if checkpoint is not None:
+                        await checkpoint.fail(planned["index"], e)
+                    raise
+                if checkpoint is not None:
+                    await checkpoint.save(planned["index"], b"".join(chunks), "")
+
+        # Index of the part being written to output_file
+        writing = None
+
+        async def produce(planned: Dict, queue: asyncio.Queue) -> None:
+            # Held back until the leading ID3 tag and Xing/Info frame can be cut off
+            head = b""
+            skip = None
+            # Chunks that did not fit in the queue while an earlier part was being written.
+            # Waiting for queue space would keep this part's connection and rate limiter
+            # slot, which the part being written may need to retry, so they go to disk.
+            spill = None
+
+            async def drain() -> None:
+                nonlocal spill
+                spill.seek(0)
+                while data := spill.read(self.stream_chunk_size):
+                    await queue.put(data)
+                spill.close()
+                spill = None
+
+            async def emit(chunk: bytes) -> None:
+                nonlocal spill
+                if spill is not None and planned["index"] == writing:
+                    await drain()
+                if spill is None and (planned["index"] == writing or not queue.full()):
+                    await queue.put(chunk)
+                    return
+                if spill is None:
+                    spill = tempfile.TemporaryFile()
+                spill.write(chunk)
+
+            try:
+                async with aclosing(chunks_of(planned)) as chunks:
+                    async for chunk in chunks:
+                        if skip is None:
+                            head += chunk
+                            skip = leading_header_size(head)
+                            if skip is None:
+                                continue
+                            chunk = head[skip:]
+                        if chunk:
+                            await emit(chunk)
+                # The request is finished, waiting for queue space holds nothing up now
+                if spill is not None:
+                    await drain()
+                if skip is None and head:
+                    await queue.put(head)
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+            finally:
+                if spill is not None:
+                    spill.close()
+
+        def start(planned: Dict) -> tuple[Dict, asyncio.Queue, asyncio.Task]:
+            queue = asyncio.Queue(maxsize=self.stream_buffer_chunks)
+            return planned, queue, asyncio.create_task(produce(planned, queue))
+
+        # Only a window of parts runs ahead of the one being written, see ElevenLabsAPI.generate_full_audio
+        window = workers * 2
+        remaining = iter(planned_parts)
+        in_flight = deque(start(planned) for planned in islice(remaining, window))
+        completed_parts = 0
+        bytes_written = 0
+        failed_parts = []
+        try:
+            with open(output_file, "wb") as f:
+                while in_flight:
+                    planned, queue, _ = in_flight[0]
+                    writing = planned["index"]
+                    part_start = f.tell()
+                    part_bytes = 0
+                    while True:
+                        item = await queue.get()
+                        if item is None:
+                            completed_parts += 1
+                            debug_info.info("Successfully generated audio for part %s", planned["index"])
+                            break
+                        if isinstance(item, Exception):
+                            debug_info.error("Error generating audio: %s", item)
+                            failed_parts.append(planned["part"])
+                            if part_bytes:
+                                # Drop the frames written so far, the next part continues from here
+                                f.truncate(part_start)
+                                f.seek(part_start)
+                                bytes_written -= part_bytes
+                            part_bytes = None
+                            break
+                        f.write(item)
+                        # Make the chunk visible to readers of the growing file
+                        f.flush()
+                        bytes_written += len(item)
+                        part_bytes += len(item)
+                        if on_chunk is not None:
+                            await on_chunk(item, planned["index"])
+                    in_flight.popleft()
+                    if on_part is not None:
+                        await on_part(planned, part_bytes)
+                    for planned in islice(remaining, 1):
+                        in_flight.append(start(planned))
+        finally:
+            # Cancelled or failed: stop the pending requests, which closes their connections
+            producers = [task for _, _, task in in_flight]
+            for producer in producers:
+                producer.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+
+        if not bytes_written:
+            output_file.unlink(missing_ok=True)
+        metrics.inc("elevenlabs_audio_bytes_written_total", bytes_written)
+        self._record_outcome(bytes_written > 0, failed_parts, debug_info)
+        debug_info.info("Streamed %s bytes", bytes_written)
+        return str(output_file), debug_info, completed_parts
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .database import Database
+from .models import AudioJob
+
+JobProcessor = Callable[..., Awaitable[object]]
+# Awaited with (progress, total, **details), see ElevenLabsServer.progress_reporter
+ProgressReporter = Callable[..., Awaitable[None]]
+
+
+def job_fingerprint(script_parts: List[Dict], settings: Dict) -> str:
+    """
+    Hash of what a job renders: every part's text with whitespace collapsed and its
+    resolved voice, plus the synthesis settings. Actor names do not change the audio
+    and are left out. settings must include the default voice_id.
+    """
+    parts = [
+        [" ".join(str(part.get("text", "")).split()), part.get("voice_id") or settings["voice_id"]]
+        for part in script_parts
+    ]
+    payload = json.dumps({"parts": parts, "settings": settings}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    """
+    In-process queue that renders submitted audio jobs in the background.
+
+    Jobs are persisted in audio_jobs before they are queued, so anything still
+    pending or processing when the server stops is picked up again by resume().
+    At most `concurrency` jobs are processed at the same time.
+    """
+
+    UNFINISHED_STATUSES = ("pending", "processing")
+
+    def __init__(self, db: Database, process: JobProcessor, concurrency: Optional[int] = None):
+        self.db = db
+        self.process = process
+        if concurrency is None:
+            concurrency = int(os.getenv("ELEVENLABS_JOB_CONCURRENCY", "2"))
+        self.concurrency = max(1, concurrency)
+        self._queue: "asyncio.Queue[tuple[str, Dict]]" = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._active: Dict[str, asyncio.Task] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    @property
+    def active_jobs(self) -> List[str]:
+        """IDs of the jobs currently being processed."""
+        return list(self._active)
+
+    def start(self) -> None:
+        """Start the worker tasks. Must be called from a running event loop."""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"elevenlabs-job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers. Interrupted jobs stay unfinished and are resumed on next start."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, job: AudioJob, **options) -> None:
+        """
+        Queue an already inserted job. options are passed through to the processor and
+        stored on the job, so resume() processes it the same way after a restart.
+        """
+        job.options = options
+        await self.db.set_job_options(job.id, options)
+        await self._queue.put((job.id, options))
+
+    async def resume(self) -> int:
+        """Re-queue jobs left pending or processing by a previous run. Returns how many were queued."""
+        jobs = await self.db.get_jobs_by_status(list(self.UNFINISHED_STATUSES))
+        for job in jobs:
+            logging.info(f"Resuming unfinished job {job.id} ({job.status})")
+            await self._queue.put((job.id, job.options or {}))
+        return len(jobs)
+
+    async def join(self) -> None:
+        """Wait until every queued job has been processed."""
+        await self._queue.join()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, options = await self._queue.get()
+            try:
+                job = await self.db.get_job(job_id)
+                if job is None or job.status not in self.UNFINISHED_STATUSES:
+                    continue
+                # Each job runs in its own task, so cancelling a job leaves the worker running
+                task = asyncio.create_task(self.process(job, **options), name=f"elevenlabs-job-{job_id}")
+                self._active[job_id] = task
+                await task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    # The worker itself is being stopped
+                    raise
+                logging.info(f"Background job {job_id} was cancelled")
+            except Exception as e:
+                # The processor records the failure on the job itself
+                logging.error(f"Background job {job_id} failed: {e}")
+            finally:
+                self._active.pop(job_id, None)
+                self._queue.task_done()
+
+
+class JobProgress:
+    """
+    Progress of one running job: parts finished, bytes synthesized and an ETA from
+    the average time per finished part.
+
+    Every change may send an MCP progress notification through report, at most one
+    per notify_interval seconds, and job.completed_parts is written to the database
+    at most once per db_interval seconds (ELEVENLABS_PROGRESS_DB_INTERVAL), so
+    tracking costs a handful of small writes however many parts the job has.
+    Progress counts parts, or bytes written when by_bytes is set (streaming jobs).
+    """
+
+    def __init__(self, db: Database, job: AudioJob, report: Optional[ProgressReporter] = None,
+                 by_bytes: bool = False, db_interval: Optional[float] = None, notify_interval: float = 0.25):
+        self.db = db
+        self.job = job
+        self.report = report
+        self.by_bytes = by_bytes
+        if db_interval is None:
+            db_interval = float(os.getenv("ELEVENLABS_PROGRESS_DB_INTERVAL", "2"))
+        self.db_interval = db_interval
+        self.notify_interval = notify_interval
+        self.total_parts = job.total_parts
+        self.completed_parts = 0
+        self.failed_parts = 0
+        self.bytes = 0
+        self._started = time.monotonic()
+        self._notified_at = float("-inf")
+        self._written_at = self._started
+        self._written_parts = job.completed_parts
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        finished = self.completed_parts + self.failed_parts
+        if not finished:
+            return None
+        elapsed = time.monotonic() - self._started
+        return round(elapsed / finished * max(0, self.total_parts - finished), 1)
+
+    def snapshot(self) -> Dict:
+        return {
+            "completed_parts": self.completed_parts,
+            "failed_parts": self.failed_parts,
+            "total_parts": self.total_parts,
+            "bytes": self.bytes,
+            "eta_seconds": self.eta_seconds
+        }
+
+    async def start(self) -> None:
+        await self._notify(force=True)
+
+    async def add_bytes(self, size: int) -> None:
+        """Count bytes as they are written, for streaming jobs."""
+        self.bytes += size
+        if self.by_bytes:
+            await self._notify()
+
+    async def part_done(self, size: Optional[int]) -> None:
+        """Record a finished part of size bytes, or a failed one when size is None."""
+        if size is None:
+            self.failed_parts += 1
+        else:
+            self.completed_parts += 1
+            if not self.by_bytes:
+                # Streamed bytes were already counted by add_bytes
+                self.bytes += size
+        now = time.monotonic()
+        if self.completed_parts != self._written_parts and now - self._written_at >= self.db_interval:
+            self._written_at = now
+            self._written_parts = self.completed_parts
+            try:
+                await self.db.update_job_progress(self.job.id, self.completed_parts)
+            except Exception as e:
+                logging.warning(f"Failed to record progress of job {self.job.id}: {e}")
+        await self._notify()
+
+    async def finish(self) -> None:
+        """Send the final notification. The caller records the final job row."""
+        await self._notify(force=True, final=True)
+
+    async def _notify(self, force: bool = False, final: bool = False) -> None:
+        if self.report is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._notified_at < self.notify_interval:
+            return
+        self._notified_at = now
+        details = self.snapshot()
+        message = f"{details['completed_parts']}/{self.total_parts} parts, {self.bytes} bytes"
+        if details["failed_parts"]:
+            message += f", {details['failed_parts']} failed"
+        if details["eta_seconds"] is not None and not final:
+            message += f", about {details['eta_seconds']}s left"
+        if self.by_bytes:
+            progress, total = self.bytes, (self.bytes if final else None)
+        else:
+            progress, total = details["completed_parts"] + details["failed_parts"], self.total_parts
+        await self.report(progress, total, message=message, **details)
@@ -0,0 +1,247 @@
+import asyncio
+import bisect
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Seconds, from a quick DB query up to a long script export
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# name -> (type, help) of every metric the server records
+METRICS = {
+    "elevenlabs_api_request_seconds": ("histogram", "Duration of ElevenLabs API requests, until the body was read"),
+    "elevenlabs_api_responses_total": ("counter", "ElevenLabs API responses by status, 'error' when none arrived"),
+    "elevenlabs_api_retries_total": ("counter", "ElevenLabs API requests retried after a retryable failure"),
+    "elevenlabs_api_throttled_total": ("counter", "ElevenLabs API responses with status 429"),
+    "elevenlabs_api_bytes_sent_total": ("counter", "Request body bytes sent to the ElevenLabs API"),
+    "elevenlabs_api_bytes_received_total": ("counter", "Response body bytes received from the ElevenLabs API"),
+    "elevenlabs_cache_lookups_total": ("counter", "Synthesis cache lookups by result"),
+    "elevenlabs_db_query_seconds": ("histogram", "Duration of Database methods"),
+    "elevenlabs_audio_assembly_seconds": ("histogram", "Time spent stitching parts into the output file"),
+    "elevenlabs_audio_export_seconds": ("histogram", "Time spent decoding and re-encoding parts with pydub"),
+    "elevenlabs_audio_bytes_written_total": ("counter", "Bytes of combined audio written to output files"),
+    "elevenlabs_jobs_total": ("counter", "Finished jobs by final status"),
+    "elevenlabs_job_queue_depth": ("gauge", "Background jobs waiting for a worker"),
+    "elevenlabs_jobs_running": ("gauge", "Jobs being rendered"),
+    "elevenlabs_ratelimit_concurrency_limit": ("gauge", "Current adaptive limit for concurrent API requests"),
+    "elevenlabs_ratelimit_in_flight": ("gauge", "API requests in flight"),
+    "elevenlabs_ratelimit_queue_depth": ("gauge", "Requests waiting for the rate limiter"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    """Cumulative bucket counts with count and sum, as in the Prometheus histogram type."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile, None without observations"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    Process-wide counters, histograms and gauges.
+
+    Counters and histograms are recorded from the event loop and from worker
+    threads alike, so updates take a lock; they are cheap enough for the hot path.
+    Gauges are callbacks evaluated when the metrics are read. render() produces
+    the Prometheus text format and snapshot() a JSON friendly summary.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of the block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels) -> Callable:
+        """Decorator observing the duration of a coroutine function, labelled with its method name"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.timer(name, method=func.__name__, **labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def gauge(self, name: str, callback: Callable[[], float]) -> None:
+        """Register (or replace) the callback reporting a gauge's current value"""
+        with self._lock:
+            self._gauges[name] = callback
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get((name, _labels(labels)))
+
+    def _gauge_values(self) -> Dict[str, float]:
+        with self._lock:
+            gauges = list(self._gauges.items())
+        values = {}
+        for name, callback in gauges:
+            try:
+                values[name] = float(callback())
+            except Exception as e:
+                logging.debug(f"Gauge {name} failed: {e}")
+        return values
+
+    def snapshot(self) -> Dict:
+        """Counters, histogram summaries (count, sum, estimated p50/p95/p99) and gauges"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (histogram.count, histogram.sum, [histogram.quantile(q) for q in (0.5, 0.95, 0.99)])
+                for key, histogram in self._histograms.items()
+            }
+        result: Dict[str, Dict] = {"counters": {}, "histograms": {}, "gauges": self._gauge_values()}
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), (count, total, (p50, p95, p99)) in sorted(histograms.items()):
+            result["histograms"].setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": count,
+                "sum_seconds": round(total, 6),
+                "mean_seconds": round(total / count, 6) if count else None,
+                "p50_seconds": _json_bound(p50),
+                "p95_seconds": _json_bound(p95),
+                "p99_seconds": _json_bound(p99)
+            })
+        return result
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (histogram.buckets, list(histogram.counts), histogram.count, histogram.sum))
+                for key, histogram in self._histograms.items()
+            )
+        lines: List[str] = []
+        described = set()
+
+        def describe(name: str) -> None:
+            if name not in described and name in METRICS:
+                kind, help_text = METRICS[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (buckets, counts, count, total) in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, bucket_count in zip((*buckets, float("inf")), counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (("le", "+Inf" if bound == float("inf") else repr(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for name, value in sorted(self._gauge_values().items()):
+            describe(name)
+            lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _json_bound(bound: Optional[float]):
+    """Bucket bounds for JSON, which has no infinity"""
+    return "+Inf" if bound == float("inf") else bound
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+# Shared by every component in the process
+metrics = Metrics()
+
+
+async def serve_metrics(host: str, port: int, registry: Metrics = metrics) -> asyncio.AbstractServer:
+    """Serve GET /metrics in the Prometheus text format on a plain HTTP listener"""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=10)
+            # Headers are not needed, read them so the client is not reset
+            while (await asyncio.wait_for(reader.readline(), timeout=10)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?", 1)[0] == "/metrics":
+                status, content_type, body = "200 OK", "text/plain; version=0.0.4", registry.render().encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logging.debug(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logging.info(f"Serving metrics on http://{host}:{server.sockets[0].getsockname()[1]}/metrics")
+    return server
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, List, Optional
 
@@ -11,14 +11,18 @@ class ScriptPart:
 @dataclass
 class AudioJob:
     id: str
-    status: str  # 'pending', 'processing', 'completed', 'failed'
+    status: str  # 'pending', 'processing', 'completed', 'partial', 'failed', 'cancelled'
     script_parts: List[Dict]
     output_file: Optional[str] = None
     error: Optional[str] = None
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
     total_parts: int = 1
     completed_parts: int = 0
+    # Hash of the normalized script and synthesis settings, see jobs.job_fingerprint
+    fingerprint: Optional[str] = None
+    # Keyword arguments of JobQueue.submit (stream, bypass_cache), restored on resume
+    options: Optional[Dict] = None
 
     def to_dict(self) -> Dict:
         return {
@@ -33,6 +37,19 @@ class AudioJob:
             "completed_parts": self.completed_parts
         }
 
+    def to_summary_dict(self) -> Dict:
+        """Job status and progress without the script body"""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "output_file": self.output_file,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+            "total_parts": self.total_parts,
+            "completed_parts": self.completed_parts
+        }
+
     @staticmethod
     def from_dict(data: Dict) -> "AudioJob":
         return AudioJob(
@@ -44,5 +61,7 @@ class AudioJob:
             created_at=datetime.fromisoformat(data["created_at"]) if isinstance(data["created_at"], str) else data["created_at"],
             updated_at=datetime.fromisoformat(data["updated_at"]) if isinstance(data["updated_at"], str) else data["updated_at"],
             total_parts=data.get("total_parts", 1),
-            completed_parts=data.get("completed_parts", 0)
+            completed_parts=data.get("completed_parts", 0),
+            fingerprint=data.get("fingerprint"),
+            options=data.get("options")
         )
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header given in seconds, None if absent or not a number."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP dates are not used by the ElevenLabs API
+        return None
+
+
+class AdaptiveLimiter:
+    """
+    Shared admission control for ElevenLabs requests.
+
+    Concurrency follows AIMD: every successful request widens the window by
+    1/window (about one extra slot per window of successes), while a 429 or a 5xx
+    halves it, at most once per decrease_interval. A Retry-After
+    header pauses all new requests until it has passed. An optional token bucket
+    (ELEVENLABS_RATE_LIMIT_RPS) additionally caps the request rate.
+
+    acquire() is for worker threads and acquire_async() for the event loop; both
+    must be paired with release().
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, initial_concurrency: Optional[int] = None,
+                 rate: Optional[float] = None, burst: Optional[int] = None,
+                 decrease_interval: float = 1.0):
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("ELEVENLABS_RATE_MAX_CONCURRENCY", "8"))
+        if initial_concurrency is None:
+            initial_concurrency = int(os.getenv("ELEVENLABS_RATE_INITIAL_CONCURRENCY", "4"))
+        if rate is None:
+            rate = float(os.getenv("ELEVENLABS_RATE_LIMIT_RPS", "0"))
+        if burst is None:
+            burst = int(os.getenv("ELEVENLABS_RATE_BURST", "0")) or max(1, int(rate))
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = 1
+        self.rate = max(0.0, rate)
+        self.burst = max(1, burst)
+        self.decrease_interval = decrease_interval
+
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._async_waiters: List[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._window = float(min(max(1, initial_concurrency), self.max_concurrency))
+        self._in_flight = 0
+        self._waiting = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self.throttled = 0
+        self.errors = 0
+        self.successes = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        return int(self._window)
+
+    def _try_acquire(self, now: float) -> Optional[float]:
+        """Take a slot if possible. Returns 0 on success, seconds to wait, or None to wait for a release."""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._in_flight >= int(self._window):
+            return None
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self._in_flight += 1
+        return 0
+
+    def acquire(self) -> None:
+        """Block the calling thread until a request may be sent."""
+        with self._condition:
+            self._waiting += 1
+            try:
+                while True:
+                    wait = self._try_acquire(time.monotonic())
+                    if wait == 0:
+                        return
+                    self._condition.wait(timeout=wait)
+            finally:
+                self._waiting -= 1
+
+    async def acquire_async(self) -> None:
+        """Wait on the event loop until a request may be sent."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_acquire(time.monotonic())
+                    if wait == 0:
+                        return
+                    if wait is None:
+                        future = loop.create_future()
+                        self._async_waiters.append((loop, future))
+                if wait is None:
+                    await future
+                else:
+                    await asyncio.sleep(wait)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def release(self, status_code: Optional[int] = None, retry_after: Optional[float] = None) -> None:
+        """
+        Return a slot and adapt to the outcome. status_code is the HTTP status, or
+        None when no response arrived (network error or cancellation), which leaves
+        the window unchanged. retry_after is the parsed Retry-After header.
+        """
+        now = time.monotonic()
+        with self._condition:
+            self._in_flight -= 1
+            if status_code is not None and status_code < 400:
+                self.successes += 1
+                self._window = min(self.max_concurrency, self._window + 1 / self._window)
+            elif status_code is not None and (status_code == 429 or status_code >= 500):
+                if status_code == 429:
+                    self.throttled += 1
+                else:
+                    self.errors += 1
+                if now - self._last_decrease >= self.decrease_interval:
+                    self._window = max(self.min_concurrency, self._window / 2)
+                    self._last_decrease = now
+                    logging.info(f"Rate limiter backing off to {self.concurrency_limit} concurrent requests")
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+                logging.info(f"Rate limiter pausing requests for {retry_after:.1f}s (Retry-After)")
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(self._wake, future)
+            except RuntimeError:
+                # The waiter's event loop is already closed
+                pass
+
+    @staticmethod
+    def _wake(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    def stats(self) -> Dict:
+        """Current limits, load and outcome counters."""
+        with self._lock:
+            return {
+                "concurrency_limit": self.concurrency_limit,
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "rate_limit_rps": self.rate or None,
+                "paused_for_seconds": round(max(0.0, self._blocked_until - time.monotonic()), 3),
+                "successes": self.successes,
+                "throttled": self.throttled,
+                "errors": self.errors
+            }
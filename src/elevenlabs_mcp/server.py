@@ -4,18 +4,26 @@ import os
 from pathlib import Path
 import uuid
 import mcp.types as types
-from mcp.server import Server, NotificationOptions
+from mcp.server import NotificationOptions
 from mcp.server.models import InitializationOptions
 import mcp.server.stdio
 from dotenv import load_dotenv
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import logging
-from urllib.parse import unquote
+from typing import Dict, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
 
-from .elevenlabs_api import ElevenLabsAPI
+from .audio import file_sha256, mp3_duration, read_range
+from .checkpoints import JobCheckpoint
+from .elevenlabs_api import AsyncElevenLabsAPI
 from .database import Database
+from .diagnostics import DebugInfo, DebugInfoStore
+from .dispatch import ConcurrentServer
+from .jobs import JobProgress, JobQueue, ProgressReporter, job_fingerprint
+from .metrics import metrics, serve_metrics
 from .models import AudioJob
+from .voices import VoiceIndex
 
 load_dotenv()
 
@@ -31,36 +39,95 @@ logging.basicConfig(
 )
 
 class ElevenLabsServer:
+    SEARCH_VOICES_LIMIT = 20
+    MAX_BATCH_ITEMS = 500
+    MAX_SEARCH_VOICES_LIMIT = 100
+    RESUMABLE_STATUSES = ("failed", "partial", "cancelled")
+    CANCELLABLE_STATUSES = ("pending", "processing")
+
     def __init__(self):
-        self.server = Server("elevenlabs-server")
-        self.api = ElevenLabsAPI()
+        # Tool calls run concurrently, so history reads and cancel_job answer during a generation
+        self.server = ConcurrentServer("elevenlabs-server")
+        self.api = AsyncElevenLabsAPI()
         self.output_dir = Path("output")
         self.output_dir.mkdir(exist_ok=True)
         # Set output directory for database
         os.environ["ELEVENLABS_OUTPUT_DIR"] = str(self.output_dir.absolute())
         self.db = Database()
+        # Voice catalog served from memory, refreshed in the background
+        self.voices = VoiceIndex(self.db, self.api.get_voices)
+        # Background renderer for jobs submitted with background=true
+        self.jobs = JobQueue(self.db, self.run_job)
+        # Diagnostics of recent jobs, fetched with get_job_debug_info
+        self.job_debug_info = DebugInfoStore()
+        # "inline" embeds audio as base64, "reference" returns an audio:// URI and metadata
+        self.response_mode = os.getenv("ELEVENLABS_RESPONSE_MODE", "inline").lower()
+        # Default number of bytes returned by one audio:// read
+        self.audio_chunk_size = int(os.getenv("ELEVENLABS_AUDIO_CHUNK_SIZE", str(1024 * 1024)))
+        # Identical requests attach to a job in flight, or reuse one completed this many seconds ago
+        self.dedup_window_seconds = int(os.getenv("ELEVENLABS_DEDUP_WINDOW_SECONDS", "600"))
+        # Jobs being rendered by fingerprint: (job_id, future resolved with the finished job)
+        self._inflight: Dict[str, tuple[str, asyncio.Future]] = {}
+        # Makes the duplicate lookup and job creation atomic
+        self._dedup_lock = asyncio.Lock()
+        # Task rendering each running job, and jobs cancel_job was called for
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: set[str] = set()
+        # Optional Prometheus endpoint on http://<host>:<port>/metrics, 0 disables it
+        self.metrics_host = os.getenv("ELEVENLABS_METRICS_HOST", "127.0.0.1")
+        self.metrics_port = int(os.getenv("ELEVENLABS_METRICS_PORT", "0"))
+        self._metrics_server: Optional[asyncio.AbstractServer] = None
         
         # Set up handlers
         self.setup_tools()
         self.setup_resources()
-        # self.setup_notifications()
+        self.setup_metrics()
+
+    @property
+    def segments_dir(self) -> Path:
+        """Where finished segments of unfinished jobs are kept for resuming"""
+        return self.output_dir / "segments"
     
     async def initialize(self):
         """Initialize server components."""
         await self.db.initialize()
+
+        # Start background workers and pick up jobs left unfinished by a previous run
+        self.jobs.start()
+        resumed = await self.jobs.resume()
+        if resumed:
+            logging.info(f"Resumed {resumed} unfinished jobs")
         
-        # Initialize voices cache
+        # Load the voice catalog, a stale or empty cache is refreshed in the background
         try:
-            voices, needs_refresh = await self.db.get_voices()
-            if needs_refresh:
-                logging.info("Fetching initial voices data")
-                fresh_voices = await asyncio.to_thread(self.api.get_voices)
-                await self.db.upsert_voices(fresh_voices)
-                logging.info(f"Cached {len(fresh_voices)} voices")
+            await self.voices.load()
         except Exception as e:
             logging.error(f"Error initializing voices cache: {e}")
 
-    def parse_script(self, script_json: str) -> tuple[list[dict], list[str]]:
+        if self.metrics_port:
+            self._metrics_server = await serve_metrics(self.metrics_host, self.metrics_port)
+
+    def setup_metrics(self):
+        """Gauges read from this server's components whenever metrics are collected"""
+        metrics.gauge("elevenlabs_job_queue_depth", lambda: self.jobs.queue_depth)
+        metrics.gauge("elevenlabs_jobs_running", lambda: len(self._running))
+        metrics.gauge("elevenlabs_ratelimit_concurrency_limit", lambda: self.api.limiter.concurrency_limit)
+        metrics.gauge("elevenlabs_ratelimit_in_flight", lambda: self.api.limiter.stats()["in_flight"])
+        metrics.gauge("elevenlabs_ratelimit_queue_depth", lambda: self.api.limiter.stats()["queue_depth"])
+
+    def metrics_report(self) -> dict:
+        """Everything get_metrics returns in JSON form"""
+        return {
+            **metrics.snapshot(),
+            "rate_limiter": self.api.limiter.stats(),
+            "cache": self.api.cache.stats() if self.api.cache is not None else None,
+            "jobs": {
+                "queue_depth": self.jobs.queue_depth,
+                "running": sorted(self._running)
+            }
+        }
+
+    def parse_script(self, script_json: str) -> tuple[list[dict], DebugInfo]:
         """
         Parse the input into a list of script parts and collect debug information.
         Accepts:
@@ -78,10 +145,10 @@ class ElevenLabsServer:
         Returns:
             tuple containing:
                 - list of parsed script parts
-                - list of debug information strings
+                - DebugInfo with the parsing diagnostics
         """
-        debug_info = []
-        debug_info.append(f"Raw input: {script_json}")
+        debug_info = DebugInfo()
+        debug_info.debug("Raw input: %s", script_json)
         
         script_array = []
         
@@ -103,21 +170,21 @@ class ElevenLabsServer:
         except json.JSONDecodeError as e:
             # If JSON parsing fails and input looks like JSON, raise error
             if script_json.startswith('{') or script_json.startswith('['):
-                debug_info.append(f"JSON parsing failed: {str(e)}")
+                debug_info.error("JSON parsing failed: %s", e)
                 raise Exception("Invalid JSON format")
             # Otherwise treat as plain text
-            debug_info.append("Input is plain text")
+            debug_info.info("Input is plain text")
             script_array = [{"text": script_json}]
         
         script_parts = []
         for part in script_array:
             if not isinstance(part, dict):
-                debug_info.append(f"Skipping non-dict part: {part}")
+                debug_info.info("Skipping non-dict part: %s", part)
                 continue
                 
             text = part.get("text", "").strip()
             if not text:
-                debug_info.append("Missing or empty text field")
+                debug_info.error("Missing or empty text field")
                 raise Exception("Missing required field 'text'")
                 
             new_part = {
@@ -125,12 +192,460 @@ class ElevenLabsServer:
                 "voice_id": part.get("voice_id"),
                 "actor": part.get("actor")
             }
-            debug_info.append(f"Created part: {new_part}")
+            debug_info.debug("Created part: %s", new_part)
             script_parts.append(new_part)
         
-        debug_info.append(f"Final script_parts: {script_parts}")
+        debug_info.debug("Final script_parts: %s", script_parts)
         return script_parts, debug_info
 
+    async def create_job(self, script_parts: list[dict], fingerprint: Optional[str] = None) -> AudioJob:
+        """Insert a pending job for the given script parts."""
+        job = AudioJob(
+            id=str(uuid.uuid4()),
+            status="pending",
+            script_parts=script_parts,
+            total_parts=len(script_parts),
+            fingerprint=fingerprint
+        )
+        await self.db.insert_job(job)
+        return job
+
+    def _track_inflight(self, job: AudioJob) -> None:
+        """Let identical requests attach to this job until run_job finishes it."""
+        if job.fingerprint and job.fingerprint not in self._inflight:
+            self._inflight[job.fingerprint] = (job.id, asyncio.get_running_loop().create_future())
+
+    def _resolve_inflight(self, job: AudioJob) -> None:
+        entry = self._inflight.get(job.fingerprint)
+        if entry is not None and entry[0] == job.id:
+            del self._inflight[job.fingerprint]
+            if not entry[1].done():
+                entry[1].set_result(job)
+
+    async def find_duplicate(self, fingerprint: str) -> Optional[tuple[str, asyncio.Future]]:
+        """
+        (job_id, future of the finished job) for an identical job that is in flight
+        or completed within the dedup window, None if the request has to be rendered.
+        """
+        if fingerprint in self._inflight:
+            return self._inflight[fingerprint]
+        if self.dedup_window_seconds <= 0:
+            return None
+        since = (datetime.utcnow() - timedelta(seconds=self.dedup_window_seconds)).isoformat()
+        job = await self.db.find_job_by_fingerprint(fingerprint, "completed", since)
+        if job is None or not job.output_file or not Path(job.output_file).exists():
+            return None
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(job)
+        return job.id, future
+
+    def progress_reporter(self) -> Optional[ProgressReporter]:
+        """
+        Progress callback for the current request, or None when the client sent no progress token.
+        Keyword arguments are sent as extra fields of the notification params, e.g. message.
+        """
+        try:
+            ctx = self.server.request_context
+        except LookupError:
+            return None
+        if ctx.meta is None or ctx.meta.progressToken is None:
+            return None
+        progress_token = ctx.meta.progressToken
+
+        async def report(progress: float, total: Optional[float] = None, **details) -> None:
+            try:
+                await ctx.session.send_notification(types.ServerNotification(
+                    types.ProgressNotification(
+                        method="notifications/progress",
+                        params=types.ProgressNotificationParams(
+                            progressToken=progress_token,
+                            progress=progress,
+                            total=total,
+                            **details
+                        )
+                    )
+                ))
+            except Exception as e:
+                # Progress is best effort, never fail the job over it
+                logging.debug(f"Failed to send progress notification: {e}")
+
+        return report
+
+    async def run_job(self, job: AudioJob, bypass_cache: bool = False, stream: bool = False,
+                      progress: Optional[ProgressReporter] = None, in_request: bool = False) -> DebugInfo:
+        """
+        Render a job's audio and record the outcome. Returns the job's debug info.
+        With stream, output_file is recorded up front and grows while parts are synthesized.
+        progress (if given) is notified as parts finish, with parts done out of total
+        parts as progress, or bytes written when streaming, and completed_parts is
+        recorded periodically while the job runs (see JobProgress).
+        Finished segments are checkpointed, so running a job again only synthesizes
+        the parts that are missing or failed and then reassembles the output.
+
+        A job cancelled through cancel_job, or one rendered for a request
+        (in_request) that is cancelled, ends as "cancelled" with its finished parts
+        kept. A background job interrupted by a shutdown stays unfinished and is
+        resumed on the next start.
+        """
+        self._running[job.id] = asyncio.current_task()
+        # Read before anything else awaits, cancel_job may be recording it right now
+        cancelled_early = job.id in self._cancel_requested
+        debug_info = self.job_debug_info.get(job.id)
+        if debug_info is None:
+            debug_info = DebugInfo()
+            self.job_debug_info.put(job.id, debug_info)
+        checkpoint = JobCheckpoint(self.db, job.id, self.segments_dir)
+        tracker = JobProgress(self.db, job, progress, by_bytes=stream)
+        previous_output = job.output_file
+        try:
+            stored = None if cancelled_early else await self.db.get_job(job.id)
+            if cancelled_early or (stored is not None and stored.status == "cancelled"):
+                # cancel_job found the job still queued, after it was picked up for this run
+                job.status = "cancelled"
+                job.error = "Cancelled before it started"
+                raise asyncio.CancelledError()
+            reused = await checkpoint.load()
+            if reused:
+                debug_info.info("Reusing %s saved parts of job %s", reused, job.id)
+            job.status = "processing"
+            job.error = None
+            if stream:
+                job.output_file = str(self.api.new_output_file(self.output_dir))
+            await self.db.update_job(job)
+            await tracker.start()
+
+            async def on_part(planned: dict, size: Optional[int]) -> None:
+                await tracker.part_done(size)
+
+            if stream:
+                async def on_chunk(chunk: bytes, part_index: int) -> None:
+                    await tracker.add_bytes(len(chunk))
+
+                _, _, completed_parts = await self.api.generate_full_audio_stream(
+                    job.script_parts,
+                    self.output_dir,
+                    output_file=Path(job.output_file),
+                    on_chunk=on_chunk,
+                    bypass_cache=bypass_cache,
+                    debug_info=debug_info,
+                    checkpoint=checkpoint,
+                    on_part=on_part
+                )
+            else:
+                output_file, _, completed_parts = await self.api.generate_full_audio(
+                    job.script_parts,
+                    self.output_dir,
+                    bypass_cache=bypass_cache,
+                    debug_info=debug_info,
+                    checkpoint=checkpoint,
+                    on_part=on_part
+                )
+                job.output_file = str(output_file)
+            await tracker.finish()
+
+            job.completed_parts = completed_parts
+            if checkpoint.failed:
+                job.status = "partial"
+                job.error = f"{len(checkpoint.failed)} of {job.total_parts} parts failed, resume_job retries only those"
+            else:
+                job.status = "completed"
+            await self.db.update_job(job)
+            if job.status == "completed":
+                # The output has everything, the segments are no longer needed
+                await checkpoint.remove_segments()
+            if previous_output and previous_output != job.output_file:
+                # Left over from an earlier, interrupted or partial run of this job
+                Path(previous_output).unlink(missing_ok=True)
+            return debug_info
+        except asyncio.CancelledError:
+            if job.status != "cancelled" and (in_request or job.id in self._cancel_requested):
+                logging.info(f"Job {job.id} cancelled after {tracker.completed_parts} parts")
+                job.status = "cancelled"
+                job.error = "Cancelled, finished parts are kept for resume_job"
+                job.completed_parts = tracker.completed_parts
+                await asyncio.shield(self.db.update_job(job))
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            await self.db.update_job(job)
+            raise
+        finally:
+            self._running.pop(job.id, None)
+            self._cancel_requested.discard(job.id)
+            self._resolve_inflight(job)
+            if job.status not in JobQueue.UNFINISHED_STATUSES:
+                metrics.inc("elevenlabs_jobs_total", status=job.status)
+
+    async def generate_audio(self, script_parts: list[dict], arguments: dict,
+                             debug_info: DebugInfo) -> list[types.TextContent | types.EmbeddedResource]:
+        """
+        Create a job for the script parts and either render it now or, when the
+        'background' argument is set, queue it and return its job_id immediately.
+        Diagnostics are kept with the job for get_job_debug_info rather than returned.
+
+        A request identical to a job in flight shares that job's result, and one
+        identical to a job completed within ELEVENLABS_DEDUP_WINDOW_SECONDS returns
+        its output right away; bypass_cache always renders a new job.
+        """
+        # Reject a bad response_mode before spending any credits
+        self.response_mode_for(arguments)
+
+        fingerprint = job_fingerprint(script_parts, self.api.synthesis_settings())
+        async with self._dedup_lock:
+            duplicate = None if arguments.get("bypass_cache") else await self.find_duplicate(fingerprint)
+            if duplicate is None:
+                job = await self.create_job(script_parts, fingerprint)
+                self._track_inflight(job)
+        if duplicate is not None:
+            return await self.attach_to_job(*duplicate, arguments, debug_info)
+
+        debug_info.info("Created job record: %s", job.id)
+        self.job_debug_info.put(job.id, debug_info)
+        return await self.start_job(job, arguments, debug_info)
+
+    async def attach_to_job(self, job_id: str, finished: asyncio.Future, arguments: dict,
+                            debug_info: DebugInfo) -> list[types.TextContent | types.EmbeddedResource]:
+        """Answer a duplicate request with the result of the identical job job_id."""
+        logging.info(f"Identical request, reusing job {job_id}")
+        if arguments.get("background"):
+            job = finished.result() if finished.done() else await self.db.get_job(job_id)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps(job.to_summary_dict(), indent=2)
+            )]
+
+        # Shielded, a cancelled duplicate must not cancel the job it is waiting for
+        job = await asyncio.shield(finished)
+        if job.status not in ("completed", "partial"):
+            raise Exception(f"Identical job {job.id} is {job.status}: {job.error}")
+        return await self.job_response(job, arguments, debug_info, reused=True)
+
+    async def resume_job(self, job: AudioJob, arguments: dict,
+                         debug_info: DebugInfo) -> list[types.TextContent | types.EmbeddedResource]:
+        """Run a failed or partial job again. Only parts without a saved segment are synthesized."""
+        if job.status not in self.RESUMABLE_STATUSES:
+            raise ValueError(f"Job {job.id} is {job.status}, only failed, partial or cancelled jobs can be resumed")
+        self.response_mode_for(arguments)
+
+        job.status = "pending"
+        job.error = None
+        await self.db.update_job(job)
+        self._track_inflight(job)
+        debug_info.info("Resuming job %s", job.id)
+        self.job_debug_info.put(job.id, debug_info)
+        return await self.start_job(job, arguments, debug_info)
+
+    async def start_job(self, job: AudioJob, arguments: dict,
+                        debug_info: DebugInfo) -> list[types.TextContent | types.EmbeddedResource]:
+        """Queue a pending job when 'background' is set, otherwise render it now and return its audio."""
+        bypass_cache = bool(arguments.get("bypass_cache", False))
+        stream = bool(arguments.get("stream", False))
+
+        if arguments.get("background"):
+            await self.jobs.submit(job, bypass_cache=bypass_cache, stream=stream)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps(job.to_summary_dict(), indent=2)
+            )]
+
+        # In its own task, so cancel_job can stop the job without cancelling the request handler
+        task = asyncio.create_task(self.run_job(
+            job, bypass_cache=bypass_cache, stream=stream, progress=self.progress_reporter(), in_request=True
+        ), name=f"elevenlabs-job-{job.id}")
+        try:
+            await task
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                # The request itself was cancelled, which cancelled the job with it
+                raise
+            return [types.TextContent(
+                type="text",
+                text=f"Job {job.id} was cancelled. Finished parts are kept, call resume_job to continue."
+            )]
+        return await self.job_response(job, arguments, debug_info)
+
+    async def cancel_job(self, job: AudioJob) -> AudioJob:
+        """
+        Stop a pending or processing job. Requests in flight are aborted and their
+        connections closed; finished parts stay checkpointed for resume_job.
+        Returns the job as recorded afterwards.
+        """
+        if job.status not in self.CANCELLABLE_STATUSES:
+            raise ValueError(f"Job {job.id} is {job.status}, only pending or processing jobs can be cancelled")
+        task = self._running.get(job.id)
+        if task is None:
+            # Still queued, the worker skips jobs that are no longer pending. A run_job
+            # starting meanwhile sees the cancel request, or the status once it is written.
+            self._cancel_requested.add(job.id)
+            try:
+                job.status = "cancelled"
+                job.error = "Cancelled before it started"
+                await self.db.update_job(job)
+            finally:
+                self._cancel_requested.discard(job.id)
+            # Identical requests must not keep waiting for a job that will never run
+            self._resolve_inflight(job)
+            return job
+
+        self._cancel_requested.add(job.id)
+        task.cancel()
+        await asyncio.wait({task})
+        return await self.db.get_job(job.id)
+
+    async def job_response(self, job: AudioJob, arguments: dict, debug_info: DebugInfo,
+                           reused: bool = False) -> list[types.TextContent | types.EmbeddedResource]:
+        """Status lines and audio of a finished job."""
+        if job.status == "partial":
+            status_lines = [
+                f"Audio generation partially successful, {job.total_parts - job.completed_parts} parts failed. Job ID: {job.id}",
+                "Call resume_job to retry only the failed parts"
+            ]
+        else:
+            status_lines = [f"Audio generation successful. Job ID: {job.id}"]
+        if reused:
+            status_lines.append("Returned the result of an identical request")
+        if len(debug_info):
+            status_lines.append(f"{len(debug_info)} debug entries recorded, fetch them with get_job_debug_info")
+        return [
+            types.TextContent(type="text", text="\n".join(status_lines)),
+            *await self.audio_response(job.id, Path(job.output_file), arguments)
+        ]
+
+    async def list_voices(self) -> list[dict]:
+        """The voice catalog from the in-memory index, with the default voice marked."""
+        return [
+            {**voice, "is_default": voice["voice_id"] == self.api.voice_id}
+            for voice in await self.voices.all()
+        ]
+
+    def resolve_audio_file(self, filename: str) -> Path:
+        """Path of an output file named in an audio:// URI, refusing anything outside the output directory."""
+        if not filename or Path(filename).name != filename:
+            raise ValueError(f"Invalid audio file name: {filename}")
+        path = self.output_dir / filename
+        if not path.is_file():
+            raise ValueError(f"Audio file not found: {filename}")
+        return path
+
+    async def audio_reference(self, job_id: str, output_path: Path) -> dict:
+        """audio:// URI and metadata for an output file. Hashing reads the file in chunks off the event loop."""
+        size = output_path.stat().st_size
+        duration = await asyncio.to_thread(mp3_duration, str(output_path))
+        sha256 = await asyncio.to_thread(file_sha256, str(output_path))
+        return {
+            "job_id": job_id,
+            "uri": f"audio://{output_path.name}",
+            "mime_type": "audio/mpeg",
+            "size": size,
+            "duration_seconds": round(duration, 3) if duration is not None else None,
+            "sha256": sha256,
+            "chunk_size": self.audio_chunk_size
+        }
+
+    def response_mode_for(self, arguments: dict) -> str:
+        """The response_mode argument, falling back to ELEVENLABS_RESPONSE_MODE."""
+        response_mode = (arguments.get("response_mode") or self.response_mode).lower()
+        if response_mode not in ("inline", "reference"):
+            raise ValueError(f"Invalid response_mode: {response_mode}. Must be 'inline' or 'reference'")
+        return response_mode
+
+    async def audio_response(self, job_id: str, output_path: Path,
+                             arguments: dict) -> list[types.TextContent | types.EmbeddedResource]:
+        """The audio of a finished job, embedded or by reference depending on the response_mode argument."""
+        if self.response_mode_for(arguments) == "reference":
+            return [types.TextContent(
+                type="text",
+                text=json.dumps(await self.audio_reference(job_id, output_path), indent=2)
+            )]
+
+        # Read the generated audio file and encode it as base64
+        with open(output_path, 'rb') as f:
+            audio_base64 = base64.b64encode(f.read()).decode('utf-8')
+
+        return [
+            types.EmbeddedResource(
+                type="resource",
+                resource=types.BlobResourceContents(
+                    uri=f"audio://{output_path.name}",
+                    name=output_path.name,
+                    blob=audio_base64,
+                    mimeType="audio/mpeg"
+                )
+            )
+        ]
+
+    async def audio_chunk_response(self, job_id: str, output_path: Path, offset: int,
+                                   length: Optional[int]) -> list[types.TextContent | types.EmbeddedResource]:
+        """
+        One byte range of an output file plus its position in the file. Reads are
+        capped at audio_chunk_size, so memory per call is bounded by the chunk.
+        """
+        total_size = output_path.stat().st_size
+        length = self.audio_chunk_size if length is None else min(int(length), self.audio_chunk_size)
+        if offset < 0 or length < 0:
+            raise ValueError("offset and length must not be negative")
+        chunk = await asyncio.to_thread(read_range, str(output_path), offset, length)
+        next_offset = offset + len(chunk)
+        return [
+            types.TextContent(
+                type="text",
+                text=json.dumps({
+                    "job_id": job_id,
+                    "offset": offset,
+                    "length": len(chunk),
+                    "total_size": total_size,
+                    "next_offset": next_offset if next_offset < total_size else None
+                }, indent=2)
+            ),
+            types.EmbeddedResource(
+                type="resource",
+                resource=types.BlobResourceContents(
+                    uri=f"audio://{output_path.name}?offset={offset}&length={len(chunk)}",
+                    name=output_path.name,
+                    blob=base64.b64encode(chunk).decode('utf-8'),
+                    mimeType="audio/mpeg"
+                )
+            )
+        ]
+
+    @staticmethod
+    def history_filters(params: dict, summary: bool) -> dict:
+        """
+        Translate history tool arguments or resource query parameters into
+        Database.list_jobs keyword arguments. summary is the default projection.
+        """
+        statuses = params.get("status")
+        if isinstance(statuses, str):
+            statuses = [status.strip() for status in statuses.split(",") if status.strip()]
+
+        summary_param = params.get("summary", summary)
+        if isinstance(summary_param, str):
+            summary_param = summary_param.lower() in ("1", "true", "yes")
+
+        filters = {
+            "limit": int(params["limit"]) if params.get("limit") else None,
+            "cursor": params.get("cursor") or None,
+            "statuses": statuses or None,
+            "summary": bool(summary_param)
+        }
+        for key in ("created_after", "created_before"):
+            value = params.get(key)
+            filters[key] = ElevenLabsServer.utc_isoformat(value) if value else None
+        return filters
+
+    @staticmethod
+    def utc_isoformat(value: str) -> str:
+        """
+        An ISO 8601 timestamp as the naive UTC isoformat() string job timestamps are
+        stored as, so string comparisons in SQLite order correctly. "Z" and offsets
+        are converted to UTC, naive timestamps are taken to be UTC already.
+        """
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return moment.isoformat()
+
     def setup_resources(self):
         """Set up MCP resources."""
         @self.server.list_resource_templates()
@@ -139,9 +654,19 @@ class ElevenLabsServer:
                 types.ResourceTemplate(
                     uriTemplate="voiceover://history/{job_id}",
                     name="Voiceover Job History",
-                    description="Access voiceover job history. Provide job_id for specific job or omit for all jobs.",
+                    description="Access voiceover job history. Provide job_id for a specific job or omit it for the most recent jobs. "
+                                "Without job_id, the query parameters limit, cursor (created_at,id of the last job of the previous page), "
+                                "status, created_after, created_before and summary page and filter the results.",
                     mimeType="application/json"
                 ),
+                types.ResourceTemplate(
+                    uriTemplate="audio://{filename}",
+                    name="Generated Audio",
+                    description="Bytes of a generated audio file, as returned by response_mode=reference. "
+                                "Reads return at most chunk_size bytes; use the offset and length query "
+                                "parameters (audio://{filename}?offset=0&length=1048576) to fetch the rest.",
+                    mimeType="audio/mpeg"
+                ),
                 types.ResourceTemplate(
                     uriTemplate="voiceover://voices",
                     name="Available Voices",
@@ -151,31 +676,20 @@ class ElevenLabsServer:
             ]
 
         @self.server.read_resource()
-        async def handle_read_resource(uri: types.AnyUrl) -> str:
+        async def handle_read_resource(uri: types.AnyUrl) -> str | bytes:
             uri_str = str(uri)
+
+            if uri_str.startswith("audio://"):
+                parsed = urlsplit(uri_str)
+                path = self.resolve_audio_file(unquote(parsed.netloc + parsed.path))
+                params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                offset = int(params.get("offset", 0))
+                length = min(int(params.get("length", self.audio_chunk_size)), self.audio_chunk_size)
+                return await asyncio.to_thread(read_range, str(path), offset, length)
             
             if uri_str == "voiceover://voices":
                 try:
-                    # Get voices from cache
-                    voices, needs_refresh = await self.db.get_voices()
-                    
-                    # Refresh cache if needed
-                    if needs_refresh:
-                        try:
-                            fresh_voices = await asyncio.to_thread(self.api.get_voices)
-                            await self.db.upsert_voices(fresh_voices)
-                            voices = fresh_voices
-                        except Exception as e:
-                            logging.error(f"Error refreshing voices: {e}")
-                            # Continue with cached data if refresh fails
-                            if not voices:
-                                raise  # Re-raise if we have no data at all
-                    
-                    # Ensure default voice is marked
-                    for voice in voices:
-                        voice["is_default"] = voice["voice_id"] == self.api.voice_id
-                    
-                    return json.dumps(voices, indent=2)
+                    return json.dumps(await self.list_voices(), indent=2)
                 except Exception as e:
                     return json.dumps({"error": str(e)}, indent=2)
             
@@ -183,21 +697,20 @@ class ElevenLabsServer:
                 raise ValueError(f"Invalid resource URI: {uri_str}")
 
             try:
-                # Extract job_id if present
-                parts = uri_str.split("/")
-                logging.info(f"Parts: {parts}")
-                if len(parts) > 3 and unquote(parts[3]) != '{job_id}':
-                    job_id = parts[3]
+                # Extract job_id if present, any query string holds paging and filters
+                parsed = urlsplit(uri_str)
+                job_id = unquote(parsed.path.strip("/"))
+                logging.info(f"History resource path: {parsed.path}, query: {parsed.query}")
+                if job_id and job_id != '{job_id}':
                     job = await self.db.get_job(job_id)
                     if not job:
                         return json.dumps({"error": "Job not found"}, indent=2)
-                    jobs = [job]
-                else:
-                    jobs = await self.db.get_all_jobs()
+                    return json.dumps([job.to_dict()], indent=2)
 
-                # Convert jobs to JSON
-                jobs_data = [job.to_dict() for job in jobs]
-                return json.dumps(jobs_data, indent=2)
+                # Pages stay a plain array, "<created_at>,<id>" of the last job is the cursor for the next page
+                params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                jobs_data, _ = await self.db.list_jobs(**self.history_filters(params, summary=False))
+                return json.dumps(jobs_data)
                 
             except Exception as e:
                 return json.dumps({"error": str(e)}, indent=2)
@@ -219,6 +732,23 @@ class ElevenLabsServer:
                             "voice_id": {
                                 "type": "string",
                                 "description": "Optional voice ID to use for generation"
+                            },
+                            "bypass_cache": {
+                                "type": "boolean",
+                                "description": "Always call the API instead of reusing cached audio for identical requests"
+                            },
+                            "background": {
+                                "type": "boolean",
+                                "description": "Return the job_id immediately and render in the background. Poll get_job_status or get_voiceover_history for the result."
+                            },
+                            "stream": {
+                                "type": "boolean",
+                                "description": "Use the streaming endpoint and write audio to the job's output_file as it arrives, so playback can start before synthesis finishes. Progress notifications then count bytes written instead of parts."
+                            },
+                            "response_mode": {
+                                "type": "string",
+                                "enum": ["inline", "reference"],
+                                "description": "inline embeds the MP3 as base64, reference returns an audio:// URI with size, duration and sha256 instead (default from ELEVENLABS_RESPONSE_MODE)"
                             }
                         },
                         "required": ["text"]
@@ -245,14 +775,154 @@ class ElevenLabsServer:
                             "script": {
                                 "type": "string",
                                 "description": "JSON string containing script array or plain text. For JSON format, provide an object with a 'script' array containing objects with 'text' (required), 'voice_id' (optional), and 'actor' (optional) fields."
+                            },
+                            "bypass_cache": {
+                                "type": "boolean",
+                                "description": "Always call the API instead of reusing cached audio for identical requests"
+                            },
+                            "background": {
+                                "type": "boolean",
+                                "description": "Return the job_id immediately and render in the background. Poll get_job_status or get_voiceover_history for the result."
+                            },
+                            "stream": {
+                                "type": "boolean",
+                                "description": "Use the streaming endpoint and write audio to the job's output_file as it arrives, so playback can start before synthesis finishes. Progress notifications then count bytes written instead of parts."
+                            },
+                            "response_mode": {
+                                "type": "string",
+                                "enum": ["inline", "reference"],
+                                "description": "inline embeds the MP3 as base64, reference returns an audio:// URI with size, duration and sha256 instead (default from ELEVENLABS_RESPONSE_MODE)"
                             }
                         },
                         "required": ["script"]
                     }
                 ),
+                types.Tool(
+                    name="generate_audio_batch",
+                    description="Generate many short, independent clips (UI prompts, notifications) in one call. Each item becomes its own MP3 file; the result is a compact manifest with an audio:// URI per item instead of embedded audio. Failed items are reported in the manifest without stopping the batch.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "items": {
+                                "type": "array",
+                                "description": f"Up to {self.MAX_BATCH_ITEMS} clips to generate",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "text": {
+                                            "type": "string",
+                                            "description": "Text to convert to audio"
+                                        },
+                                        "voice_id": {
+                                            "type": "string",
+                                            "description": "Optional voice ID, defaults to the configured voice"
+                                        },
+                                        "id": {
+                                            "type": "string",
+                                            "description": "Optional caller reference, echoed back in the manifest"
+                                        }
+                                    },
+                                    "required": ["text"]
+                                }
+                            },
+                            "max_workers": {
+                                "type": "integer",
+                                "description": "Maximum clips generated at the same time (default ELEVENLABS_MAX_WORKERS)"
+                            },
+                            "bypass_cache": {
+                                "type": "boolean",
+                                "description": "Always call the API instead of reusing cached audio for identical requests"
+                            }
+                        },
+                        "required": ["items"]
+                    }
+                ),
+                types.Tool(
+                    name="get_job_status",
+                    description="Get the status and progress of a voiceover job, e.g. one submitted with background=true",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "job_id": {
+                                "type": "string",
+                                "description": "ID of the job to check"
+                            }
+                        },
+                        "required": ["job_id"]
+                    }
+                ),
+                types.Tool(
+                    name="resume_job",
+                    description="Retry a failed or partial job. Parts finished by earlier runs are reused from disk, only missing or failed parts are synthesized again before the audio is reassembled.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "job_id": {
+                                "type": "string",
+                                "description": "ID of the job to resume"
+                            },
+                            "bypass_cache": {
+                                "type": "boolean",
+                                "description": "Always call the API instead of reusing cached audio for identical requests"
+                            },
+                            "background": {
+                                "type": "boolean",
+                                "description": "Return immediately and render in the background. Poll get_job_status for the result."
+                            },
+                            "response_mode": {
+                                "type": "string",
+                                "enum": ["inline", "reference"],
+                                "description": "inline embeds the MP3 as base64, reference returns an audio:// URI with size, duration and sha256 instead (default from ELEVENLABS_RESPONSE_MODE)"
+                            }
+                        },
+                        "required": ["job_id"]
+                    }
+                ),
+                types.Tool(
+                    name="cancel_job",
+                    description="Cancel a pending or processing job. Requests in flight are aborted; the job is marked cancelled and its finished parts are kept, so resume_job can continue it later.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "job_id": {
+                                "type": "string",
+                                "description": "ID of the job to cancel"
+                            }
+                        },
+                        "required": ["job_id"]
+                    }
+                ),
+                types.Tool(
+                    name="get_job_debug_info",
+                    description="Get the diagnostics recorded for a recent job. Collection is off unless ELEVENLABS_DEBUG_INFO is set to error, info or debug.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "job_id": {
+                                "type": "string",
+                                "description": "ID of the job to get debug info for"
+                            }
+                        },
+                        "required": ["job_id"]
+                    }
+                ),
+                types.Tool(
+                    name="get_metrics",
+                    description="Get server metrics: API request latency histograms per model, responses by status, retries, 429s, cache hit rate, database query and audio assembly/export timings, bytes sent and received, job queue depth and rate limiter state.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "format": {
+                                "type": "string",
+                                "enum": ["json", "prometheus"],
+                                "description": "json (default) summarizes histograms with estimated percentiles, prometheus returns the text exposition format"
+                            }
+                        }
+                    }
+                ),
                 types.Tool(
                     name="delete_job",
-                    description="Delete a voiceover job and its associated files",
+                    description="Delete a voiceover job and its associated files, cancelling it first if it is still running",
                     inputSchema={
                         "type": "object",
                         "properties": {
@@ -266,13 +936,26 @@ class ElevenLabsServer:
                 ),
                 types.Tool(
                     name="get_audio_file",
-                    description="Get the audio file content for a specific job",
+                    description="Get the audio file content for a specific job. Pass offset and/or length to read one byte range at a time; the response reports total_size and next_offset.",
                     inputSchema={
                         "type": "object",
                         "properties": {
                             "job_id": {
                                 "type": "string",
                                 "description": "ID of the job to get audio file for"
+                            },
+                            "response_mode": {
+                                "type": "string",
+                                "enum": ["inline", "reference"],
+                                "description": "inline embeds the MP3 as base64, reference returns an audio:// URI with size, duration and sha256 instead (default from ELEVENLABS_RESPONSE_MODE)"
+                            },
+                            "offset": {
+                                "type": "integer",
+                                "description": "Byte offset to start reading from. Use next_offset from the previous response to continue."
+                            },
+                            "length": {
+                                "type": "integer",
+                                "description": "Maximum number of bytes to return, capped at ELEVENLABS_AUDIO_CHUNK_SIZE"
                             }
                         },
                         "required": ["job_id"]
@@ -287,15 +970,86 @@ class ElevenLabsServer:
                         "required": []
                     }
                 ),
+                types.Tool(
+                    name="search_voices",
+                    description="Find voices by category, labels (accent, age, gender, use case), supported model or a substring of the name or description. All given filters must match. Prefer this over list_voices when looking for a particular kind of voice.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "query": {
+                                "type": "string",
+                                "description": "Case-insensitive substring of the voice name or description"
+                            },
+                            "category": {
+                                "type": "string",
+                                "description": "Voice category, e.g. premade, cloned, generated or professional"
+                            },
+                            "accent": {
+                                "type": "string",
+                                "description": "Accent label, e.g. american or british"
+                            },
+                            "age": {
+                                "type": "string",
+                                "description": "Age label, e.g. young, middle aged or old"
+                            },
+                            "gender": {
+                                "type": "string",
+                                "description": "Gender label, e.g. female or male"
+                            },
+                            "use_case": {
+                                "type": "string",
+                                "description": "Use case label, e.g. narration or news"
+                            },
+                            "labels": {
+                                "type": "object",
+                                "description": "Any other labels to match exactly, as {\"label\": \"value\"}",
+                                "additionalProperties": {"type": "string"}
+                            },
+                            "model_id": {
+                                "type": "string",
+                                "description": "Only voices listing this model in high_quality_base_model_ids"
+                            },
+                            "limit": {
+                                "type": "integer",
+                                "description": f"Maximum number of voices to return (default {self.SEARCH_VOICES_LIMIT}, max {self.MAX_SEARCH_VOICES_LIMIT})"
+                            }
+                        },
+                        "required": []
+                    }
+                ),
                 types.Tool(
                     name="get_voiceover_history",
-                    description="Get voiceover job history. Optionally specify a job ID for a specific job.",
+                    description="Get voiceover job history, newest first, one page at a time. Optionally specify a job ID for a specific job.",
                     inputSchema={
                         "type": "object",
                         "properties": {
                             "job_id": {
                                 "type": "string",
                                 "description": "Optional job ID to get details for a specific job"
+                            },
+                            "limit": {
+                                "type": "integer",
+                                "description": "Maximum number of jobs to return (default 50, max 500)"
+                            },
+                            "cursor": {
+                                "type": "string",
+                                "description": "next_cursor from the previous page"
+                            },
+                            "status": {
+                                "type": "string",
+                                "description": "Only return jobs with this status, or a comma separated list of statuses"
+                            },
+                            "created_after": {
+                                "type": "string",
+                                "description": "Only return jobs created at or after this ISO 8601 timestamp"
+                            },
+                            "created_before": {
+                                "type": "string",
+                                "description": "Only return jobs created before this ISO 8601 timestamp"
+                            },
+                            "summary": {
+                                "type": "boolean",
+                                "description": "Omit script_parts from each job (default true)"
                             }
                         },
                         "required": []
@@ -306,11 +1060,11 @@ class ElevenLabsServer:
         @self.server.call_tool()
         async def handle_call_tool(name: str, arguments: dict) -> list[types.TextContent | types.EmbeddedResource]:
             try:
-                debug_info = []
+                debug_info = DebugInfo()
                 
                 if name == "generate_audio_simple":
-                    debug_info.append(f"Processing simple audio request")
-                    debug_info.append(f"Arguments: {arguments}")
+                    debug_info.info("Processing simple audio request")
+                    debug_info.debug("Arguments: %s", arguments)
                     
                     text = arguments.get("text", "").strip()
                     voice_id = arguments.get("voice_id")
@@ -323,158 +1077,123 @@ class ElevenLabsServer:
                         "voice_id": voice_id
                     }]
                     
-                    debug_info.append(f"Created script parts: {script_parts}")
-                    
-                    # Create job record
-                    job_id = str(uuid.uuid4())
-                    job = AudioJob(
-                        id=job_id,
-                        status="pending",
-                        script_parts=script_parts,
-                        total_parts=1
-                    )
-                    await self.db.insert_job(job)
-                    debug_info.append(f"Created job record: {job_id}")
-
-                    try:
-                        job.status = "processing"
-                        await self.db.update_job(job)
-
-                        # # Send progress notification
-                        # if hasattr(self.server, 'session'):
-                        #     await self.server.session.send_notification({
-                        #         "method": "notifications/progress",
-                        #         "params": {
-                        #             "progressToken": str(job.id),
-                        #             "progress": {
-                        #                 "kind": "begin",
-                        #                 "message": "Starting audio generation"
-                        #             }
-                        #         }
-                        #     })
-
-                        output_file, api_debug_info, completed_parts = self.api.generate_full_audio(
-                            script_parts,
-                            self.output_dir
-                        )
-                        debug_info.extend(api_debug_info)
-
-                        job.status = "completed"
-                        job.output_file = str(output_file)
-                        job.completed_parts = completed_parts
-                        await self.db.update_job(job)
-
-                        # # Send completion notification
-                        # if hasattr(self.server, 'session'):
-                        #     await self.server.session.send_notification({
-                        #         "method": "notifications/progress",
-                        #         "params": {
-                        #             "progressToken": str(job.id),
-                        #             "progress": {
-                        #                 "kind": "end",
-                        #                 "message": "Audio generation completed"
-                        #             }
-                        #         }
-                        #     })
-                    except Exception as e:
-                        job.status = "failed"
-                        job.error = str(e)
-                        await self.db.update_job(job)
-                        raise
-                    
-                    # Read the generated audio file and encode it as base64
-                    with open(output_file, 'rb') as f:
-                        audio_bytes = f.read()
-                        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-                        
-                    # Generate unique URI for the resource
-                    filename = Path(output_file).name
-                    resource_uri = f"audio://{filename}"
-                        
-                    # Return both a status message and the audio file content
-                    return [
-                        types.TextContent(
-                            type="text",
-                            text="\n".join([
-                                "Audio generation successful. Debug info:",
-                                *debug_info
-                            ])
-                        ),
-                        types.EmbeddedResource(
-                            type="resource",
-                            resource=types.BlobResourceContents(
-                                uri=resource_uri,
-                                name=filename,
-                                blob=audio_base64,
-                                mimeType="audio/mpeg"
-                            )
-                        )
-                    ]
+                    debug_info.debug("Created script parts: %s", script_parts)
+                    return await self.generate_audio(script_parts, arguments, debug_info)
                     
                 elif name == "generate_audio_script":
                     script_json = arguments.get("script", "{}")
                     script_parts, parse_debug_info = self.parse_script(script_json)
                     debug_info.extend(parse_debug_info)
+                    return await self.generate_audio(script_parts, arguments, debug_info)
+
+                elif name == "generate_audio_batch":
+                    items = arguments.get("items") or []
+                    if not isinstance(items, list) or not items:
+                        raise ValueError("items must be a non-empty array")
+                    if len(items) > self.MAX_BATCH_ITEMS:
+                        raise ValueError(f"At most {self.MAX_BATCH_ITEMS} items are allowed per batch")
+                    items = [item if isinstance(item, dict) else {"text": item} for item in items]
 
-                    # Create job record
-                    job_id = str(uuid.uuid4())
-                    job = AudioJob(
-                        id=job_id,
-                        status="pending",
-                        script_parts=script_parts,
-                        total_parts=len(script_parts)
+                    batch_id, manifest = await self.api.generate_batch(
+                        items,
+                        self.output_dir,
+                        max_workers=arguments.get("max_workers"),
+                        bypass_cache=bool(arguments.get("bypass_cache", False))
                     )
-                    await self.db.insert_job(job)
-                    debug_info.append(f"Created job record: {job_id}")
+                    for entry in manifest:
+                        file = entry.pop("file", None)
+                        if file:
+                            entry["uri"] = f"audio://{Path(file).name}"
+                    completed = sum(entry["status"] == "completed" for entry in manifest)
+                    return [types.TextContent(
+                        type="text",
+                        text=json.dumps({
+                            "batch_id": batch_id,
+                            "completed": completed,
+                            "failed": len(manifest) - completed,
+                            "items": manifest
+                        })
+                    )]
 
-                    try:
-                        job.status = "processing"
-                        await self.db.update_job(job)
+                elif name == "get_job_status":
+                    job_id = arguments.get("job_id")
+                    if not job_id:
+                        raise ValueError("job_id is required")
 
-                        output_file, api_debug_info, completed_parts = self.api.generate_full_audio(
-                            script_parts,
-                            self.output_dir
-                        )
-                        debug_info.extend(api_debug_info)
+                    job = await self.db.get_job(job_id)
+                    if not job:
+                        return [types.TextContent(
+                            type="text",
+                            text=json.dumps({"error": "Job not found"}, indent=2)
+                        )]
 
-                        job.status = "completed"
-                        job.output_file = str(output_file)
-                        job.completed_parts = completed_parts
-                        await self.db.update_job(job)
-                    except Exception as e:
-                        job.status = "failed"
-                        job.error = str(e)
-                        await self.db.update_job(job)
-                        raise
-                    
-                    # Read the generated audio file and encode it as base64
-                    with open(output_file, 'rb') as f:
-                        audio_bytes = f.read()
-                        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-                        
-                    # Generate unique URI for the resource
-                    filename = Path(output_file).name
-                    resource_uri = f"audio://{filename}"
-                        
-                    # Return both a status message and the audio file content
-                    return [
-                        types.TextContent(
+                    return [types.TextContent(
+                        type="text",
+                        text=json.dumps(job.to_summary_dict(), indent=2)
+                    )]
+
+                elif name == "resume_job":
+                    job_id = arguments.get("job_id")
+                    if not job_id:
+                        raise ValueError("job_id is required")
+
+                    job = await self.db.get_job(job_id)
+                    if not job:
+                        return [types.TextContent(
                             type="text",
-                            text="\n".join([
-                                "Audio generation successful. Debug info:",
-                                *debug_info
-                            ])
-                        ),
-                        types.EmbeddedResource(
-                            type="resource",
-                            resource=types.BlobResourceContents(
-                                uri=resource_uri,
-                                name=filename,
-                                blob=audio_base64,
-                                mimeType="audio/mpeg"
-                            )
-                        )
-                    ]
+                            text=json.dumps({"error": "Job not found"}, indent=2)
+                        )]
+                    return await self.resume_job(job, arguments, debug_info)
+
+                elif name == "cancel_job":
+                    job_id = arguments.get("job_id")
+                    if not job_id:
+                        raise ValueError("job_id is required")
+
+                    job = await self.db.get_job(job_id)
+                    if not job:
+                        return [types.TextContent(
+                            type="text",
+                            text=json.dumps({"error": "Job not found"}, indent=2)
+                        )]
+                    job = await self.cancel_job(job)
+                    return [types.TextContent(
+                        type="text",
+                        text=json.dumps(job.to_summary_dict(), indent=2)
+                    )]
+
+                elif name == "get_job_debug_info":
+                    job_id = arguments.get("job_id")
+                    if not job_id:
+                        raise ValueError("job_id is required")
+
+                    job_debug_info = self.job_debug_info.get(job_id)
+                    if job_debug_info is None:
+                        return [types.TextContent(
+                            type="text",
+                            text=json.dumps({"error": "No debug info recorded for this job"}, indent=2)
+                        )]
+
+                    return [types.TextContent(
+                        type="text",
+                        text=json.dumps({
+                            "job_id": job_id,
+                            "summary": job_debug_info.summary,
+                            "entries": job_debug_info.to_list(),
+                            "dropped": job_debug_info.dropped
+                        }, indent=2)
+                    )]
+
+                elif name == "get_metrics":
+                    output_format = (arguments or {}).get("format", "json")
+                    if output_format == "prometheus":
+                        return [types.TextContent(type="text", text=metrics.render())]
+                    if output_format != "json":
+                        raise ValueError(f"Invalid format: {output_format}. Must be 'json' or 'prometheus'")
+                    return [types.TextContent(
+                        type="text",
+                        text=json.dumps(self.metrics_report(), indent=2)
+                    )]
 
                 elif name == "delete_job":
                     job_id = arguments.get("job_id")
@@ -488,6 +1207,14 @@ class ElevenLabsServer:
                             type="text",
                             text=f"Job {job_id} not found"
                         )]
+                    if job.status in self.CANCELLABLE_STATUSES:
+                        # Stop it first, a running job would keep writing the files removed below
+                        job = await self.cancel_job(job)
+                        if not job:
+                            return [types.TextContent(
+                                type="text",
+                                text=f"Job {job_id} not found"
+                            )]
 
                     # Delete associated audio file if it exists
                     if job.output_file:
@@ -501,8 +1228,16 @@ class ElevenLabsServer:
                                 text=f"Error deleting audio file: {str(e)}"
                             )]
 
-                    # Delete job from database
+                    # Delete checkpointed segments and the job from database
+                    await JobCheckpoint(self.db, job_id, self.segments_dir).remove_segments()
                     deleted = await self.db.delete_job(job_id)
+                    self.job_debug_info.discard(job_id)
+                    if not deleted:
+                        # Removed by another request while the files were being deleted
+                        return [types.TextContent(
+                            type="text",
+                            text=f"Job {job_id} not found"
+                        )]
                     return [types.TextContent(
                         type="text",
                         text=f"Successfully deleted job {job_id} and associated files"
@@ -510,28 +1245,9 @@ class ElevenLabsServer:
                 
                 elif name == "list_voices":
                     try:
-                        # Get voices from cache
-                        voices, needs_refresh = await self.db.get_voices()
-                        
-                        # Refresh cache if needed
-                        if needs_refresh:
-                            try:
-                                fresh_voices = await asyncio.to_thread(self.api.get_voices)
-                                await self.db.upsert_voices(fresh_voices)
-                                voices = fresh_voices
-                            except Exception as e:
-                                logging.error(f"Error refreshing voices: {e}")
-                                # Continue with cached data if refresh fails
-                                if not voices:
-                                    raise  # Re-raise if we have no data at all
-                        
-                        # Ensure default voice is marked
-                        for voice in voices:
-                            voice["is_default"] = voice["voice_id"] == self.api.voice_id
-                        
                         return [types.TextContent(
                             type="text",
-                            text=json.dumps(voices, indent=2)
+                            text=json.dumps(await self.list_voices(), indent=2)
                         )]
                     except Exception as e:
                         return [types.TextContent(
@@ -539,6 +1255,30 @@ class ElevenLabsServer:
                             text=json.dumps({"error": str(e)}, indent=2)
                         )]
 
+                elif name == "search_voices":
+                    labels = dict(arguments.get("labels") or {})
+                    for key in ("accent", "age", "gender", "use_case"):
+                        if arguments.get(key):
+                            labels[key] = arguments[key]
+                    limit = min(int(arguments.get("limit") or self.SEARCH_VOICES_LIMIT), self.MAX_SEARCH_VOICES_LIMIT)
+
+                    voices, total = await self.voices.search(
+                        category=arguments.get("category"),
+                        labels=labels,
+                        query=arguments.get("query"),
+                        model_id=arguments.get("model_id"),
+                        limit=limit
+                    )
+                    return [types.TextContent(
+                        type="text",
+                        text=json.dumps({
+                            "voices": [
+                                {**voice, "is_default": voice["voice_id"] == self.api.voice_id} for voice in voices
+                            ],
+                            "total": total
+                        })
+                    )]
+
                 elif name == "get_voiceover_history":
                     try:
                         job_id = arguments.get("job_id")
@@ -549,15 +1289,17 @@ class ElevenLabsServer:
                                     type="text",
                                     text=json.dumps({"error": "Job not found"}, indent=2)
                                 )]
-                            jobs = [job]
-                        else:
-                            jobs = await self.db.get_all_jobs()
+                            return [types.TextContent(
+                                type="text",
+                                text=json.dumps([job.to_dict()], indent=2)
+                            )]
 
-                        # Convert jobs to JSON
-                        jobs_data = [job.to_dict() for job in jobs]
+                        jobs_data, next_cursor = await self.db.list_jobs(
+                            **self.history_filters(arguments, summary=True)
+                        )
                         return [types.TextContent(
                             type="text",
-                            text=json.dumps(jobs_data, indent=2)
+                            text=json.dumps({"jobs": jobs_data, "next_cursor": next_cursor})
                         )]
                         
                     except Exception as e:
@@ -593,23 +1335,11 @@ class ElevenLabsServer:
                             text=f"Output file not found at {job.output_file}"
                         )]
 
-                    # Read the audio file and encode it as base64
-                    with open(output_path, 'rb') as f:
-                        audio_bytes = f.read()
-                        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-
-                    # Return the audio file content
-                    return [
-                        types.EmbeddedResource(
-                            type="resource",
-                            resource=types.BlobResourceContents(
-                                uri=f"audio://{output_path.name}",
-                                name=output_path.name,
-                                blob=audio_base64,
-                                mimeType="audio/mpeg"
-                            )
+                    if "offset" in arguments or "length" in arguments:
+                        return await self.audio_chunk_response(
+                            job_id, output_path, int(arguments.get("offset") or 0), arguments.get("length")
                         )
-                    ]
+                    return await self.audio_response(job_id, output_path, arguments)
                     
                 else:
                     return [types.TextContent(
@@ -628,27 +1358,6 @@ class ElevenLabsServer:
                     text=error_msg
                 )]
 
-    def setup_notifications(self):
-        """Set up notification handlers"""
-        @self.server.progress_notification()
-        async def handle_cancelled(params: dict):
-            request_id = params.get("requestId")
-            reason = params.get("reason", "Unknown reason")
-            logging.info(f"Received cancellation for request {request_id}: {reason}")
-            
-            # Send proper cancellation notification
-            if hasattr(self.server, 'session'):
-                await self.server.session.send_notification({
-                    "method": "notifications/progress",
-                    "params": {
-                        "progressToken": str(request_id),
-                        "progress": {
-                            "kind": "cancelled",
-                            "message": f"Request cancelled: {reason}"
-                        }
-                    }
-                })
-
     async def run(self):
         """Run the server"""
         try:
@@ -656,19 +1365,33 @@ class ElevenLabsServer:
         except Exception as e:
             print(f"Error initializing server: {e}")
             raise
-        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-            await self.server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="elevenlabs-server",
-                    server_version="0.1.0",
-                    capabilities=self.server.get_capabilities(
-                        notification_options=NotificationOptions(),
-                        experimental_capabilities={},
+        try:
+            async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+                await self.server.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="elevenlabs-server",
+                        server_version="0.1.0",
+                        capabilities=self.server.get_capabilities(
+                            notification_options=NotificationOptions(),
+                            experimental_capabilities={},
+                        )
                     )
                 )
-            )
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self):
+        """Stop background workers and release pooled connections held by server components."""
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            await self._metrics_server.wait_closed()
+            self._metrics_server = None
+        await self.jobs.stop()
+        await self.voices.close()
+        await self.api.aclose()
+        await self.db.close()
 
 def main():
     """Entry point for the server"""
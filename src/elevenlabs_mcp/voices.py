@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from .database import Database
+
+VoiceFetcher = Callable[[], Awaitable[List[dict]]]
+
+
+def label_key(key: str) -> str:
+    """Normalize label keys so "use case", "Use-Case" and "use_case" match."""
+    return key.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+class VoiceIndex:
+    """
+    In-memory voice catalog, loaded from the voices table and indexed by voice_id,
+    label, category and supported model, so searches intersect precomputed sets
+    instead of scanning the catalog.
+
+    Reads are served from memory. Once the catalog is older than max_age_seconds,
+    a read returns the current data right away and starts a refresh in the
+    background (stale-while-revalidate); concurrent refreshes share one upstream
+    call. Only a cold start with nothing cached waits for the first fetch. After a
+    failed refresh, reads wait retry_seconds before trying the API again.
+    """
+
+    RETRY_SECONDS = 60
+
+    def __init__(self, db: Database, fetch: VoiceFetcher, max_age_seconds: Optional[int] = None,
+                 retry_seconds: Optional[float] = None):
+        self.db = db
+        self.fetch = fetch
+        self.max_age_seconds = max_age_seconds or Database.CACHE_DURATION_SECONDS
+        self.retry_seconds = self.RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self._voices: Dict[str, dict] = {}
+        self._by_label: Dict[tuple[str, str], Set[str]] = {}
+        self._by_category: Dict[str, Set[str]] = {}
+        self._by_model: Dict[str, Set[str]] = {}
+        # voice_id -> position in name order, and lowercased name + description for substring search
+        self._rank: Dict[str, int] = {}
+        self._search_text: Dict[str, str] = {}
+        self._loaded = False
+        # time.monotonic() of the last successful refresh, None when the data is stale
+        self._refreshed_at: Optional[float] = None
+        # time.monotonic() of the last failed refresh, cleared by a successful one
+        self._failed_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _build(self, voices: List[dict]) -> None:
+        """Replace the catalog and rebuild the indexes. voices is expected in name order."""
+        by_label = defaultdict(set)
+        by_category = defaultdict(set)
+        by_model = defaultdict(set)
+        for voice in voices:
+            voice_id = voice["voice_id"]
+            for key, value in voice["labels"].items():
+                by_label[(label_key(key), str(value).lower())].add(voice_id)
+            by_category[(voice["category"] or "").lower()].add(voice_id)
+            for model_id in voice["high_quality_base_model_ids"]:
+                by_model[model_id].add(voice_id)
+        # Swap in complete structures so readers never see a half built index
+        self._voices = {voice["voice_id"]: voice for voice in voices}
+        self._by_label = dict(by_label)
+        self._by_category = dict(by_category)
+        self._by_model = dict(by_model)
+        self._rank = {voice["voice_id"]: rank for rank, voice in enumerate(voices)}
+        self._search_text = {
+            voice["voice_id"]: f"{voice['name']}\n{voice['description']}".lower() for voice in voices
+        }
+
+    @property
+    def is_stale(self) -> bool:
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.max_age_seconds
+
+    @property
+    def backing_off(self) -> bool:
+        """True while a recently failed refresh should not be retried yet."""
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_seconds
+
+    async def load(self) -> None:
+        """Load the cached catalog from the database, refreshing in the background if it is stale."""
+        voices, needs_refresh = await self.db.get_voices(self.max_age_seconds)
+        age = await self.db.get_voices_age()
+        self._build(voices)
+        self._loaded = True
+        # Age the catalog by when it was actually fetched, not by when it was loaded
+        self._refreshed_at = None if needs_refresh or age is None else time.monotonic() - age
+        if needs_refresh:
+            self.refresh()
+
+    def refresh(self) -> asyncio.Task:
+        """Start a refresh from the API, or return the one already in flight."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh(), name="elevenlabs-voice-refresh")
+        return self._refresh_task
+
+    async def _refresh(self) -> None:
+        try:
+            voices = await self.fetch()
+            counts = await self.db.upsert_voices(voices)
+        except Exception as e:
+            # Keep serving what we have, the first read after retry_seconds tries again
+            logging.error(f"Error refreshing voices: {e}")
+            self._failed_at = time.monotonic()
+            return
+        self._build(sorted(voices, key=lambda voice: voice["name"]))
+        self._refreshed_at = time.monotonic()
+        self._failed_at = None
+        logging.info(f"Cached {len(voices)} voices ({counts['written']} written, {counts['deleted']} deleted)")
+
+    async def _ensure_fresh(self) -> None:
+        if not self._loaded:
+            await self.load()
+        if self.is_stale and not self.backing_off:
+            task = self.refresh()
+            if not self._voices:
+                # Nothing to serve yet, wait for the first fetch
+                await asyncio.shield(task)
+        if not self._voices and self.is_stale:
+            raise Exception("No voices available, fetching the voice catalog failed")
+
+    async def all(self) -> List[dict]:
+        """Every voice, ordered by name."""
+        await self._ensure_fresh()
+        return list(self._voices.values())
+
+    async def search(self, category: Optional[str] = None, labels: Optional[Dict[str, str]] = None,
+                     query: Optional[str] = None, model_id: Optional[str] = None,
+                     limit: int = 20) -> tuple[List[dict], int]:
+        """
+        Voices matching every given filter, ordered by name. Labels and category match
+        exactly (ignoring case), query is a substring of the name or description.
+        Returns (at most limit voices, total number of matches).
+        """
+        await self._ensure_fresh()
+        postings = []
+        if category:
+            postings.append(self._by_category.get(category.lower(), set()))
+        for key, value in (labels or {}).items():
+            if value:
+                postings.append(self._by_label.get((label_key(key), str(value).lower()), set()))
+        if model_id:
+            postings.append(self._by_model.get(model_id, set()))
+
+        if postings:
+            # Intersect starting from the rarest filter, then restore name order
+            postings.sort(key=len)
+            ordered = sorted(set(postings[0]).intersection(*postings[1:]), key=self._rank.__getitem__)
+        else:
+            # The catalog itself is already in name order
+            ordered = list(self._voices)
+        if query:
+            needle = query.lower()
+            ordered = [voice_id for voice_id in ordered if needle in self._search_text[voice_id]]
+
+        return [self._voices[voice_id] for voice_id in ordered[:max(0, limit)]], len(ordered)
+
+    async def close(self) -> None:
+        """Cancel a refresh still in flight."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
@@ -0,0 +1,59 @@
+import inspect
+
+import httpx
+import mcp.types as types
+import pytest_asyncio
+from elevenlabs_mcp.audio import silent_mp3
+from elevenlabs_mcp.database import Database
+from elevenlabs_mcp.server import ElevenLabsServer
+
+
+class ServerHarness:
+    """
+    An ElevenLabsServer writing to a temporary directory, with its own history
+    database and every API request answered by handler. handler takes an
+    httpx.Request and returns (or, if async, resolves to) an httpx.Response;
+    by default every request gets two frames of silence.
+    """
+
+    def __init__(self, server: ElevenLabsServer):
+        self.server = server
+        self.handler = lambda request: httpx.Response(200, content=silent_mp3(2), headers={"request-id": "req-1"})
+        server.api._client = httpx.AsyncClient(transport=httpx.MockTransport(self._handle))
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        response = self.handler(request)
+        return await response if inspect.isawaitable(response) else response
+
+    async def call_tool(self, name: str, arguments: dict) -> types.ServerResult:
+        call_tool = self.server.server.request_handlers[types.CallToolRequest]
+        return await call_tool(types.CallToolRequest(
+            method="tools/call",
+            params=types.CallToolRequestParams(name=name, arguments=arguments)
+        ))
+
+    async def read_resource(self, uri: str) -> types.ServerResult:
+        read_resource = self.server.server.request_handlers[types.ReadResourceRequest]
+        return await read_resource(types.ReadResourceRequest(
+            method="resources/read", params=types.ReadResourceRequestParams(uri=uri)
+        ))
+
+
+@pytest_asyncio.fixture
+async def harness(monkeypatch, tmp_path):
+    """ServerHarness with the segment cache off. Background workers are not started."""
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_ENABLED", "false")
+    # The server creates ./output and points ELEVENLABS_OUTPUT_DIR at it
+    monkeypatch.setenv("ELEVENLABS_OUTPUT_DIR", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+
+    server = ElevenLabsServer()
+    server.output_dir = tmp_path
+    server.db = server.jobs.db = server.voices.db = Database(str(tmp_path / "history.db"))
+    await server.db.initialize()
+    harness = ServerHarness(server)
+    try:
+        yield harness
+    finally:
+        await server.shutdown()
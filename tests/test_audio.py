@@ -0,0 +1,97 @@
+from elevenlabs_mcp.audio import (IncrementalAssembler, leading_header_size, parse_frame_header, scan_mp3, silent_mp3,
+                                  stitch_mp3)
+
+
+def read_frames(data):
+    """Return the bitrates of every frame in data after the Info/Xing frame."""
+    stream = scan_mp3(data)
+    pos = stream.start
+    bitrates = []
+    while pos < stream.end:
+        header = parse_frame_header(data, pos)
+        bitrates.append(header.bitrate // 1000)
+        pos += header.frame_length
+    return bitrates
+
+
+def test_scan_skips_id3_and_info_frame():
+    data = silent_mp3(5)
+    stream = scan_mp3(data)
+
+    assert stream.frame_count == 5
+    assert stream.start > 0
+    assert stream.end == len(data)
+
+
+def test_scan_rejects_non_mp3_data():
+    assert scan_mp3(b"not audio at all") is None
+    assert scan_mp3(silent_mp3(3) + b"junk") is None
+
+
+def test_leading_header_size_waits_for_enough_bytes():
+    data = silent_mp3(3)
+    start = scan_mp3(data).start
+
+    assert [leading_header_size(data[:size]) for size in (0, 5, 30)] == [None, None, None]
+    assert leading_header_size(data[:start]) == start
+    assert leading_header_size(silent_mp3(3, id3=False, xing=False)) == 0
+    assert leading_header_size(b"not an mp3 stream") == 0
+
+
+def test_stitch_concatenates_frames_in_order(tmp_path):
+    output_file = tmp_path / "out.mp3"
+
+    assert stitch_mp3([silent_mp3(3, bitrate_kbps=64), silent_mp3(2, bitrate_kbps=128)], str(output_file))
+
+    data = output_file.read_bytes()
+    assert not data.startswith(b"ID3")
+    assert read_frames(data) == [64, 64, 64, 128, 128]
+    # A single Xing header describes the whole VBR result
+    assert b"Xing" in data[:64]
+    assert int.from_bytes(data[data.index(b"Xing") + 8:data.index(b"Xing") + 12], "big") == 5
+
+
+def test_stitch_refuses_mismatched_sample_rates(tmp_path):
+    output_file = tmp_path / "out.mp3"
+
+    assert not stitch_mp3([silent_mp3(2, sample_rate=44100), silent_mp3(2, sample_rate=48000)], str(output_file))
+    assert not output_file.exists()
+
+
+def test_incremental_assembler_writes_out_of_order_parts_in_order(tmp_path):
+    output_file = tmp_path / "out.mp3"
+    assembler = IncrementalAssembler(str(output_file))
+
+    assembler.add(2, silent_mp3(1, bitrate_kbps=96))
+    assembler.add(0, silent_mp3(2, bitrate_kbps=64))
+    assert assembler.pending_parts == 1
+    assembler.skip(1)
+    assert assembler.pending_parts == 0
+
+    assert assembler.close()
+    assert read_frames(output_file.read_bytes()) == [64, 64, 96]
+
+
+def test_incremental_assembler_falls_back_for_unstitchable_parts(tmp_path):
+    output_file = tmp_path / "out.mp3"
+    calls = []
+    assembler = IncrementalAssembler(str(output_file), fallback=lambda parts, out: calls.append(parts))
+
+    assembler.add(0, silent_mp3(2))
+    assembler.add(1, b"not audio")
+    assembler.add(2, silent_mp3(3))
+    assert assembler.close()
+
+    stitched, unparsable, last = calls[0]
+    assert scan_mp3(stitched).frame_count == 2
+    assert unparsable == b"not audio"
+    assert last == silent_mp3(3)
+
+
+def test_incremental_assembler_without_parts_leaves_no_file(tmp_path):
+    output_file = tmp_path / "out.mp3"
+    assembler = IncrementalAssembler(str(output_file))
+    assembler.skip(0)
+
+    assert not assembler.close()
+    assert not output_file.exists()
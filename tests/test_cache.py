@@ -0,0 +1,46 @@
+import os
+
+from elevenlabs_mcp.cache import SynthesisCache
+
+
+def test_cache_round_trip_and_counters(tmp_path):
+    cache = SynthesisCache(str(tmp_path))
+    key = cache.make_key("voice1", {"text": "Hello", "model_id": "m"})
+
+    assert cache.get(key) is None
+    cache.put(key, b"mp3-bytes", "req-1")
+
+    assert cache.get(key) == (b"mp3-bytes", "req-1")
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_key_covers_voice_and_request_fields():
+    base = {"text": "Hello", "model_id": "m", "voice_settings": {"stability": 0.5}}
+    key = SynthesisCache.make_key("voice1", base)
+
+    assert key == SynthesisCache.make_key("voice1", dict(base))
+    assert key != SynthesisCache.make_key("voice2", base)
+    assert key != SynthesisCache.make_key("voice1", {**base, "previous_text": "Hi"})
+    assert key != SynthesisCache.make_key("voice1", {**base, "voice_settings": {"stability": 0.6}})
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = SynthesisCache(str(tmp_path), max_bytes=10)
+    cache.put("a", b"1234", "req-a")
+    cache.put("b", b"1234", "req-b")
+    # Touch "a" so "b" becomes the eviction candidate
+    assert cache.get("a") is not None
+    cache.put("c", b"1234", "req-c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"1234", "req-a")
+    assert cache.get("c") == (b"1234", "req-c")
+    assert not os.path.exists(tmp_path / "b.mp3")
+    assert cache.stats()["bytes"] == 8
+
+
+def test_cache_persists_across_instances(tmp_path):
+    SynthesisCache(str(tmp_path)).put("a", b"audio", "req-a")
+
+    assert SynthesisCache(str(tmp_path)).get("a") == (b"audio", "req-a")
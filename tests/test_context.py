@@ -0,0 +1,43 @@
+from elevenlabs_mcp.context import ContextWindows
+
+TEXTS = ["Hello there. How are you?", "I am fine! Thanks.", "", "Bye now. See you soon.", "End."]
+
+
+def test_unlimited_budget_matches_full_script_context():
+    windows = ContextWindows(TEXTS)
+
+    for i in range(len(TEXTS)):
+        previous = windows.previous(i)
+        following = windows.next(i)
+        assert previous == (" ".join(TEXTS[:i]).strip() if i else None)
+        assert following == (" ".join(TEXTS[i + 1:]).strip() if i < len(TEXTS) - 1 else None)
+
+
+def test_sentence_budget_keeps_nearest_sentences():
+    windows = ContextWindows(TEXTS, max_sentences=1)
+
+    assert windows.previous(1) == "How are you?"
+    assert windows.next(1) == "Bye now."
+    assert windows.previous(3) == "Thanks."
+    assert windows.next(3) == "End."
+
+
+def test_char_budget_cuts_at_word_boundaries():
+    windows = ContextWindows(["one two three four", "middle", "five six seven eight"], max_chars=10)
+
+    assert windows.previous(1) == "three four"
+    assert windows.next(1) == "five six"
+
+
+def test_bytes_saved_counts_trimmed_context():
+    texts = ["é" * 100, "middle", "x" * 100]
+    windows = ContextWindows(texts, max_chars=10)
+
+    # A single word longer than the budget is cut rather than dropped
+    assert windows.previous(1) == "é" * 10
+    assert windows.next(1) == "x" * 10
+    # "é" is two bytes in UTF-8
+    assert windows.bytes_saved == (200 - 20) + (100 - 10)
+    # Asking for the same context again does not count it twice
+    windows.previous(1)
+    assert windows.bytes_saved == (200 - 20) + (100 - 10)
@@ -0,0 +1,153 @@
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+
+from elevenlabs_mcp.database import Database
+from elevenlabs_mcp.models import AudioJob
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    db = Database(str(tmp_path / "history.db"))
+    await db.initialize()
+    yield db
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_connection_uses_wal(db):
+    connection = await db._connection()
+    async with connection.execute("PRAGMA journal_mode") as cursor:
+        assert (await cursor.fetchone())[0] == "wal"
+
+    await db.insert_job(AudioJob(id="job-1", status="pending", script_parts=[{"text": "hi"}]))
+    assert (await db.get_job("job-1")).status == "pending"
+    assert await db._connection() is connection
+
+
+@pytest.mark.asyncio
+async def test_close_and_reopen(db):
+    await db.insert_job(AudioJob(id="job-1", status="pending", script_parts=[{"text": "hi"}]))
+    await db.close()
+
+    job = await db.get_job("job-1")
+    job.status = "completed"
+    await db.update_job(job)
+
+    assert (await db.get_job("job-1")).status == "completed"
+    assert await db.delete_job("job-1")
+    assert await db.get_job("job-1") is None
+
+
+@pytest.mark.asyncio
+async def test_list_jobs_keyset_pagination_and_filters(db):
+    for i in range(5):
+        job = AudioJob(
+            id=f"job-{i}",
+            status="failed" if i % 2 else "completed",
+            script_parts=[{"text": f"part {i}"}],
+            created_at=datetime(2024, 1, 1 + i),
+            updated_at=datetime(2024, 1, 1 + i)
+        )
+        await db.insert_job(job)
+
+    first_page, cursor = await db.list_jobs(limit=2)
+    second_page, cursor = await db.list_jobs(limit=2, cursor=cursor)
+    # The cursor does not depend on the job it points at still existing
+    assert cursor == "2024-01-02T00:00:00,job-1"
+    await db.delete_job("job-1")
+    last_page, end = await db.list_jobs(limit=2, cursor=cursor)
+
+    assert [job["id"] for job in first_page + second_page + last_page] == [
+        "job-4", "job-3", "job-2", "job-1", "job-0"
+    ]
+    assert end is None
+    assert "script_parts" not in first_page[0]
+
+    failed, _ = await db.list_jobs(statuses=["failed"], summary=False)
+    assert [job["id"] for job in failed] == ["job-3"]
+    assert failed[0]["script_parts"] == [{"text": "part 3"}]
+
+    recent, _ = await db.list_jobs(created_after=datetime(2024, 1, 3).isoformat(),
+                                   created_before=datetime(2024, 1, 5).isoformat())
+    assert [job["id"] for job in recent] == ["job-3", "job-2"]
+
+
+@pytest.mark.asyncio
+async def test_history_queries_use_indexes(db):
+    connection = await db._connection()
+    async with connection.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM audio_jobs WHERE status IN ('failed') ORDER BY created_at DESC, id DESC"
+    ) as cursor:
+        plan = " ".join(row[-1] for row in await cursor.fetchall())
+
+    assert "idx_audio_jobs_status_created_at" in plan
+
+
+def catalog_voice(voice_id, name, description=""):
+    return {
+        "voice_id": voice_id,
+        "name": name,
+        "category": "premade",
+        "labels": {"accent": "american"},
+        "description": description,
+        "preview_url": "",
+        "high_quality_base_model_ids": []
+    }
+
+
+@pytest.mark.asyncio
+async def test_upsert_voices_writes_only_changes_and_deletes_vanished(db):
+    first = await db.upsert_voices([catalog_voice("v1", "Alice"), catalog_voice("v2", "Bob")])
+    second = await db.upsert_voices([catalog_voice("v1", "Alice"), catalog_voice("v3", "Carl", "new")])
+    third = await db.upsert_voices([catalog_voice("v1", "Alice", "changed"), catalog_voice("v3", "Carl", "new")])
+
+    assert first == {"written": 2, "deleted": 0, "unchanged": 0}
+    assert second == {"written": 1, "deleted": 1, "unchanged": 1}
+    assert third == {"written": 1, "deleted": 0, "unchanged": 1}
+    voices, needs_refresh = await db.get_voices()
+    assert [(voice["voice_id"], voice["description"]) for voice in voices] == [("v1", "changed"), ("v3", "new")]
+    assert not needs_refresh
+
+
+@pytest.mark.asyncio
+async def test_initialize_adds_content_hash_to_existing_voices_table(tmp_path):
+    path = str(tmp_path / "old.db")
+    db = Database(path)
+    connection = await db._connection()
+    await connection.execute(
+        "CREATE TABLE voices (voice_id TEXT PRIMARY KEY, name TEXT NOT NULL, category TEXT, labels TEXT, "
+        "description TEXT, preview_url TEXT, high_quality_base_model_ids TEXT, last_updated TEXT NOT NULL)"
+    )
+    await connection.execute(
+        "INSERT INTO voices VALUES ('v1', 'Alice', 'premade', '{}', '', '', '[]', ?)",
+        (datetime.utcnow().isoformat(),)
+    )
+    await connection.commit()
+    try:
+        await db.initialize()
+        voices, needs_refresh = await db.get_voices()
+        assert [voice["voice_id"] for voice in voices] == ["v1"]
+        assert not needs_refresh
+
+        assert await db.upsert_voices([catalog_voice("v1", "Alice")]) == {"written": 1, "deleted": 0, "unchanged": 0}
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_job_parts_are_upserted_and_deleted_with_the_job(db):
+    await db.insert_job(AudioJob(id="job-1", status="processing", script_parts=[{"text": "a"}, {"text": "b"}]))
+    await db.save_job_part("job-1", 1, "failed", error="boom")
+    await db.save_job_part("job-1", 0, "completed", "/tmp/part_0.mp3", "req-0")
+    await db.save_job_part("job-1", 1, "completed", "/tmp/part_1.mp3", "req-1")
+
+    parts = await db.get_job_parts("job-1")
+    assert [(part["part_index"], part["status"], part["request_id"], part["error"]) for part in parts] == [
+        (0, "completed", "req-0", None),
+        (1, "completed", "req-1", None),
+    ]
+
+    assert await db.delete_job("job-1")
+    assert await db.get_job_parts("job-1") == []
@@ -0,0 +1,65 @@
+from elevenlabs_mcp.diagnostics import DebugInfo, DebugInfoStore
+
+
+class CountingRepr:
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "formatted"
+
+
+def test_off_by_default_and_never_formats(monkeypatch):
+    monkeypatch.delenv("ELEVENLABS_DEBUG_INFO", raising=False)
+    value = CountingRepr()
+    debug_info = DebugInfo()
+
+    debug_info.error("Part failed: %s", value)
+
+    assert len(debug_info) == 0
+    assert value.calls == 0
+
+
+def test_level_gates_entries_and_formats_lazily():
+    value = CountingRepr()
+    debug_info = DebugInfo(level="info")
+
+    debug_info.debug("Raw input: %s", value)
+    debug_info.info("Part: %s", value)
+    assert value.calls == 0
+
+    assert list(debug_info) == ["Part: formatted"]
+    assert debug_info.to_list()[0]["level"] == "info"
+
+
+def test_ring_buffer_keeps_newest_entries_and_truncates():
+    debug_info = DebugInfo(level="debug", max_entries=2, max_chars=5)
+
+    for i in range(4):
+        debug_info.info("entry %s", i)
+    debug_info.info("x" * 8)
+
+    assert debug_info.dropped == 3
+    assert list(debug_info) == ["entry... [2 chars truncated]", "xxxxx... [3 chars truncated]"]
+
+
+def test_summary_is_kept_at_every_level_and_merged_by_extend():
+    debug_info = DebugInfo(level="off")
+    other = DebugInfo(level="off")
+
+    debug_info.count("context_bytes_saved", 10)
+    other.count("context_bytes_saved", 5)
+    debug_info.extend(other)
+
+    assert debug_info.summary == {"context_bytes_saved": 15}
+    assert len(debug_info) == 0
+
+
+def test_store_keeps_most_recent_jobs():
+    store = DebugInfoStore(max_jobs=2)
+    for job_id in ("a", "b", "c"):
+        store.put(job_id, DebugInfo(level="info"))
+
+    assert store.get("a") is None
+    assert store.get("c") is not None
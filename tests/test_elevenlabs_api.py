@@ -0,0 +1,349 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from elevenlabs_mcp.audio import parse_frame_header, scan_mp3, silent_mp3
+from elevenlabs_mcp.elevenlabs_api import AsyncElevenLabsAPI, ElevenLabsAPI
+
+# Each fake part is a short MP3 at its own bitrate so the output order can be read back
+BITRATES = {"a": 32, "b": 40, "c": 48, "one": 56, "two": 64,
+            "part1": 80, "part2": 96, "part3": 112, "part4": 128}
+
+
+def fake_mp3(text):
+    return silent_mp3(2, bitrate_kbps=BITRATES[text])
+
+
+def part_order(output_file):
+    """Read back which fake parts ended up in output_file, in order."""
+    with open(output_file, "rb") as f:
+        data = f.read()
+    stream = scan_mp3(data)
+    by_bitrate = {bitrate: text for text, bitrate in BITRATES.items()}
+    order = []
+    pos = stream.start
+    while pos < stream.end:
+        header = parse_frame_header(data, pos)
+        text = by_bitrate[header.bitrate // 1000]
+        if not order or order[-1] != text:
+            order.append(text)
+        pos += header.frame_length
+    return order
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_DIR", str(tmp_path / "cache"))
+    return ElevenLabsAPI()
+
+
+def test_generate_full_audio_runs_parts_concurrently_in_script_order(api, tmp_path):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    calls = []
+
+    def fake_segment(text, voice_id, previous_text=None, next_text=None,
+                     previous_request_ids=None, debug_info=None, bypass_cache=False):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+            calls.append((text, previous_text, next_text, previous_request_ids))
+        # Later parts finish first to prove reassembly does not follow completion order
+        time.sleep(0.05 / int(text[-1]))
+        with lock:
+            active -= 1
+        return fake_mp3(text), f"req-{text}"
+
+    api.generate_audio_segment = fake_segment
+    script_parts = [{"text": f"part{i}"} for i in range(1, 5)]
+
+    output_file, debug_info, completed_parts = api.generate_full_audio(
+        script_parts, tmp_path, max_workers=4
+    )
+
+    assert completed_parts == 4
+    assert peak > 1
+    assert part_order(output_file) == ["part1", "part2", "part3", "part4"]
+    by_text = {text: (prev, nxt, ids) for text, prev, nxt, ids in calls}
+    assert by_text["part1"] == (None, "part2 part3 part4", None)
+    assert by_text["part3"] == ("part1 part2", "part4", None)
+
+
+def test_generate_full_audio_stitching_chains_request_ids(api, tmp_path):
+    seen_ids = []
+
+    def fake_segment(text, voice_id, previous_text=None, next_text=None,
+                     previous_request_ids=None, debug_info=None, bypass_cache=False):
+        seen_ids.append(list(previous_request_ids))
+        return fake_mp3(text), f"req-{text}"
+
+    api.generate_audio_segment = fake_segment
+    script_parts = [{"text": "a"}, {"text": "b"}, {"text": "c"}]
+
+    output_file, _, completed_parts = api.generate_full_audio(
+        script_parts, tmp_path, stitch_request_ids=True
+    )
+
+    assert completed_parts == 3
+    assert seen_ids == [[], ["req-a"], ["req-a", "req-b"]]
+    assert part_order(output_file) == ["a", "b", "c"]
+
+
+def test_generate_full_audio_skips_failed_parts(api, monkeypatch, tmp_path):
+    monkeypatch.setenv("ELEVENLABS_DEBUG_INFO", "error")
+    def fake_segment(text, voice_id, previous_text=None, next_text=None,
+                     previous_request_ids=None, debug_info=None, bypass_cache=False):
+        if text == "bad":
+            raise Exception("boom")
+        return fake_mp3(text), f"req-{text}"
+
+    api.generate_audio_segment = fake_segment
+    script_parts = [{"text": "a"}, {"text": "bad"}, {"text": "c"}]
+
+    output_file, debug_info, completed_parts = api.generate_full_audio(script_parts, tmp_path)
+
+    assert completed_parts == 2
+    assert any("Failed parts" in line for line in debug_info)
+    assert part_order(output_file) == ["a", "c"]
+
+
+@pytest.mark.asyncio
+async def test_async_api_reuses_pooled_client_for_full_audio(monkeypatch, tmp_path):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_ENABLED", "false")
+    requests_seen = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        requests_seen.append((request.url.path, body))
+        return httpx.Response(200, content=fake_mp3(body["text"]), headers={"request-id": f"req-{body['text']}"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncElevenLabsAPI(client=client) as api:
+        output_file, _, completed_parts = await api.generate_full_audio(
+            [{"text": "one"}, {"text": "two", "voice_id": "voice2"}], tmp_path
+        )
+        assert api.client is client
+        # Only the sync client keeps a requests.Session
+        assert not hasattr(api, "session")
+
+    assert client.is_closed
+    assert completed_parts == 2
+    assert part_order(output_file) == ["one", "two"]
+    assert sorted(path for path, _ in requests_seen) == [
+        f"/v1/text-to-speech/{api.voice_id}",
+        "/v1/text-to-speech/voice2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_get_voices(monkeypatch):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+
+    def handler(request):
+        assert request.headers["xi-api-key"] == "test-key"
+        return httpx.Response(200, json={"voices": [{"voice_id": "v1", "name": "Alice"}]})
+
+    api = AsyncElevenLabsAPI(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    voices = await api.get_voices()
+    await api.aclose()
+
+    assert voices == [{
+        "voice_id": "v1",
+        "name": "Alice",
+        "category": "",
+        "labels": {},
+        "description": "",
+        "preview_url": "",
+        "high_quality_base_model_ids": []
+    }]
+
+
+@pytest.mark.asyncio
+async def test_async_segment_served_from_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_DIR", str(tmp_path))
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, content=b"audio", headers={"request-id": f"req-{len(calls)}"})
+
+    api = AsyncElevenLabsAPI(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    first = await api.generate_audio_segment("Welcome back", "voice1")
+    second = await api.generate_audio_segment("Welcome back", "voice1")
+    bypassed = await api.generate_audio_segment("Welcome back", "voice1", bypass_cache=True)
+    other_context = await api.generate_audio_segment("Welcome back", "voice1", previous_text="Hi")
+    await api.aclose()
+
+    assert first == second == (b"audio", "req-1")
+    assert bypassed == (b"audio", "req-2")
+    assert other_context == (b"audio", "req-3")
+    assert len(calls) == 3
+    assert api.cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_writes_parts_in_order_as_chunks_arrive(monkeypatch, tmp_path):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_ENABLED", "false")
+    monkeypatch.setenv("ELEVENLABS_STREAM_CHUNK_SIZE", "4")
+
+    def handler(request):
+        assert request.url.path.endswith("/stream")
+        text = json.loads(request.content)["text"]
+        return httpx.Response(200, content=(text * 3).encode(), headers={"request-id": f"req-{text}"})
+
+    seen = []
+
+    async def on_chunk(chunk, part_index):
+        seen.append(part_index)
+
+    api = AsyncElevenLabsAPI(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    output_file, _, completed_parts = await api.generate_full_audio_stream(
+        [{"text": "aaaa"}, {"text": "bbbb"}], tmp_path, on_chunk=on_chunk
+    )
+    await api.aclose()
+
+    assert completed_parts == 2
+    with open(output_file, "rb") as f:
+        assert f.read() == b"aaaa" * 3 + b"bbbb" * 3
+    assert seen == [0, 0, 0, 1, 1, 1]
+
+
+def test_generate_full_audio_bounds_parts_held_in_memory(api, tmp_path):
+    # The first part is slow, later parts must not all pile up behind it
+    started = []
+    release = threading.Event()
+
+    def fake_segment(text, voice_id, previous_text=None, next_text=None,
+                     previous_request_ids=None, debug_info=None, bypass_cache=False):
+        started.append(text)
+        if text == "part1":
+            release.wait(timeout=5)
+        return fake_mp3(text), f"req-{text}"
+
+    api.generate_audio_segment = fake_segment
+    script_parts = [{"text": f"part{i}"} for i in range(1, 5)] * 5
+
+    started_while_blocked = []
+
+    def release_later():
+        time.sleep(0.2)
+        started_while_blocked.append(len(started))
+        release.set()
+
+    watcher = threading.Thread(target=release_later)
+    watcher.start()
+    output_file, _, completed_parts = api.generate_full_audio(script_parts, tmp_path, max_workers=2)
+    watcher.join()
+
+    # Two workers give a window of four parts, the rest wait for part1 to be written
+    assert started_while_blocked == [4]
+    assert completed_parts == 20
+    assert part_order(output_file) == ["part1", "part2", "part3", "part4"] * 5
+
+
+@pytest.mark.asyncio
+async def test_stream_strips_part_headers_retries_and_cuts_failed_parts(monkeypatch, tmp_path):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_ENABLED", "false")
+    monkeypatch.setenv("ELEVENLABS_STREAM_CHUNK_SIZE", "64")
+    attempts = []
+
+    async def broken_stream():
+        yield fake_mp3("b")
+        raise httpx.ReadError("connection reset")
+
+    def handler(request):
+        text = json.loads(request.content)["text"]
+        attempts.append(text)
+        if text == "a" and attempts.count("a") == 1:
+            return httpx.Response(429, text="too many requests", headers={"retry-after": "0"})
+        if text == "b":
+            return httpx.Response(200, content=broken_stream())
+        return httpx.Response(200, content=fake_mp3(text), headers={"request-id": f"req-{text}"})
+
+    api = AsyncElevenLabsAPI(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    output_file, _, completed_parts = await api.generate_full_audio_stream(
+        [{"text": "a"}, {"text": "b"}, {"text": "c"}], tmp_path
+    )
+    await api.aclose()
+
+    assert sorted(attempts) == ["a", "a", "b", "c"]
+    assert completed_parts == 2
+    with open(output_file, "rb") as f:
+        data = f.read()
+    # One run of frames, without the ID3 tags and Info frames of the parts or the frames of the failed one
+    assert b"ID3" not in data and b"Info" not in data
+    assert scan_mp3(data).frame_count == 4
+    assert part_order(output_file) == ["a", "c"]
+    assert api.limiter.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_bounds_parts_running_ahead(monkeypatch, tmp_path):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_ENABLED", "false")
+    started = []
+    release = asyncio.Event()
+
+    async def handler(request):
+        text = json.loads(request.content)["text"]
+        started.append(text)
+        if len(started) == 1:
+            await release.wait()
+        return httpx.Response(200, content=fake_mp3(text), headers={"request-id": f"req-{text}"})
+
+    api = AsyncElevenLabsAPI(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    generation = asyncio.create_task(api.generate_full_audio_stream(
+        [{"text": f"part{i}"} for i in range(1, 5)] * 3, tmp_path, max_workers=2
+    ))
+    await asyncio.sleep(0.1)
+    # Two workers give a window of four parts, the rest wait for part1 to be written
+    started_while_blocked = len(started)
+    release.set()
+    output_file, _, completed_parts = await asyncio.wait_for(generation, 5)
+    await api.aclose()
+
+    assert started_while_blocked == 4
+    assert completed_parts == 12
+    assert part_order(output_file) == ["part1", "part2", "part3", "part4"] * 3
+
+
+@pytest.mark.asyncio
+async def test_stream_spools_later_parts_instead_of_holding_the_limiter(monkeypatch, tmp_path):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_ENABLED", "false")
+    monkeypatch.setenv("ELEVENLABS_RATE_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("ELEVENLABS_RATE_INITIAL_CONCURRENCY", "1")
+    monkeypatch.setenv("ELEVENLABS_STREAM_CHUNK_SIZE", "64")
+    monkeypatch.setenv("ELEVENLABS_STREAM_BUFFER_CHUNKS", "1")
+    attempts = []
+
+    def handler(request):
+        text = json.loads(request.content)["text"]
+        attempts.append(text)
+        if text == "a" and attempts.count("a") == 1:
+            return httpx.Response(429, text="too many requests", headers={"retry-after": "0"})
+        # Long parts, far more chunks than one part may buffer in memory
+        return httpx.Response(200, content=silent_mp3(5, bitrate_kbps=BITRATES[text]))
+
+    api = AsyncElevenLabsAPI(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    # b takes the only limiter slot while a waits to retry, and must not keep it until a is written
+    output_file, _, completed_parts = await asyncio.wait_for(api.generate_full_audio_stream(
+        [{"text": "a"}, {"text": "b"}, {"text": "c"}], tmp_path, max_workers=2
+    ), 5)
+    await api.aclose()
+
+    assert attempts[:2] == ["a", "b"] and attempts.count("a") == 2
+    assert completed_parts == 3
+    assert part_order(output_file) == ["a", "b", "c"]
+    assert api.limiter.stats()["in_flight"] == 0
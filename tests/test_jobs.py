@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from elevenlabs_mcp.database import Database
+from elevenlabs_mcp.jobs import JobProgress, JobQueue, job_fingerprint
+from elevenlabs_mcp.models import AudioJob
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    db = Database(str(tmp_path / "jobs.db"))
+    await db.initialize()
+    yield db
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_submitted_jobs_are_processed_with_bounded_concurrency(db):
+    active = 0
+    peak = 0
+
+    async def process(job, **options):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        job.status = "completed"
+        job.output_file = f"{job.id}.mp3"
+        await db.update_job(job)
+
+    queue = JobQueue(db, process, concurrency=2)
+    queue.start()
+    for i in range(5):
+        job = AudioJob(id=f"job-{i}", status="pending", script_parts=[{"text": "hi"}])
+        await db.insert_job(job)
+        await queue.submit(job)
+
+    await asyncio.wait_for(queue.join(), timeout=5)
+    await queue.stop()
+
+    assert peak == 2
+    jobs = await db.get_all_jobs()
+    assert {job.status for job in jobs} == {"completed"}
+
+
+@pytest.mark.asyncio
+async def test_resume_requeues_unfinished_jobs(db):
+    for job_id, status in [("a", "pending"), ("b", "processing"), ("c", "completed"), ("d", "failed")]:
+        await db.insert_job(AudioJob(id=job_id, status=status, script_parts=[{"text": "hi"}]))
+    # Queued by a previous run with options, which must survive the restart
+    await db.set_job_options("b", {"stream": True, "bypass_cache": True})
+    processed = []
+
+    async def process(job, **options):
+        processed.append((job.id, options))
+
+    queue = JobQueue(db, process, concurrency=1)
+    queue.start()
+    resumed = await queue.resume()
+    await asyncio.wait_for(queue.join(), timeout=5)
+    await queue.stop()
+
+    assert resumed == 2
+    assert processed == [("a", {}), ("b", {"stream": True, "bypass_cache": True})]
+
+
+def test_job_fingerprint_normalizes_text_and_voices():
+    settings = {"voice_id": "default", "model_id": "eleven_multilingual_v2", "stability": 0.5}
+    fingerprint = job_fingerprint([{"text": "Hello  world\n", "actor": "Bob"}], settings)
+
+    assert fingerprint == job_fingerprint([{"text": " Hello world", "voice_id": "default"}], settings)
+    assert fingerprint != job_fingerprint([{"text": "Hello world", "voice_id": "other"}], settings)
+    assert fingerprint != job_fingerprint([{"text": "Hello world"}], {**settings, "stability": 0.6})
+
+
+@pytest.mark.asyncio
+async def test_job_progress_notifies_per_part_and_throttles_db_writes(db):
+    job = AudioJob(id="job-1", status="processing", script_parts=[{"text": "a"}] * 3, total_parts=3)
+    await db.insert_job(job)
+    notifications = []
+
+    async def report(progress, total, **details):
+        notifications.append((progress, total, details))
+
+    tracker = JobProgress(db, job, report, db_interval=3600, notify_interval=0)
+    await tracker.start()
+    await tracker.part_done(100)
+    await tracker.part_done(None)
+    await tracker.part_done(50)
+    await tracker.finish()
+
+    assert [(progress, total) for progress, total, _ in notifications] == [(0, 3), (1, 3), (2, 3), (3, 3), (3, 3)]
+    details = notifications[-1][2]
+    assert (details["completed_parts"], details["failed_parts"], details["bytes"]) == (2, 1, 150)
+    assert details["message"] == "2/3 parts, 150 bytes, 1 failed"
+    assert notifications[1][2]["eta_seconds"] is not None
+    # Within the write interval nothing but the final job update touches the row
+    assert (await db.get_job("job-1")).completed_parts == 0
+
+    eager = JobProgress(db, job, db_interval=0)
+    await eager.part_done(10)
+    assert (await db.get_job("job-1")).completed_parts == 1
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from elevenlabs_mcp.metrics import Histogram, Metrics, serve_metrics
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert (histogram.count, histogram.sum) == (4, 2.65)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(0.99) == float("inf")
+    assert Histogram().quantile(0.5) is None
+
+
+@pytest.mark.asyncio
+async def test_counters_timers_and_gauges():
+    registry = Metrics()
+    registry.inc("elevenlabs_api_responses_total", status=200, model="m")
+    registry.inc("elevenlabs_api_responses_total", 2, model="m", status="200")
+    registry.gauge("elevenlabs_job_queue_depth", lambda: 3)
+    registry.gauge("broken", lambda: 1 / 0)
+
+    @registry.timed("elevenlabs_db_query_seconds")
+    async def get_job():
+        return "job"
+
+    assert await get_job() == "job"
+    with pytest.raises(ValueError):
+        with registry.timer("elevenlabs_audio_export_seconds"):
+            raise ValueError("export failed")
+
+    assert registry.counter_value("elevenlabs_api_responses_total", model="m", status=200) == 3
+    assert registry.histogram("elevenlabs_db_query_seconds", method="get_job").count == 1
+    snapshot = registry.snapshot()
+    assert snapshot["gauges"] == {"elevenlabs_job_queue_depth": 3.0}
+    [export] = snapshot["histograms"]["elevenlabs_audio_export_seconds"]
+    assert export["count"] == 1 and export["p50_seconds"] == 0.001
+
+
+def test_render_prometheus_text_format():
+    registry = Metrics()
+    registry.inc("elevenlabs_api_throttled_total", model='say "hi"')
+    registry.observe("elevenlabs_api_request_seconds", 0.3, model="m")
+    registry.gauge("elevenlabs_job_queue_depth", lambda: 2)
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE elevenlabs_api_throttled_total counter" in lines
+    assert 'elevenlabs_api_throttled_total{model="say \\"hi\\""} 1' in lines
+    assert "# TYPE elevenlabs_api_request_seconds histogram" in lines
+    assert 'elevenlabs_api_request_seconds_bucket{model="m",le="0.25"} 0' in lines
+    assert 'elevenlabs_api_request_seconds_bucket{model="m",le="0.5"} 1' in lines
+    assert 'elevenlabs_api_request_seconds_bucket{model="m",le="+Inf"} 1' in lines
+    assert 'elevenlabs_api_request_seconds_count{model="m"} 1' in lines
+    assert "elevenlabs_job_queue_depth 2" in lines
+
+
+@pytest.mark.asyncio
+async def test_serve_metrics_over_http():
+    registry = Metrics()
+    registry.inc("elevenlabs_jobs_total", status="completed")
+    server = await serve_metrics("127.0.0.1", 0, registry)
+    port = server.sockets[0].getsockname()[1]
+
+    async def get(path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response.decode()
+
+    try:
+        found = await get("/metrics")
+        missing = await get("/")
+    finally:
+        server.close()
+        await server.wait_closed()
+
+    assert found.startswith("HTTP/1.1 200 OK")
+    assert 'elevenlabs_jobs_total{status="completed"} 1' in found
+    assert missing.startswith("HTTP/1.1 404")
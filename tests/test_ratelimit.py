@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from elevenlabs_mcp.audio import silent_mp3
+from elevenlabs_mcp.elevenlabs_api import MAX_RETRY_WAIT, AsyncElevenLabsAPI, ElevenLabsAPIError, _retry_wait
+from elevenlabs_mcp.ratelimit import AdaptiveLimiter, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("0.5") == 0.5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+
+
+def test_window_grows_on_success_and_halves_on_throttling():
+    limiter = AdaptiveLimiter(max_concurrency=8, initial_concurrency=2, rate=0, decrease_interval=0)
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(200)
+    assert limiter.concurrency_limit == 4
+
+    limiter.acquire()
+    limiter.release(429)
+    assert limiter.concurrency_limit == 2
+    limiter.acquire()
+    limiter.release(503)
+    assert limiter.concurrency_limit == 1
+    # A client error or a lost connection says nothing about capacity
+    limiter.acquire()
+    limiter.release(400)
+    limiter.acquire()
+    limiter.release(None)
+    assert limiter.concurrency_limit == 1
+    assert limiter.stats()["throttled"] == 1
+    assert limiter.stats()["errors"] == 1
+
+
+def test_decrease_happens_once_per_interval():
+    limiter = AdaptiveLimiter(max_concurrency=8, initial_concurrency=8, rate=0, decrease_interval=60)
+
+    for _ in range(3):
+        limiter.acquire()
+    for _ in range(3):
+        limiter.release(429)
+
+    assert limiter.concurrency_limit == 4
+
+
+def test_acquire_blocks_until_a_slot_is_released():
+    limiter = AdaptiveLimiter(max_concurrency=1, initial_concurrency=1, rate=0)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.05)
+    assert limiter.stats()["queue_depth"] == 1
+
+    limiter.release(200)
+    assert acquired.wait(1)
+    thread.join()
+    assert limiter.stats()["in_flight"] == 1
+
+
+def test_retry_after_pauses_new_requests():
+    limiter = AdaptiveLimiter(max_concurrency=4, initial_concurrency=4, rate=0)
+    limiter.acquire()
+    limiter.release(429, retry_after=0.1)
+    assert limiter.stats()["paused_for_seconds"] > 0
+
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_token_bucket_caps_request_rate():
+    limiter = AdaptiveLimiter(max_concurrency=8, initial_concurrency=8, rate=20, burst=1)
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(200)
+
+    # The burst covers the first request, the other two wait 1/20s each
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_async_waiters_are_woken_on_release():
+    limiter = AdaptiveLimiter(max_concurrency=1, initial_concurrency=1, rate=0)
+    await limiter.acquire_async()
+    waiter = asyncio.create_task(limiter.acquire_async())
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    limiter.release(200)
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_api_retries_throttled_requests_after_retry_after(monkeypatch):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_ENABLED", "false")
+    monkeypatch.setenv("ELEVENLABS_RATE_INITIAL_CONCURRENCY", "4")
+    responses = [
+        httpx.Response(429, text="too many requests", headers={"retry-after": "0"}),
+        httpx.Response(200, content=silent_mp3(1), headers={"request-id": "req-1"})
+    ]
+    api = AsyncElevenLabsAPI(client=httpx.AsyncClient(transport=httpx.MockTransport(lambda r: responses.pop(0))))
+    try:
+        audio, request_id = await api.generate_audio_segment("hello", "voice")
+    finally:
+        await api.aclose()
+
+    assert request_id == "req-1"
+    assert api.limiter.stats()["throttled"] == 1
+    assert api.limiter.concurrency_limit == 2
+
+
+def test_retry_wait_caps_retry_after():
+    def state(error):
+        return SimpleNamespace(outcome=SimpleNamespace(exception=lambda: error), attempt_number=1)
+
+    assert _retry_wait(state(ElevenLabsAPIError("slow down", 429, retry_after=2))) == 2
+    assert _retry_wait(state(ElevenLabsAPIError("slow down", 429, retry_after=3600))) == MAX_RETRY_WAIT
+    assert _retry_wait(state(ElevenLabsAPIError("unavailable", 503))) == 4
+
+
+@pytest.mark.asyncio
+async def test_api_does_not_retry_client_errors(monkeypatch):
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setenv("ELEVENLABS_CACHE_ENABLED", "false")
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, text="bad voice")
+
+    api = AsyncElevenLabsAPI(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        with pytest.raises(ElevenLabsAPIError) as error:
+            await api.generate_audio_segment("hello", "voice")
+    finally:
+        await api.aclose()
+
+    assert error.value.status_code == 400
+    assert len(calls) == 1
+    assert api.limiter.stats()["in_flight"] == 0
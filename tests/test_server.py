@@ -1,5 +1,20 @@
+import asyncio
+import base64
+import hashlib
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+import httpx
+import mcp.types as types
 import pytest
+from elevenlabs_mcp import elevenlabs_api
+from elevenlabs_mcp.audio import IncrementalAssembler, parse_frame_header, scan_mp3, silent_mp3
+from elevenlabs_mcp.metrics import metrics
 from elevenlabs_mcp.server import ElevenLabsServer
+from mcp.server import request_ctx
+from mcp.shared.context import RequestContext
+from mcp.shared.memory import create_connected_server_and_client_session
 import json
 
 
@@ -25,7 +40,8 @@ def test_parse_script_valid_input():
     assert script_parts[0]["actor"] == "narrator"
 
 # Valid JSON with script array containing multiple parts with text, voice_id, and actor
-def test_parse_valid_script_json():
+def test_parse_valid_script_json(monkeypatch):
+    monkeypatch.setenv("ELEVENLABS_DEBUG_INFO", "debug")
     server = ElevenLabsServer()
     script_json = '''
     {
@@ -175,3 +191,460 @@ def test_parse_mixed_input():
     assert script_parts[1] == {"text": "Part 2", "voice_id": "voice1", "actor": None}
     assert script_parts[2] == {"text": "Part 3", "voice_id": None, "actor": "Bob"}
     assert script_parts[3] == {"text": "Part 4", "voice_id": "voice2", "actor": "Alice"}
+
+
+@pytest.mark.asyncio
+async def test_history_read_completes_while_generation_in_flight(harness, monkeypatch):
+    encode_started = threading.Event()
+    release_encode = threading.Event()
+
+    class SlowAssembler(IncrementalAssembler):
+        def close(self):
+            # Blocks the calling thread like a long ffmpeg export would
+            encode_started.set()
+            release_encode.wait(timeout=5)
+            return super().close()
+
+    monkeypatch.setattr(elevenlabs_api, "IncrementalAssembler", SlowAssembler)
+
+    # Both calls go over one real client session, as they would over stdio
+    async with create_connected_server_and_client_session(harness.server.server) as session:
+        generation = asyncio.create_task(session.call_tool("generate_audio_simple", {"text": "Hello"}))
+        while not encode_started.is_set():
+            await asyncio.sleep(0.01)
+
+        try:
+            history = await asyncio.wait_for(session.call_tool("get_voiceover_history", {}), timeout=2)
+            jobs = json.loads(history.content[0].text)["jobs"]
+            assert [job["status"] for job in jobs] == ["processing"]
+            assert not generation.done()
+        finally:
+            release_encode.set()
+            result = await asyncio.wait_for(generation, timeout=5)
+
+    assert "Audio generation successful" in result.content[0].text
+
+
+@pytest.mark.asyncio
+async def test_debug_info_is_fetched_per_job_instead_of_inlined(harness, monkeypatch):
+    monkeypatch.setenv("ELEVENLABS_DEBUG_INFO", "info")
+
+    result = await harness.call_tool("generate_audio_simple", {"text": "Hello"})
+    status = result.root.content[0].text
+    job_id = status.splitlines()[0].rsplit(" ", 1)[-1]
+    debug = await harness.call_tool("get_job_debug_info", {"job_id": job_id})
+
+    assert "Successfully generated audio" not in status
+    messages = [entry["message"] for entry in json.loads(debug.root.content[0].text)["entries"]]
+    assert f"Created job record: {job_id}" in messages
+    assert "Successfully generated audio for part 0" in messages
+
+
+@pytest.mark.asyncio
+async def test_debug_summary_reports_context_bytes_saved_per_job(harness, monkeypatch):
+    monkeypatch.delenv("ELEVENLABS_DEBUG_INFO", raising=False)
+    harness.server.api.context_max_chars = 10
+    script = json.dumps({"script": [{"text": "one two three four"}, {"text": "middle"},
+                                    {"text": "five six seven eight"}]})
+
+    result = await harness.call_tool("generate_audio_script", {"script": script, "response_mode": "reference"})
+    job_id = result.root.content[0].text.splitlines()[0].rsplit(" ", 1)[-1]
+    debug = json.loads((await harness.call_tool("get_job_debug_info", {"job_id": job_id})).root.content[0].text)
+
+    # 21 + 8 + 12 + 19 bytes: each side is cut to the words within 10 chars of the part
+    assert debug["summary"] == {"context_bytes_saved": 60}
+    assert debug["entries"] == []
+
+
+@pytest.mark.asyncio
+async def test_reference_response_and_ranged_audio_resource(harness, tmp_path):
+    harness.server.audio_chunk_size = 100
+    harness.handler = lambda request: httpx.Response(200, content=silent_mp3(38), headers={"request-id": "req-1"})
+
+    result = await harness.call_tool("generate_audio_simple", {"text": "Hello", "response_mode": "reference"})
+    assert all(content.type == "text" for content in result.root.content)
+    reference = json.loads(result.root.content[1].text)
+    data = (tmp_path / reference["uri"][len("audio://"):]).read_bytes()
+
+    first = await harness.read_resource(reference["uri"])
+    ranged = await harness.read_resource(f"{reference['uri']}?offset=200&length=50")
+    invalid = await harness.call_tool("get_audio_file", {"job_id": reference["job_id"], "response_mode": "bogus"})
+
+    assert reference["size"] == len(data)
+    assert reference["sha256"] == hashlib.sha256(data).hexdigest()
+    # 38 frames of 1152 samples at 44.1 kHz
+    assert reference["duration_seconds"] == round(38 * 1152 / 44100, 3)
+    assert base64.urlsafe_b64decode(first.root.contents[0].blob) == data[:100]
+    assert base64.urlsafe_b64decode(ranged.root.contents[0].blob) == data[200:250]
+    assert "Invalid response_mode" in invalid.root.content[0].text
+
+
+def test_audio_resource_rejects_paths_outside_output_dir(tmp_path):
+    server = ElevenLabsServer()
+    server.output_dir = tmp_path
+
+    with pytest.raises(ValueError):
+        server.resolve_audio_file("../secret.mp3")
+
+
+@pytest.mark.asyncio
+async def test_get_audio_file_reads_byte_ranges(harness, tmp_path):
+    server = harness.server
+    server.audio_chunk_size = 300
+    output_file = tmp_path / "full_audio_test.mp3"
+    output_file.write_bytes(bytes(range(256)) * 2)
+    job = await server.create_job([{"text": "Hello"}])
+    job.status = "completed"
+    job.output_file = str(output_file)
+    await server.db.update_job(job)
+
+    async def get_range(**arguments):
+        result = await harness.call_tool("get_audio_file", {"job_id": job.id, **arguments})
+        meta, resource = result.root.content
+        return json.loads(meta.text), base64.b64decode(resource.resource.blob)
+
+    preview_meta, preview = await get_range(length=10)
+    # Requests beyond the chunk size are capped
+    rest_meta, rest = await get_range(offset=preview_meta["next_offset"], length=1000)
+    last_meta, last = await get_range(offset=rest_meta["next_offset"])
+
+    data = output_file.read_bytes()
+    assert preview == data[:10]
+    assert preview_meta == {"job_id": job.id, "offset": 0, "length": 10, "total_size": 512, "next_offset": 10}
+    assert rest == data[10:310]
+    assert last == data[310:]
+    assert last_meta["next_offset"] is None
+
+
+@pytest.mark.asyncio
+async def test_generate_audio_batch_returns_manifest_and_survives_failures(harness):
+    voices_requested = []
+
+    def handler(request):
+        voices_requested.append(request.url.path.rsplit("/", 1)[-1])
+        return httpx.Response(200, content=silent_mp3(2), headers={"request-id": "req-1"})
+
+    harness.handler = handler
+    result = await harness.call_tool("generate_audio_batch", {"items": [
+        {"text": "Saved", "id": "saved"},
+        {"text": "   ", "id": "blank"},
+        {"text": "Deleted", "voice_id": "voice2"},
+    ]})
+
+    server = harness.server
+    manifest = json.loads(result.root.content[0].text)
+    assert (manifest["completed"], manifest["failed"]) == (2, 1)
+    saved, blank, deleted = manifest["items"]
+    assert saved["id"] == "saved" and saved["status"] == "completed"
+    assert blank == {"index": 1, "id": "blank", "status": "failed", "error": "Missing required field 'text'"}
+    assert deleted["status"] == "completed" and "id" not in deleted
+    for entry in (saved, deleted):
+        path = server.resolve_audio_file(entry["uri"][len("audio://"):])
+        assert path.read_bytes() == silent_mp3(2)
+        assert entry["size"] == len(silent_mp3(2))
+    assert sorted(voices_requested) == sorted([server.api.voice_id, "voice2"])
+
+
+@pytest.mark.asyncio
+async def test_partial_job_resumes_only_failed_parts(harness, tmp_path):
+    bitrates = {"One": 64, "Two": 96, "Three": 128}
+    failing = {"Two"}
+    requested = []
+
+    def handler(request):
+        text = json.loads(request.content)["text"]
+        requested.append(text)
+        if text in failing:
+            return httpx.Response(400, text="invalid text")
+        return httpx.Response(200, content=silent_mp3(2, bitrate_kbps=bitrates[text]),
+                              headers={"request-id": f"req-{text}"})
+
+    harness.handler = handler
+    db = harness.server.db
+    script = json.dumps({"script": [{"text": "One"}, {"text": "Two"}, {"text": "Three"}]})
+    result = await harness.call_tool("generate_audio_script", {"script": script, "response_mode": "reference"})
+    job_id = result.root.content[0].text.splitlines()[0].rsplit(" ", 1)[-1]
+    partial = await db.get_job(job_id)
+    first_output = partial.output_file
+    parts = await db.get_job_parts(job_id)
+
+    failing.clear()
+    requested.clear()
+    resumed = await harness.call_tool("resume_job", {"job_id": job_id, "response_mode": "reference"})
+    job = await db.get_job(job_id)
+    again = await harness.call_tool("resume_job", {"job_id": job_id})
+
+    assert "partially successful, 1 parts failed" in result.root.content[0].text
+    assert (partial.status, partial.completed_parts) == ("partial", 2)
+    assert [(part["status"], part["request_id"]) for part in parts] == [
+        ("completed", "req-One"), ("failed", None), ("completed", "req-Three")
+    ]
+
+    assert "Audio generation successful" in resumed.root.content[0].text
+    assert requested == ["Two"]
+    assert (job.status, job.completed_parts, job.error) == ("completed", 3, None)
+    data = (tmp_path / json.loads(resumed.root.content[1].text)["uri"][len("audio://"):]).read_bytes()
+    stream = scan_mp3(data)
+    frames = []
+    pos = stream.start
+    while pos < stream.end:
+        header = parse_frame_header(data, pos)
+        frames.append(header.bitrate // 1000)
+        pos += header.frame_length
+    # The saved segments and the retried one, in script order
+    assert frames == [64, 64, 96, 96, 128, 128]
+    assert not (tmp_path / "segments" / job_id).exists()
+    assert await db.get_job_parts(job_id) == []
+    assert job.output_file != first_output and not Path(first_output).exists()
+    assert "only failed, partial or cancelled jobs can be resumed" in again.root.content[0].text
+
+
+@pytest.mark.asyncio
+async def test_cancel_job_keeps_finished_parts_for_resume(harness):
+    requested = []
+    release = asyncio.Event()
+
+    async def handler(request):
+        text = json.loads(request.content)["text"]
+        requested.append(text)
+        if text != "One":
+            await release.wait()
+        return httpx.Response(200, content=silent_mp3(2), headers={"request-id": f"req-{text}"})
+
+    harness.handler = handler
+    server = harness.server
+    script = json.dumps({"script": [{"text": "One"}, {"text": "Two"}, {"text": "Three"}]})
+    generation = asyncio.create_task(harness.call_tool("generate_audio_script", {"script": script,
+                                                                                 "response_mode": "reference"}))
+    while not server._running:
+        await asyncio.sleep(0.01)
+    job_id = next(iter(server._running))
+    while not await server.db.get_job_parts(job_id) or "Two" not in requested:
+        await asyncio.sleep(0.01)
+
+    cancelled = await harness.call_tool("cancel_job", {"job_id": job_id})
+    result = await asyncio.wait_for(generation, 1)
+    job = await server.db.get_job(job_id)
+    parts = await server.db.get_job_parts(job_id)
+    again = await harness.call_tool("cancel_job", {"job_id": job_id})
+
+    release.set()
+    requested.clear()
+    resumed = await harness.call_tool("resume_job", {"job_id": job_id, "response_mode": "reference"})
+    finished = await server.db.get_job(job_id)
+
+    assert json.loads(cancelled.root.content[0].text)["status"] == "cancelled"
+    assert f"Job {job_id} was cancelled" in result.root.content[0].text
+    assert job.status == "cancelled"
+    assert [(part["part_index"], part["status"]) for part in parts] == [(0, "completed")]
+    assert "only pending or processing jobs can be cancelled" in again.root.content[0].text
+    assert server.api.limiter.stats()["in_flight"] == 0
+
+    assert "Audio generation successful" in resumed.root.content[0].text
+    assert "One" not in requested
+    assert (finished.status, finished.completed_parts) == ("completed", 3)
+
+
+@pytest.mark.asyncio
+async def test_delete_job_stops_a_running_job_first(harness, tmp_path):
+    release = asyncio.Event()
+
+    async def handler(request):
+        if json.loads(request.content)["text"] != "One":
+            await release.wait()
+        return httpx.Response(200, content=silent_mp3(2), headers={"request-id": "req-1"})
+
+    harness.handler = handler
+    server = harness.server
+    script = json.dumps({"script": [{"text": "One"}, {"text": "Two"}]})
+    generation = asyncio.create_task(harness.call_tool("generate_audio_script", {"script": script,
+                                                                                 "response_mode": "reference"}))
+    while not server._running:
+        await asyncio.sleep(0.01)
+    job_id = next(iter(server._running))
+    while not await server.db.get_job_parts(job_id):
+        await asyncio.sleep(0.01)
+
+    deleted = await harness.call_tool("delete_job", {"job_id": job_id})
+    result = await asyncio.wait_for(generation, 1)
+    release.set()
+
+    assert f"Successfully deleted job {job_id}" in deleted.root.content[0].text
+    assert f"Job {job_id} was cancelled" in result.root.content[0].text
+    assert await server.db.get_job(job_id) is None
+    assert await server.db.get_job_parts(job_id) == []
+    assert not server._running
+    assert list(tmp_path.glob("*.mp3")) == []
+    assert not (tmp_path / "segments" / job_id).exists()
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_job(harness):
+    requested = []
+    release = asyncio.Event()
+
+    async def handler(request):
+        requested.append(json.loads(request.content)["text"])
+        await release.wait()
+        return httpx.Response(200, content=silent_mp3(2), headers={"request-id": "req-1"})
+
+    harness.handler = handler
+
+    def generate(text, **arguments):
+        return harness.call_tool("generate_audio_simple", {"text": text, "response_mode": "reference", **arguments})
+
+    first = asyncio.create_task(generate("Hello world"))
+    while not requested:
+        await asyncio.sleep(0.01)
+    # Same script with different whitespace, while the first is still in flight
+    second = asyncio.create_task(generate("Hello   world "))
+    await asyncio.sleep(0.05)
+    release.set()
+    first, second = await asyncio.gather(first, second)
+    # Completed within the dedup window
+    third = await generate("Hello world")
+    fresh = await generate("Hello world", bypass_cache=True)
+
+    job_ids = [json.loads(result.root.content[-1].text)["job_id"] for result in (first, second, third, fresh)]
+    assert job_ids[0] == job_ids[1] == job_ids[2]
+    assert job_ids[3] != job_ids[0]
+    assert requested == ["Hello world", "Hello world"]
+    assert "identical request" in second.root.content[0].text
+    assert "identical request" not in first.root.content[0].text
+
+
+@pytest.mark.asyncio
+async def test_progress_notifications_follow_parts(harness):
+    notifications = []
+
+    class Session:
+        async def send_notification(self, notification):
+            notifications.append(notification.root.params)
+
+    script = json.dumps({"script": [{"text": "One"}, {"text": "Two"}, {"text": "Three"}]})
+    token = request_ctx.set(RequestContext(
+        request_id=1, meta=types.RequestParams.Meta(progressToken="progress-1"), session=Session()
+    ))
+    try:
+        result = await harness.call_tool("generate_audio_script", {"script": script, "response_mode": "reference"})
+    finally:
+        request_ctx.reset(token)
+
+    assert "Audio generation successful" in result.root.content[0].text
+    assert {params.progressToken for params in notifications} == {"progress-1"}
+    assert (notifications[0].progress, notifications[0].total) == (0, 3)
+    assert (notifications[-1].progress, notifications[-1].total) == (3, 3)
+    final = notifications[-1].model_dump()
+    assert final["completed_parts"] == 3
+    assert final["bytes"] == 3 * len(silent_mp3(2))
+    assert final["message"].startswith("3/3 parts")
+
+
+@pytest.mark.asyncio
+async def test_get_metrics_reports_requests_retries_and_timings(harness):
+    responses = [
+        httpx.Response(429, text="too many requests", headers={"retry-after": "0"}),
+        httpx.Response(200, content=silent_mp3(2), headers={"request-id": "req-1"})
+    ]
+    harness.handler = lambda request: responses.pop(0)
+    labels = {"endpoint": "text_to_speech", "model": harness.server.api.model_id}
+    throttled = metrics.counter_value("elevenlabs_api_throttled_total", **labels)
+    retries = metrics.counter_value("elevenlabs_api_retries_total", function="generate_audio_segment")
+    received = metrics.counter_value("elevenlabs_api_bytes_received_total", **labels)
+    completed = metrics.counter_value("elevenlabs_jobs_total", status="completed")
+
+    await harness.call_tool("generate_audio_simple", {"text": "Hello", "response_mode": "reference"})
+    report = json.loads((await harness.call_tool("get_metrics", {})).root.content[0].text)
+    text = (await harness.call_tool("get_metrics", {"format": "prometheus"})).root.content[0].text
+
+    assert metrics.counter_value("elevenlabs_api_throttled_total", **labels) == throttled + 1
+    assert metrics.counter_value("elevenlabs_api_retries_total", function="generate_audio_segment") == retries + 1
+    assert metrics.counter_value("elevenlabs_api_bytes_received_total", **labels) - received == \
+        len(silent_mp3(2)) + len("too many requests")
+    assert metrics.counter_value("elevenlabs_jobs_total", status="completed") == completed + 1
+
+    methods = {entry["labels"]["method"] for entry in report["histograms"]["elevenlabs_db_query_seconds"]}
+    assert {"insert_job", "update_job", "get_job"} <= methods
+    assert any(entry["labels"] == labels for entry in report["histograms"]["elevenlabs_api_request_seconds"])
+    assert report["histograms"]["elevenlabs_audio_assembly_seconds"]
+    assert report["gauges"]["elevenlabs_job_queue_depth"] == 0
+    assert report["rate_limiter"]["throttled"] == 1
+    assert report["cache"] is None
+    assert "# TYPE elevenlabs_api_request_seconds histogram" in text
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_queued_job_frees_identical_requests(harness):
+    queued = await harness.call_tool("generate_audio_simple", {"text": "Hello", "background": True})
+    job_id = json.loads(queued.root.content[0].text)["id"]
+
+    cancelled = await harness.call_tool("cancel_job", {"job_id": job_id})
+    # Nothing runs the queued job, an identical request must not wait for it
+    result = await asyncio.wait_for(harness.call_tool("generate_audio_simple", {"text": "Hello"}), 2)
+
+    assert json.loads(cancelled.root.content[0].text)["status"] == "cancelled"
+    assert "Audio generation successful" in result.root.content[0].text
+    assert f"Job ID: {job_id}" not in result.root.content[0].text
+
+
+@pytest.mark.asyncio
+async def test_job_cancelled_while_queued_does_not_run_when_picked_up(harness):
+    requested = []
+
+    def handler(request):
+        requested.append(request)
+        return httpx.Response(200, content=silent_mp3(2), headers={"request-id": "req-1"})
+
+    harness.handler = handler
+    server = harness.server
+
+    # The task exists but run_job has not started when cancel_job looks for it
+    job = await server.create_job([{"text": "Hello"}])
+    task = asyncio.create_task(server.run_job(job))
+    await server.cancel_job(job)
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # Picked up by a worker that read the job before it was cancelled
+    stale = await server.create_job([{"text": "Hello again"}])
+    await server.cancel_job(await server.db.get_job(stale.id))
+    with pytest.raises(asyncio.CancelledError):
+        await server.run_job(stale)
+
+    assert requested == []
+    assert [(await server.db.get_job(job_id)).status for job_id in (job.id, stale.id)] == ["cancelled"] * 2
+    assert not server._running
+
+
+@pytest.mark.asyncio
+async def test_history_pages_jobs_in_creation_order(harness):
+    server = harness.server
+    jobs = []
+    for i in range(5):
+        jobs.append(await server.create_job([{"text": f"Part {i}"}]))
+    # Each job gets its own creation time
+    assert len({job.created_at for job in jobs}) == 5
+
+    seen = []
+    cursor = None
+    while True:
+        arguments = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = json.loads((await harness.call_tool("get_voiceover_history", arguments)).root.content[0].text)
+        seen += [job["id"] for job in page["jobs"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [job.id for job in reversed(jobs)]
+
+    # A UTC timestamp with a "Z" suffix compares against the stored naive UTC times
+    since = jobs[2].created_at.isoformat() + "Z"
+    recent = await harness.call_tool("get_voiceover_history", {"created_after": since})
+    assert [job["id"] for job in json.loads(recent.root.content[0].text)["jobs"]] == [
+        job.id for job in reversed(jobs[2:])
+    ]
+    offset = (jobs[2].created_at + timedelta(hours=2)).isoformat() + "+02:00"
+    older = await harness.call_tool("get_voiceover_history", {"created_before": offset})
+    assert [job["id"] for job in json.loads(older.root.content[0].text)["jobs"]] == [
+        job.id for job in reversed(jobs[:2])
+    ]
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from elevenlabs_mcp.database import VOICES_REFRESHED_AT, Database
+from elevenlabs_mcp.voices import VoiceIndex
+
+
+def make_voice(voice_id, name, **labels):
+    return {
+        "voice_id": voice_id,
+        "name": name,
+        "category": "premade",
+        "labels": labels,
+        "description": "",
+        "preview_url": "",
+        "high_quality_base_model_ids": []
+    }
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    database = Database(str(tmp_path / "history.db"))
+    await database.initialize()
+    yield database
+    await database.close()
+
+
+@pytest.mark.asyncio
+async def test_cold_start_coalesces_concurrent_fetches(db):
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [make_voice("v2", "Bob"), make_voice("v1", "Alice")]
+
+    index = VoiceIndex(db, fetch)
+    results = await asyncio.gather(*(index.all() for _ in range(5)))
+
+    assert calls == 1
+    assert all([voice["name"] for voice in voices] == ["Alice", "Bob"] for voices in results)
+    stored, needs_refresh = await db.get_voices()
+    assert len(stored) == 2 and not needs_refresh
+
+
+@pytest.mark.asyncio
+async def test_stale_catalog_is_served_while_refreshing(db):
+    await db.upsert_voices([make_voice("v1", "Alice")])
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return [make_voice("v1", "Alice"), make_voice("v2", "Bob")]
+
+    index = VoiceIndex(db, fetch)
+    await index.load()
+    assert not index.is_stale
+    index._refreshed_at -= index.max_age_seconds + 1
+
+    # Returns the cached catalog without waiting for the upstream call
+    voices = await asyncio.wait_for(index.all(), timeout=1)
+    assert [voice["voice_id"] for voice in voices] == ["v1"]
+
+    release.set()
+    await index.refresh()
+    assert [voice["voice_id"] for voice in await index.all()] == ["v1", "v2"]
+    assert not index.is_stale
+
+
+@pytest.mark.asyncio
+async def test_load_ages_catalog_from_stored_refresh_time(db):
+    await db.upsert_voices([make_voice("v1", "Alice")])
+    connection = await db._connection()
+    refreshed_at = (datetime.utcnow() - timedelta(hours=2)).isoformat()
+    await connection.execute("UPDATE metadata SET value = ? WHERE key = ?", (refreshed_at, VOICES_REFRESHED_AT))
+    await connection.commit()
+
+    index = VoiceIndex(db, None, max_age_seconds=3 * 3600)
+    await index.load()
+
+    assert not index.is_stale
+    assert time.monotonic() - index._refreshed_at == pytest.approx(2 * 3600, abs=60)
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_cached_voices_and_backs_off(db):
+    await db.upsert_voices([make_voice("v1", "Alice")])
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        raise Exception("API down")
+
+    index = VoiceIndex(db, fetch, max_age_seconds=1)
+    await index.load()
+    index._refreshed_at -= 2
+    await index.refresh()
+
+    for _ in range(3):
+        assert [voice["voice_id"] for voice in await index.all()] == ["v1"]
+    await asyncio.sleep(0)
+    assert calls == 1
+
+    # Once the back-off has passed the next read tries again
+    index._failed_at -= index.retry_seconds + 1
+    await index.all()
+    await index.refresh()
+    assert calls == 2
+    await index.close()
+
+
+@pytest.mark.asyncio
+async def test_search_by_name_and_label(db):
+    await db.upsert_voices([
+        make_voice("v1", "Alice", accent="British", gender="female"),
+        make_voice("v2", "Bob", accent="american", gender="male"),
+        make_voice("v3", "alice", accent="american", gender="female"),
+    ])
+    index = VoiceIndex(db, None)
+    await index.load()
+
+    assert [voice["voice_id"] for voice in (await index.search(query="ALICE"))[0]] == ["v1", "v3"]
+    assert [voice["voice_id"] for voice in (await index.search(labels={"Accent": "American"}))[0]] == ["v2", "v3"]
+
+
+@pytest.mark.asyncio
+async def test_search_intersects_filters(db):
+    await db.upsert_voices([
+        {**make_voice("v1", "Alice", accent="british", gender="female", **{"use case": "narration"}),
+         "high_quality_base_model_ids": ["eleven_multilingual_v2"]},
+        {**make_voice("v2", "Bella", accent="american", gender="female", use_case="narration"),
+         "description": "Warm storyteller"},
+        {**make_voice("v3", "Carl", accent="american", gender="male"), "category": "cloned"},
+    ])
+    index = VoiceIndex(db, None)
+    await index.load()
+
+    async def ids(**filters):
+        voices, total = await index.search(**filters)
+        return [voice["voice_id"] for voice in voices], total
+
+    assert await ids(labels={"gender": "Female", "use_case": "narration"}) == (["v1", "v2"], 2)
+    assert await ids(labels={"accent": "american"}, category="cloned") == (["v3"], 1)
+    assert await ids(query="story") == (["v2"], 1)
+    assert await ids(model_id="eleven_multilingual_v2") == (["v1"], 1)
+    assert await ids(labels={"accent": "french"}) == ([], 0)
+    assert await ids(limit=2) == (["v1", "v2"], 3)